@@ -0,0 +1,254 @@
+"""
+Open-loop load generator for ``POST /orders``.
+
+Orders are sent on a schedule fixed in advance (Poisson or evenly spaced
+arrivals following a rate profile), never in reaction to responses, so a slow
+dispatcher does not lower the offered load. Latency is measured from each
+order's *scheduled* send time: time spent waiting for a free connection slot
+counts, which keeps coordinated omission out of the percentiles. The service
+time (from the actual send) is reported next to it.
+
+The same machinery replays recorded traces (:mod:`client_service.app.traces`)
+at their original pace, scaled, or as fast as the concurrency limit allows.
+
+Rate profiles are ``duration:rate`` stages in seconds and orders per second,
+e.g. ``60:200`` ramps from 0 to 200/s over a minute and ``0:50,120:50`` holds
+50/s for two minutes; the rate moves linearly within a stage.
+"""
+
+from __future__ import annotations
+
+import asyncio
+import json
+import math
+import random
+import time
+from collections import Counter
+from collections.abc import Iterable, Iterator
+from datetime import UTC, datetime
+from pathlib import Path
+
+import httpx
+
+from client_service.app.settings import settings
+from client_service.app.traces import TraceRecorder, read_trace, replay_schedule
+from common import metrics
+from common.histogram import LatencyHistogram
+from common.logger import get_logger
+from common.schemas import OrderCreate
+
+logger = get_logger(__name__)
+
+Stage = tuple[float, float]
+
+ORDERS_SENT = metrics.counter(
+    "client_orders_sent", "Orders sent to the dispatcher, by outcome.", ["outcome"]
+)
+
+
+def parse_profile(profile: str) -> list[Stage]:
+    """``"30:10,60:100"`` -> ``[(30.0, 10.0), (60.0, 100.0)]``."""
+    stages = []
+    for part in profile.split(","):
+        duration, rate = part.strip().split(":")
+        stages.append((float(duration), float(rate)))
+    if any(duration < 0 or rate < 0 for duration, rate in stages):
+        raise ValueError(f"Negative duration or rate in load profile {profile!r}")
+    return stages
+
+
+def arrivals(stages: list[Stage], poisson: bool, rng: random.Random) -> Iterator[float]:
+    """
+    Send times, in seconds from the start, of every order of the run.
+
+    The n-th order goes out when the expected number of orders so far (the
+    integral of the rate profile) reaches the n-th point of a unit-rate
+    process: evenly spaced for constant arrivals, exponential gaps for Poisson.
+    """
+
+    def gap() -> float:
+        return rng.expovariate(1.0) if poisson else 1.0
+
+    start, previous, expected = 0.0, 0.0, 0.0
+    target = gap()
+    for duration, rate in stages:
+        slope = (rate - previous) / duration if duration > 0 else 0.0
+        mass = (previous + rate) / 2 * duration
+        while target <= expected + mass:
+            need = target - expected
+            # Solve previous * tau + slope * tau**2 / 2 == need for tau.
+            if abs(slope) < 1e-12:
+                tau = need / previous
+            else:
+                tau = (math.sqrt(max(0.0, previous**2 + 2 * slope * need)) - previous) / slope
+            yield start + tau
+            target += gap()
+        start, previous, expected = start + duration, rate, expected + mass
+
+
+def _outcome(status_code: int) -> str:
+    if status_code in (202, 409):
+        return str(status_code)
+    if status_code >= 500:
+        return "5xx"
+    return "other"
+
+
+def random_order(rng: random.Random) -> dict:
+    size = settings.GRID_SIZE
+    return OrderCreate(
+        user_id=rng.randint(1, 10000),
+        start_x=rng.randint(1, size),
+        start_y=rng.randint(1, size),
+        end_x=rng.randint(1, size),
+        end_y=rng.randint(1, size),
+    ).model_dump(mode="json", exclude_none=True)
+
+
+def profile_schedule(
+    stages: list[Stage], poisson: bool, rng: random.Random
+) -> Iterator[tuple[float, dict]]:
+    for offset in arrivals(stages, poisson, rng):
+        yield offset, random_order(rng)
+
+
+class LoadGenerator:
+    """
+    Sends ``(offset, order)`` schedules open-loop and measures the outcome.
+
+    The schedule is consumed lazily. At most ``concurrency`` orders are in
+    flight; once ``backlog`` more are waiting for a slot, reading the schedule
+    pauses, which bounds memory when the dispatcher (or an unthrottled replay)
+    cannot keep up. Time spent in that pause still counts as latency.
+    """
+
+    def __init__(
+        self,
+        base_url: str,
+        concurrency: int = 256,
+        timeout: float = 10.0,
+        recorder: TraceRecorder | None = None,
+    ) -> None:
+        self.base_url = base_url
+        self.concurrency = max(1, concurrency)
+        self.backlog = 16 * self.concurrency
+        self.timeout = timeout
+        self.recorder = recorder
+        self.latency = LatencyHistogram()
+        self.service_time = LatencyHistogram()
+        self.outcomes: Counter[str] = Counter()
+        self.max_lag_ms = 0.0
+        self.elapsed = 0.0
+
+    async def _send(
+        self, client: httpx.AsyncClient, slots: asyncio.Semaphore, scheduled: float, order: dict
+    ) -> None:
+        async with slots:
+            sent = time.perf_counter()
+            if self.recorder is not None:
+                self.recorder.record(order)
+            try:
+                resp = await client.post(f"{self.base_url}/orders", json=order)
+                outcome = _outcome(resp.status_code)
+            except httpx.HTTPError as exc:
+                outcome = "error"
+                logger.debug(f"Order failed: {exc}")
+            done = time.perf_counter()
+        self.outcomes[outcome] += 1
+        ORDERS_SENT.labels(outcome=outcome).inc()
+        self.latency.record((done - scheduled) * 1e6)
+        self.service_time.record((done - sent) * 1e6)
+
+    async def run(self, schedule: Iterable[tuple[float, dict]], **details: object) -> dict:
+        """Send the whole schedule; returns the summary report, ``details`` included."""
+        slots = asyncio.Semaphore(self.concurrency)
+        limits = httpx.Limits(
+            max_connections=self.concurrency, max_keepalive_connections=self.concurrency
+        )
+        pending: set[asyncio.Task] = set()
+        async with httpx.AsyncClient(limits=limits, timeout=self.timeout) as client:
+            started = time.perf_counter()
+            for offset, order in schedule:
+                if len(pending) >= self.concurrency + self.backlog:
+                    await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+                scheduled = started + offset
+                delay = scheduled - time.perf_counter()
+                if delay > 0:
+                    await asyncio.sleep(delay)
+                else:
+                    self.max_lag_ms = max(self.max_lag_ms, -delay * 1000)
+                task = asyncio.create_task(self._send(client, slots, scheduled, order))
+                pending.add(task)
+                task.add_done_callback(pending.discard)
+            await asyncio.gather(*pending)
+            self.elapsed = time.perf_counter() - started
+        return self.report(**details)
+
+    def report(self, **details: object) -> dict:
+        sent = sum(self.outcomes.values())
+        return {
+            "finished_at": datetime.now(UTC).isoformat(),
+            "target": self.base_url,
+            **details,
+            "concurrency": self.concurrency,
+            "elapsed_sec": round(self.elapsed, 3),
+            "sent": sent,
+            "achieved_rate_per_sec": round(sent / self.elapsed, 2) if self.elapsed else 0.0,
+            "max_schedule_lag_ms": round(self.max_lag_ms, 2),
+            "outcomes": dict(self.outcomes),
+            "latency_us": self.latency.summary(),
+            "service_time_us": self.service_time.summary(),
+        }
+
+
+def load_profile_from_settings() -> list[Stage]:
+    if settings.LOAD_PROFILE:
+        return parse_profile(settings.LOAD_PROFILE)
+    rate = settings.LOAD_RATE_PER_SEC
+    return [(0.0, rate), (settings.LOAD_DURATION_SEC, rate)]
+
+
+async def _run_and_report(schedule: Iterable[tuple[float, dict]], **details: object) -> dict:
+    recorder = TraceRecorder(settings.RECORD_PATH) if settings.RECORD_PATH else None
+    generator = LoadGenerator(
+        settings.DISPATCHER_BASE_URL,
+        concurrency=settings.LOAD_CONCURRENCY,
+        timeout=settings.LOAD_TIMEOUT_SEC,
+        recorder=recorder,
+    )
+    logger.info(f"Starting {settings.CLIENT_MODE} run against {settings.DISPATCHER_BASE_URL}")
+    try:
+        report = await generator.run(schedule, **details)
+    finally:
+        if recorder is not None:
+            recorder.close()
+    if settings.LOAD_REPORT_PATH:
+        Path(settings.LOAD_REPORT_PATH).write_text(json.dumps(report, indent=2))
+    logger.info(f"Run finished: {json.dumps(report)}")
+    return report
+
+
+async def run_load_test() -> dict:
+    """Run one load test configured by the ``LOAD_*`` settings and write its report."""
+    stages = load_profile_from_settings()
+    rng = random.Random(settings.LOAD_SEED)
+    return await _run_and_report(
+        profile_schedule(stages, settings.LOAD_ARRIVALS == "poisson", rng),
+        arrivals=settings.LOAD_ARRIVALS,
+        profile=[{"duration_sec": d, "rate_per_sec": r} for d, r in stages],
+    )
+
+
+async def run_replay() -> dict:
+    """Re-send the trace at ``REPLAY_PATH`` at ``REPLAY_SPEED`` and write the report."""
+    return await _run_and_report(
+        replay_schedule(read_trace(settings.REPLAY_PATH), settings.REPLAY_SPEED),
+        arrivals="replay",
+        trace=settings.REPLAY_PATH,
+        speed=settings.REPLAY_SPEED if settings.REPLAY_SPEED > 0 else "max",
+    )
+
+
+if __name__ == "__main__":
+    run = run_replay if settings.CLIENT_MODE == "replay" else run_load_test
+    print(json.dumps(asyncio.run(run()), indent=2))
@@ -1,6 +1,12 @@
-from fastapi import FastAPI
+import asyncio
+import contextlib
 
+from fastapi import FastAPI, Response
+
+from client_service.app.load import run_load_test, run_replay
+from client_service.app.settings import settings
 from client_service.app.simulator import ClientSimulator
+from common import metrics
 from common.logger import configure_root_logging, get_logger
 
 configure_root_logging(service_name="client")
@@ -10,10 +16,26 @@ log.info("Client app booting")
 simulator = ClientSimulator()
 
 async def lifespan(app: FastAPI):
+    await metrics.event_loop_lag_monitor.start()
+    if settings.CLIENT_MODE in ("load", "replay"):
+        run = run_replay if settings.CLIENT_MODE == "replay" else run_load_test
+        task = asyncio.create_task(run())
+        yield
+        task.cancel()
+        with contextlib.suppress(asyncio.CancelledError):
+            await task
+        await metrics.event_loop_lag_monitor.stop()
+        return
     await simulator.start()
     yield
     await simulator.stop()
+    await metrics.event_loop_lag_monitor.stop()
 
 
 app = FastAPI(title="Client Simulator", lifespan=lifespan)
+app.add_middleware(metrics.RequestMetricsMiddleware)
+
 
+@app.get("/metrics", include_in_schema=False)
+def metrics_endpoint() -> Response:
+    return Response(metrics.render_latest(), media_type=metrics.CONTENT_TYPE_LATEST)
@@ -1,3 +1,5 @@
+from typing import Literal
+
 from pydantic_settings import BaseSettings, SettingsConfigDict
 
 
@@ -5,6 +7,26 @@ class Settings(BaseSettings):
     DISPATCHER_BASE_URL: str = "http://dispatcher:8000"
     FREQUENCY_SECONDS: int = 5
     GRID_SIZE: int = 100
+
+    # "interval": one order every FREQUENCY_SECONDS; "load": open-loop load test;
+    # "replay": re-send the trace at REPLAY_PATH.
+    CLIENT_MODE: Literal["interval", "load", "replay"] = "interval"
+    LOAD_ARRIVALS: Literal["poisson", "constant"] = "poisson"
+    LOAD_RATE_PER_SEC: float = 20.0
+    LOAD_DURATION_SEC: float = 60.0
+    # "duration:rate" stages, e.g. "30:100,120:100"; overrides rate and duration.
+    LOAD_PROFILE: str = ""
+    LOAD_CONCURRENCY: int = 256
+    LOAD_TIMEOUT_SEC: float = 10.0
+    LOAD_SEED: int | None = None
+    LOAD_REPORT_PATH: str = "load_report.json"
+
+    # Append every order sent to this JSONL trace (empty = don't record).
+    RECORD_PATH: str = ""
+    REPLAY_PATH: str = "orders_trace.jsonl"
+    # 1.0 = recorded pace, 10.0 = ten times faster, 0 = as fast as possible.
+    REPLAY_SPEED: float = 1.0
+
     model_config = SettingsConfigDict(env_file=".env", extra="ignore")
 
 
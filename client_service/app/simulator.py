@@ -3,7 +3,9 @@ import random
 
 import httpx
 
+from client_service.app.load import ORDERS_SENT
 from client_service.app.settings import settings
+from client_service.app.traces import TraceRecorder
 from common.schemas import OrderCreate
 from common.logger import get_logger
 logger = get_logger(__name__)
@@ -12,6 +14,7 @@ class ClientSimulator:
     def __init__(self):
         self._running = False
         self._task: asyncio.Task | None = None
+        self._recorder = TraceRecorder(settings.RECORD_PATH) if settings.RECORD_PATH else None
 
     async def _generate_orders(self):
         async with httpx.AsyncClient() as client:
@@ -32,13 +35,17 @@ class ClientSimulator:
 
                 logger.info(f"Sending order: {payload}")
                 logger.info(f"Dispatcher URL: {settings.DISPATCHER_BASE_URL}/orders")
+                if self._recorder is not None:
+                    self._recorder.record(payload)
                 try:
                     resp = await client.post(f"{settings.DISPATCHER_BASE_URL}/orders", json=payload)
+                    ORDERS_SENT.labels(outcome=str(resp.status_code)).inc()
                     if resp.status_code == 202:
                         logger.info(f"Order created: {payload}")
                     else:
                         logger.error(f"Failed to create order: {resp.status_code} {resp.text}")
                 except Exception as e:
+                    ORDERS_SENT.labels(outcome="error").inc()
                     logger.error(f"Error sending order: {e}")
 
                 await asyncio.sleep(settings.FREQUENCY_SECONDS)
@@ -56,3 +63,5 @@ class ClientSimulator:
             if self._task:
                 await self._task
                 self._task = None
+            if self._recorder is not None:
+                self._recorder.close()
@@ -0,0 +1,65 @@
+"""
+Order traces: one JSON object per line, ``{"ts": <unix seconds>, "order": {...}}``.
+
+Traces are written as orders are sent and read back lazily, line by line, so
+a replay never holds more than one line of a (possibly multi-GB) file in memory.
+"""
+
+from __future__ import annotations
+
+import json
+import time
+from collections.abc import Iterator
+from pathlib import Path
+from typing import TextIO
+
+from common.logger import get_logger
+
+logger = get_logger(__name__)
+
+
+class TraceRecorder:
+    """Appends every order sent to a JSONL trace."""
+
+    def __init__(self, path: str | Path) -> None:
+        self.path = Path(path)
+        self._file: TextIO | None = None
+
+    def record(self, order: dict, ts: float | None = None) -> None:
+        if self._file is None:
+            self.path.parent.mkdir(parents=True, exist_ok=True)
+            self._file = self.path.open("a", encoding="utf-8")
+        line = {"ts": time.time() if ts is None else ts, "order": order}
+        self._file.write(json.dumps(line, separators=(",", ":")) + "\n")
+
+    def close(self) -> None:
+        if self._file is not None:
+            self._file.close()
+            self._file = None
+
+
+def read_trace(path: str | Path) -> Iterator[tuple[float, dict]]:
+    """``(ts, order)`` for every line of the trace; blank and malformed lines are skipped."""
+    with Path(path).open(encoding="utf-8") as trace:
+        for number, line in enumerate(trace, start=1):
+            if not line.strip():
+                continue
+            try:
+                item = json.loads(line)
+                yield float(item["ts"]), item["order"]
+            except (ValueError, KeyError, TypeError) as exc:
+                logger.warning(f"Skipping line {number} of trace {path}: {exc}")
+
+
+def replay_schedule(
+    trace: Iterator[tuple[float, dict]], speed: float
+) -> Iterator[tuple[float, dict]]:
+    """
+    ``(offset, order)`` pairs with the trace's gaps divided by ``speed``;
+    ``speed <= 0`` sends everything as fast as possible.
+    """
+    first: float | None = None
+    for ts, order in trace:
+        if first is None:
+            first = ts
+        yield ((ts - first) / speed if speed > 0 else 0.0), order
@@ -0,0 +1,58 @@
+import itertools
+import random
+
+import pytest
+
+from client_service.app.load import arrivals, parse_profile
+
+
+def test_parse_profile_reads_duration_rate_stages():
+    # ACT
+    stages = parse_profile("30:10, 60:100")
+
+    # ASSERT
+    assert stages == [(30.0, 10.0), (60.0, 100.0)]
+
+
+def test_parse_profile_rejects_negative_values():
+    # ACT & ASSERT
+    with pytest.raises(ValueError, match="Negative"):
+        parse_profile("30:10,-5:100")
+
+
+def test_constant_arrivals_are_evenly_spaced():
+    # ARRANGE
+    stages = [(0.0, 10.0), (1.0, 10.0)]
+
+    # ACT
+    sent = list(arrivals(stages, poisson=False, rng=random.Random(0)))
+
+    # ASSERT
+    assert sent == pytest.approx([n / 10 for n in range(1, 11)])
+
+
+def test_ramp_arrivals_follow_the_integral_of_the_rate():
+    # ARRANGE: 0 -> 10/s over 2 s, so n orders are due by sqrt(n / 2.5) seconds.
+    stages = [(2.0, 10.0)]
+
+    # ACT
+    sent = list(arrivals(stages, poisson=False, rng=random.Random(0)))
+
+    # ASSERT
+    assert sent == pytest.approx([(n / 2.5) ** 0.5 for n in range(1, 11)])
+
+
+def test_poisson_arrivals_match_the_rate_on_average():
+    # ARRANGE
+    stages = [(0.0, 100.0), (100.0, 100.0)]
+
+    # ACT
+    sent = list(arrivals(stages, poisson=True, rng=random.Random(42)))
+
+    # ASSERT
+    gaps = [b - a for a, b in itertools.pairwise(sent)]
+    assert 0 < sent[0]
+    assert sent[-1] <= 100.0
+    assert len(sent) == pytest.approx(10_000, rel=0.03)
+    assert min(gaps) >= 0
+    assert max(gaps) > 5 * min(gaps)
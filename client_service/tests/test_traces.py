@@ -0,0 +1,61 @@
+import pytest
+
+from client_service.app.traces import TraceRecorder, read_trace, replay_schedule
+
+ORDER = {"user_id": 1, "start_x": 1, "start_y": 2, "end_x": 3, "end_y": 4}
+
+
+def test_recorded_trace_reads_back_in_order(tmp_path):
+    # ARRANGE
+    path = tmp_path / "traces" / "orders.jsonl"
+    recorder = TraceRecorder(path)
+
+    # ACT
+    recorder.record(ORDER, ts=100.0)
+    recorder.record({**ORDER, "user_id": 2}, ts=100.5)
+    recorder.close()
+
+    # ASSERT
+    assert list(read_trace(path)) == [(100.0, ORDER), (100.5, {**ORDER, "user_id": 2})]
+
+
+def test_read_trace_skips_blank_and_malformed_lines(tmp_path):
+    # ARRANGE
+    path = tmp_path / "orders.jsonl"
+    path.write_text(
+        '{"ts": 1, "order": {"user_id": 1}}\n'
+        "\n"
+        "not json\n"
+        '{"order": {"user_id": 2}}\n'
+        '{"ts": "soon", "order": {"user_id": 3}}\n'
+        '{"ts": 2, "order": {"user_id": 4}}\n'
+    )
+
+    # ACT
+    trace = list(read_trace(path))
+
+    # ASSERT
+    assert trace == [(1.0, {"user_id": 1}), (2.0, {"user_id": 4})]
+
+
+def test_replay_schedule_divides_gaps_by_speed():
+    # ARRANGE
+    trace = [(50.0, {"n": 1}), (51.0, {"n": 2}), (54.0, {"n": 3})]
+
+    # ACT
+    schedule = list(replay_schedule(iter(trace), speed=2.0))
+
+    # ASSERT
+    assert schedule == [(0.0, {"n": 1}), (0.5, {"n": 2}), (2.0, {"n": 3})]
+
+
+@pytest.mark.parametrize("speed", [0.0, -1.0])
+def test_replay_schedule_without_speed_sends_everything_at_once(speed):
+    # ARRANGE
+    trace = [(50.0, {"n": 1}), (51.0, {"n": 2}), (54.0, {"n": 3})]
+
+    # ACT
+    offsets = [offset for offset, _ in replay_schedule(iter(trace), speed=speed)]
+
+    # ASSERT
+    assert offsets == [0.0, 0.0, 0.0]
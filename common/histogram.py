@@ -0,0 +1,82 @@
+"""
+HDR-style latency histogram.
+
+Values are recorded as integers (microseconds for latencies) into log-linear
+buckets: every power of two is split into ``2 ** (sub_bucket_bits - 1)`` equal
+sub-buckets, so any recorded value is reported within ``2 ** -(sub_bucket_bits
+- 1)`` of its true value (under 1% with the default 8 bits) at a few KB of
+memory, however many values are recorded and however wide their range.
+"""
+
+from __future__ import annotations
+
+from collections.abc import Iterable
+
+
+class LatencyHistogram:
+    def __init__(self, sub_bucket_bits: int = 8) -> None:
+        self._bits = max(2, sub_bucket_bits)
+        self._half = 1 << (self._bits - 1)
+        self._counts: dict[int, int] = {}
+        self.count = 0
+        self.total = 0
+        self.min: int | None = None
+        self.max = 0
+
+    def _index(self, value: int) -> int:
+        if value < 1 << self._bits:
+            return value
+        shift = value.bit_length() - self._bits
+        return (shift << (self._bits - 1)) + (value >> shift)
+
+    def _highest_equivalent(self, index: int) -> int:
+        if index < 1 << self._bits:
+            return index
+        shift = (index >> (self._bits - 1)) - 1
+        sub = index - (shift << (self._bits - 1))
+        return ((sub + 1) << shift) - 1
+
+    def record(self, value: float, count: int = 1) -> None:
+        value = max(0, round(value))
+        index = self._index(value)
+        self._counts[index] = self._counts.get(index, 0) + count
+        self.count += count
+        self.total += value * count
+        self.min = value if self.min is None else min(self.min, value)
+        self.max = max(self.max, value)
+
+    def merge(self, other: LatencyHistogram) -> None:
+        if other._bits != self._bits:
+            raise ValueError("Histograms with different precision cannot be merged")
+        for index, count in other._counts.items():
+            self._counts[index] = self._counts.get(index, 0) + count
+        self.count += other.count
+        self.total += other.total
+        if other.min is not None:
+            self.min = other.min if self.min is None else min(self.min, other.min)
+        self.max = max(self.max, other.max)
+
+    @property
+    def mean(self) -> float:
+        return self.total / self.count if self.count else 0.0
+
+    def percentile(self, pct: float) -> int:
+        """Smallest recorded value (bucket upper bound) covering ``pct`` percent of the values."""
+        if not self.count:
+            return 0
+        rank = max(1, round(pct / 100 * self.count))
+        seen = 0
+        for index in sorted(self._counts):
+            seen += self._counts[index]
+            if seen >= rank:
+                return min(self._highest_equivalent(index), self.max)
+        return self.max
+
+    def summary(self, percentiles: Iterable[float] = (50, 90, 99, 99.9)) -> dict:
+        return {
+            "count": self.count,
+            "min": self.min or 0,
+            "mean": round(self.mean, 1),
+            **{f"p{pct:g}": self.percentile(pct) for pct in percentiles},
+            "max": self.max,
+        }
@@ -0,0 +1,352 @@
+from __future__ import annotations
+
+import abc
+import asyncio
+import math
+import time
+from collections.abc import Awaitable, Callable, Iterator, MutableMapping, Sequence
+from contextlib import contextmanager
+from typing import Any, Self
+
+CONTENT_TYPE_LATEST = "text/plain; version=0.0.4; charset=utf-8"
+
+DEFAULT_LATENCY_BUCKETS = (
+    0.001,
+    0.0025,
+    0.005,
+    0.01,
+    0.025,
+    0.05,
+    0.1,
+    0.25,
+    0.5,
+    1.0,
+    2.5,
+    5.0,
+    10.0,
+)
+
+
+def _format_value(value: float) -> str:
+    if value == math.inf:
+        return "+Inf"
+    if float(value).is_integer():
+        return str(int(value))
+    return repr(float(value))
+
+
+def _format_labels(names: Sequence[str], values: Sequence[str], extra: str = "") -> str:
+    parts = [f'{n}="{_escape(v)}"' for n, v in zip(names, values, strict=True)]
+    if extra:
+        parts.append(extra)
+    return "{" + ",".join(parts) + "}" if parts else ""
+
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+class _Metric(abc.ABC):
+    kind = ""
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = ()) -> None:
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._children: dict[tuple[str, ...], Self] = {}
+        self._labelvalues: tuple[str, ...] = ()
+
+    def labels(self, *values: object, **kwargs: object) -> Self:
+        if kwargs:
+            values = tuple(kwargs[name] for name in self.labelnames)
+        key = tuple(str(v) for v in values)
+        if len(key) != len(self.labelnames):
+            raise ValueError(f"{self.name} expects labels {self.labelnames}")
+        child = self._children.get(key)
+        if child is None:
+            child = self._new_child()
+            child._labelvalues = key
+            self._children[key] = child
+        return child
+
+    @abc.abstractmethod
+    def _new_child(self) -> Self: ...
+
+    def _series(self) -> Iterator[_Metric]:
+        if self.labelnames:
+            yield from self._children.values()
+        else:
+            yield self
+
+    def render(self) -> str:
+        lines = [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} {self.kind}"]
+        for series in self._series():
+            lines.extend(series._samples_for(self))
+        return "\n".join(lines)
+
+    @abc.abstractmethod
+    def _samples_for(self, parent: _Metric) -> Iterator[str]: ...
+
+
+class Counter(_Metric):
+    kind = "counter"
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = ()) -> None:
+        super().__init__(name, documentation, labelnames)
+        self.value = 0.0
+
+    def _new_child(self) -> Counter:
+        return Counter(self.name, self.documentation)
+
+    def inc(self, amount: float = 1.0) -> None:
+        if amount < 0:
+            raise ValueError("Counters can only increase")
+        self.value += amount
+
+    def _samples_for(self, parent: _Metric) -> Iterator[str]:
+        labels = _format_labels(parent.labelnames, self._labelvalues)
+        yield f"{parent.name}_total{labels} {_format_value(self.value)}"
+
+
+class Gauge(_Metric):
+    kind = "gauge"
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = ()) -> None:
+        super().__init__(name, documentation, labelnames)
+        self.value = 0.0
+        self._function: Callable[[], float] | None = None
+
+    def _new_child(self) -> Gauge:
+        return Gauge(self.name, self.documentation)
+
+    def set(self, value: float) -> None:
+        self.value = float(value)
+
+    def inc(self, amount: float = 1.0) -> None:
+        self.value += amount
+
+    def dec(self, amount: float = 1.0) -> None:
+        self.value -= amount
+
+    def set_function(self, function: Callable[[], float]) -> None:
+        """Read the value from ``function`` at scrape time."""
+        self._function = function
+
+    def get(self) -> float:
+        return float(self._function()) if self._function is not None else self.value
+
+    def _samples_for(self, parent: _Metric) -> Iterator[str]:
+        labels = _format_labels(parent.labelnames, self._labelvalues)
+        yield f"{parent.name}{labels} {_format_value(self.get())}"
+
+
+class Histogram(_Metric):
+    kind = "histogram"
+
+    def __init__(
+        self,
+        name: str,
+        documentation: str,
+        labelnames: Sequence[str] = (),
+        buckets: Sequence[float] = DEFAULT_LATENCY_BUCKETS,
+    ) -> None:
+        super().__init__(name, documentation, labelnames)
+        self.buckets = tuple(sorted(buckets))
+        if not self.buckets or self.buckets[-1] != math.inf:
+            self.buckets += (math.inf,)
+        self.counts = [0] * len(self.buckets)
+        self.sum = 0.0
+        self.count = 0
+
+    def _new_child(self) -> Histogram:
+        return Histogram(self.name, self.documentation, buckets=self.buckets)
+
+    def observe(self, value: float) -> None:
+        self.sum += value
+        self.count += 1
+        for i, bound in enumerate(self.buckets):
+            if value <= bound:
+                self.counts[i] += 1
+                break
+
+    @contextmanager
+    def time(self) -> Iterator[None]:
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(time.perf_counter() - started)
+
+    def _samples_for(self, parent: _Metric) -> Iterator[str]:
+        cumulative = 0
+        for bound, count in zip(self.buckets, self.counts, strict=True):
+            cumulative += count
+            labels = _format_labels(
+                parent.labelnames, self._labelvalues, f'le="{_format_value(bound)}"'
+            )
+            yield f"{parent.name}_bucket{labels} {cumulative}"
+        labels = _format_labels(parent.labelnames, self._labelvalues)
+        yield f"{parent.name}_sum{labels} {_format_value(self.sum)}"
+        yield f"{parent.name}_count{labels} {self.count}"
+
+
+class Registry:
+    def __init__(self) -> None:
+        self._metrics: dict[str, _Metric] = {}
+
+    def _get_or_create(self, cls: type[_Metric], name: str, *args: object, **kwargs: object):
+        metric = self._metrics.get(name)
+        if metric is None:
+            metric = cls(name, *args, **kwargs)  # type: ignore[arg-type]
+            self._metrics[name] = metric
+        elif not isinstance(metric, cls):
+            raise ValueError(f"Metric {name} already registered as {metric.kind}")
+        return metric
+
+    def counter(self, name: str, documentation: str, labelnames: Sequence[str] = ()) -> Counter:
+        return self._get_or_create(Counter, name, documentation, labelnames)
+
+    def gauge(self, name: str, documentation: str, labelnames: Sequence[str] = ()) -> Gauge:
+        return self._get_or_create(Gauge, name, documentation, labelnames)
+
+    def histogram(
+        self,
+        name: str,
+        documentation: str,
+        labelnames: Sequence[str] = (),
+        buckets: Sequence[float] = DEFAULT_LATENCY_BUCKETS,
+    ) -> Histogram:
+        return self._get_or_create(Histogram, name, documentation, labelnames, buckets=buckets)
+
+    def get(self, name: str) -> _Metric | None:
+        return self._metrics.get(name)
+
+    def render(self) -> str:
+        """Prometheus text exposition format."""
+        return "\n".join(metric.render() for metric in self._metrics.values()) + "\n"
+
+
+REGISTRY = Registry()
+
+counter = REGISTRY.counter
+gauge = REGISTRY.gauge
+histogram = REGISTRY.histogram
+
+
+def render_latest(registry: Registry = REGISTRY) -> str:
+    return registry.render()
+
+
+# --- shared instrumentation --------------------------------------------------
+
+Scope = MutableMapping[str, Any]
+Message = MutableMapping[str, Any]
+Receive = Callable[[], Awaitable[Message]]
+Send = Callable[[Message], Awaitable[None]]
+ASGIApp = Callable[[Scope, Receive, Send], Awaitable[None]]
+
+
+class RequestMetricsMiddleware:
+    """
+    ASGI middleware timing every HTTP request by method, route template and status.
+
+    The route is the template the router matched (``/orders/{trip_id}``), so
+    label cardinality stays bounded; requests no route matched are ``unmatched``.
+    Streaming responses are timed until their last chunk is sent.
+    """
+
+    def __init__(self, app: ASGIApp, registry: Registry = REGISTRY) -> None:
+        self.app = app
+        self._latency = registry.histogram(
+            "http_request_duration_seconds",
+            "HTTP request latency by method, route template and status.",
+            ["method", "route", "status"],
+        )
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        status = 500
+
+        async def send_with_status(message: Message) -> None:
+            nonlocal status
+            if message["type"] == "http.response.start":
+                status = message["status"]
+            await send(message)
+
+        started = time.perf_counter()
+        try:
+            await self.app(scope, receive, send_with_status)
+        finally:
+            route = scope.get("route")
+            template = getattr(route, "path", None)
+            self._latency.labels(
+                method=scope["method"],
+                route=(template or "/") if route is not None else "unmatched",
+                status=status,
+            ).observe(time.perf_counter() - started)
+
+
+class EventLoopLagMonitor:
+    """
+    Samples event-loop lag: how much later than asked a ``sleep(interval)``
+    wakes up, i.e. how long ready callbacks waited for a busy loop.
+    """
+
+    def __init__(self, interval: float = 0.5, registry: Registry = REGISTRY) -> None:
+        self.interval = max(0.01, interval)
+        self._lag = registry.gauge(
+            "event_loop_lag_seconds", "Event-loop lag measured by the last sample."
+        )
+        self._max_lag = registry.gauge(
+            "event_loop_lag_max_seconds", "Largest event-loop lag seen since start."
+        )
+        self._task: asyncio.Task | None = None
+
+    @property
+    def running(self) -> bool:
+        return self._task is not None and not self._task.done()
+
+    async def start(self) -> None:
+        if not self.running:
+            self._task = asyncio.create_task(self._run())
+
+    async def stop(self) -> None:
+        if self._task is not None:
+            self._task.cancel()
+            await asyncio.gather(self._task, return_exceptions=True)
+            self._task = None
+
+    async def _run(self) -> None:
+        loop = asyncio.get_running_loop()
+        while True:
+            started = loop.time()
+            await asyncio.sleep(self.interval)
+            lag = max(0.0, loop.time() - started - self.interval)
+            self._lag.set(lag)
+            if lag > self._max_lag.get():
+                self._max_lag.set(lag)
+
+
+event_loop_lag_monitor = EventLoopLagMonitor()
+
+
+def track_db_pool(pool: object, registry: Registry = REGISTRY) -> None:
+    """
+    Gauges of a SQLAlchemy connection pool, read at scrape time. Pools without
+    the counters (``StaticPool``, ``NullPool``) report zeros.
+    """
+    connections = registry.gauge(
+        "db_pool_connections", "Database pool connections by state.", ["state"]
+    )
+
+    def stat(name: str) -> Callable[[], float]:
+        return lambda: max(0, getattr(pool, name, lambda: 0)())
+
+    connections.labels(state="checked_out").set_function(stat("checkedout"))
+    connections.labels(state="idle").set_function(stat("checkedin"))
+    connections.labels(state="overflow").set_function(stat("overflow"))
+    registry.gauge("db_pool_size", "Configured size of the database pool.").set_function(
+        stat("size")
+    )
@@ -2,9 +2,10 @@ from __future__ import annotations
 
 from datetime import datetime
 from enum import Enum
+from typing import Annotated, Literal
 from uuid import UUID
 
-from pydantic import BaseModel, ConfigDict, Field, HttpUrl
+from pydantic import BaseModel, ConfigDict, Field, HttpUrl, model_validator
 
 
 class TaxiStatus(str, Enum):
@@ -40,11 +41,74 @@ class TaxiCount(BaseModel):
     status: TaxiStatus
 
 
+class FleetStats(BaseModel):
+    taxis: dict[TaxiStatus, int]
+    trips: dict[TripStatus, int]
+    reconciled_at: datetime | None = None
+
+
+class MetricStats(BaseModel):
+    count: int
+    sum: float
+    mean: float | None = None
+    p50: float | None = None
+    p95: float | None = None
+    p99: float | None = None
+
+
+class TripRollupRow(BaseModel):
+    minute: datetime | None = None
+    cell_x: int | None = None
+    cell_y: int | None = None
+    waiting_time_min: MetricStats
+    travel_time_min: MetricStats
+    total_distance: MetricStats
+
+
+class TripRollupResult(BaseModel):
+    since: datetime
+    until: datetime
+    cell_size: int
+    rows: list[TripRollupRow]
+
+
+class Heatmaps(BaseModel):
+    size: int
+    since: datetime
+    until: datetime
+    # name -> row-major size*size cells, cell (x, y) at (y - 1) * size + (x - 1)
+    layers: dict[str, list[float | None]]
+
+
 class TaxiHeartbeat(BaseModel):
     taxi_public_id: UUID
     timestamp: datetime
 
 
+class TaxiHeartbeatItem(TaxiHeartbeat):
+    """One entry of a bulk heartbeat; the position is optional but needs both coordinates."""
+
+    x: int | None = Field(None, ge=1, le=100)
+    y: int | None = Field(None, ge=1, le=100)
+
+    @model_validator(mode="after")
+    def _position_complete(self) -> TaxiHeartbeatItem:
+        if (self.x is None) != (self.y is None):
+            raise ValueError("x and y must be given together")
+        return self
+
+
+class BulkItemRejected(BaseModel):
+    index: int
+    reason: str
+    detail: str | None = None
+
+
+class TaxiHeartbeatBatchResult(BaseModel):
+    accepted: int
+    rejected: list[BulkItemRejected] = Field(default_factory=list)
+
+
 class TaxiDeregister(BaseModel):
     taxi_public_id: UUID
 
@@ -55,6 +119,8 @@ class OrderCreate(BaseModel):
     start_y: int = Field(..., ge=1, le=100)
     end_x: int = Field(..., ge=1, le=100)
     end_y: int = Field(..., ge=1, le=100)
+    # How long the order may wait for a taxi when none is free; None = server default.
+    max_wait_sec: int | None = Field(None, ge=0, le=3600)
 
 
 class TripRead(BaseModel):
@@ -74,6 +140,7 @@ class TripRead(BaseModel):
     travel_time_min: int | None = None
     total_distance: int | None = None
     route_meta: dict | None = None
+    deadline_at: datetime | None = None
 
 
 class AssignPayload(BaseModel):
@@ -84,6 +151,13 @@ class AssignPayload(BaseModel):
     end_y: int
 
 
+class RepositionPayload(BaseModel):
+    """Order for an idle taxi to drive to ``(x, y)`` and report its position there."""
+
+    x: int = Field(ge=1, le=100)
+    y: int = Field(ge=1, le=100)
+
+
 class TaxiPickupEvent(BaseModel):
     trip_id: int
     taxi_public_id: UUID
@@ -96,3 +170,34 @@ class TaxiDeliveredEvent(BaseModel):
     dropoff_time: datetime
     end_x: int
     end_y: int
+
+
+class TaxiPickupEventItem(TaxiPickupEvent):
+    type: Literal["pickup"] = "pickup"
+
+
+class TaxiDeliveredEventItem(TaxiDeliveredEvent):
+    type: Literal["delivered"] = "delivered"
+
+
+TripEventItem = Annotated[TaxiPickupEventItem | TaxiDeliveredEventItem, Field(discriminator="type")]
+
+
+class TripEventOutcome(str, Enum):
+    APPLIED = "applied"
+    DUPLICATE = "duplicate"
+    IGNORED = "ignored"
+    NOT_FOUND = "not_found"
+    INVALID = "invalid"
+
+
+class TripEventResult(BaseModel):
+    index: int
+    outcome: TripEventOutcome
+    trip_id: int | None = None
+    type: str | None = None
+    detail: str | None = None
+
+
+class TripEventBatchResult(BaseModel):
+    results: list[TripEventResult]
@@ -1,17 +1,121 @@
+import time
+import uuid
+from collections.abc import AsyncIterator, Callable, Collection, Iterator, Sequence
 from datetime import UTC, datetime, timedelta
 
-from sqlalchemy import Select, func, select, update
+from sqlalchemy import (
+    ColumnClause,
+    ColumnElement,
+    DateTime,
+    FromClause,
+    Integer,
+    Row,
+    Select,
+    case,
+    column,
+    exists,
+    func,
+    literal,
+    select,
+    union_all,
+    update,
+    values,
+)
 from sqlalchemy.exc import SQLAlchemyError
-from sqlalchemy.orm import Session
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import aliased, joinedload
 
 from common import schemas
 from common.schemas import TaxiDeliveredEvent, TaxiPickupEvent
+from dispatcher_service.app.adapters.database import run_after_commit
+from dispatcher_service.app.adapters.fleet_snapshot import (
+    UNTRACKED,
+    record_taxi_change,
+    record_trip_change,
+)
 from dispatcher_service.app.domain import models
+from dispatcher_service.app.domain.fleet_counters import fleet_counters
+from dispatcher_service.app.domain.matching import eta_after_current_trip, manhattan
 from dispatcher_service.app.domain.models import Taxi, TaxiStatus, Trip, TripStatus
+from dispatcher_service.app.domain.spatial_index import available_taxi_index
+from dispatcher_service.app.domain.timing_wheel import taxi_expiry_wheel
+from dispatcher_service.app.domain.trip_rollups import trip_rollups
 from dispatcher_service.app.domain.utils import as_utc
+from dispatcher_service.app.settings import settings
 
 
-def create_taxi(db: Session, taxi_in: schemas.TaxiCreate) -> models.Taxi:
+def _index_taxi_after_commit(db: AsyncSession, taxi: models.Taxi) -> None:
+    taxi_id, x, y = taxi.id, taxi.x, taxi.y
+    run_after_commit(db, lambda: available_taxi_index.add(taxi_id, x, y))
+
+
+def _unindex_taxi_after_commit(db: AsyncSession, taxi: models.Taxi) -> None:
+    taxi_id = taxi.id
+    run_after_commit(db, lambda: available_taxi_index.discard(taxi_id))
+
+
+def _count_taxis_after_commit(
+    db: AsyncSession, old: TaxiStatus | None, new: TaxiStatus, count: int = 1
+) -> None:
+    if old != new and count:
+        run_after_commit(db, lambda: fleet_counters.taxi_transition(old, new, count))
+
+
+def _rollup_trip_after_commit(db: AsyncSession, trip: models.Trip) -> None:
+    dropoff_time, start_x, start_y = trip.dropoff_time, trip.start_x, trip.start_y
+    values = _rollup_values(trip)
+    run_after_commit(db, lambda: trip_rollups.record(dropoff_time, start_x, start_y, values))
+
+
+def _rollup_values(trip: models.Trip) -> dict[str, float | None]:
+    return {
+        "waiting_time_min": trip.waiting_time_min,
+        "travel_time_min": trip.travel_time_min,
+        "total_distance": trip.total_distance,
+    }
+
+
+def _count_trips_after_commit(db: AsyncSession, old: TripStatus | None, new: TripStatus) -> None:
+    if old != new:
+        run_after_commit(db, lambda: fleet_counters.trip_transition(old, new))
+
+
+async def count_fleet_by_status(
+    db: AsyncSession,
+) -> tuple[list[tuple[TaxiStatus, int]], list[tuple[TripStatus, int]]]:
+    """``(status, count)`` of taxis and of trips, straight from the database."""
+    taxis = (await db.execute(select(Taxi.status, func.count()).group_by(Taxi.status))).all()
+    trips = (await db.execute(select(Trip.status, func.count()).group_by(Trip.status))).all()
+    return [tuple(row) for row in taxis], [tuple(row) for row in trips]
+
+
+async def ensure_fleet_counters(db: AsyncSession) -> None:
+    """Load the status counters on first use; afterwards they are kept up to date in memory."""
+    if not fleet_counters.loaded:
+        fleet_counters.reset(*await count_fleet_by_status(db))
+
+
+async def recent_order_origins(db: AsyncSession, since: datetime) -> list[tuple[int, int]]:
+    stmt = select(Trip.start_x, Trip.start_y).where(Trip.request_time >= since)
+    return [tuple(row) for row in (await db.execute(stmt)).all()]
+
+
+async def idle_taxi_callbacks(db: AsyncSession) -> list[tuple[int, int, int, str]]:
+    """``(id, x, y, callback_url)`` of every available taxi."""
+    stmt = select(Taxi.id, Taxi.x, Taxi.y, Taxi.callback_url).where(
+        Taxi.status == TaxiStatus.AVAILABLE
+    )
+    return [tuple(row) for row in (await db.execute(stmt)).all()]
+
+
+async def load_available_taxi_index(db: AsyncSession) -> None:
+    stmt = select(models.Taxi.id, models.Taxi.x, models.Taxi.y).where(
+        models.Taxi.status == models.TaxiStatus.AVAILABLE
+    )
+    available_taxi_index.rebuild((await db.execute(stmt)).all())
+
+
+async def create_taxi(db: AsyncSession, taxi_in: schemas.TaxiCreate) -> models.Taxi:
     taxi = models.Taxi(
         x=taxi_in.x,
         y=taxi_in.y,
@@ -20,24 +124,135 @@ def create_taxi(db: Session, taxi_in: schemas.TaxiCreate) -> models.Taxi:
     )
     try:
         db.add(taxi)
-        db.commit()
-        db.refresh(taxi)
+        _count_taxis_after_commit(db, None, models.TaxiStatus.AVAILABLE)
+        await db.commit()
+        await db.refresh(taxi)
+        available_taxi_index.add(taxi.id, taxi.x, taxi.y)
+        # A fresh taxi gets one TTL to send its first heartbeat.
+        taxi_expiry_wheel.schedule(taxi.id, time.time() + settings.HEARTBEAT_TTL_SEC)
         return taxi
     except SQLAlchemyError:
-        db.rollback()
+        await db.rollback()
         raise
 
 
-def update_taxi_heartbeat(db: Session, taxi: models.Taxi, ts: datetime) -> None:
-    ts_utc = ts if ts.tzinfo else ts.replace(tzinfo=UTC)
-    taxi.last_seen_at = ts_utc.astimezone(UTC)
-    if taxi.status == models.TaxiStatus.OFFLINE:
-        taxi.status = models.TaxiStatus.AVAILABLE
-    db.add(taxi)
+async def get_taxi_id_by_public_id(db: AsyncSession, public_id: str | uuid.UUID) -> int | None:
+    return await db.scalar(select(models.Taxi.id).where(models.Taxi.public_id == public_id))
+
+
+async def get_taxi_ids_by_public_ids(
+    db: AsyncSession, public_ids: Collection[uuid.UUID]
+) -> dict[uuid.UUID, int]:
+    if not public_ids:
+        return {}
+    stmt = select(models.Taxi.public_id, models.Taxi.id).where(
+        models.Taxi.public_id.in_(public_ids)
+    )
+    return {public_id: taxi_id for public_id, taxi_id in (await db.execute(stmt)).all()}
+
+
+# SQLite caps compound SELECTs at 500 terms.
+_SQLITE_MAX_ROWS = 500
 
 
-def deregister_taxi_by_public_id(db: Session, public_id: str) -> bool:
-    taxi = get_taxi_by_public_id(db, public_id)
+def _rows_source(
+    db: AsyncSession, name: str, columns: Sequence[ColumnClause], rows: Sequence[tuple]
+) -> FromClause:
+    """``(VALUES ...) AS name (columns)`` usable as the FROM of a set-based statement."""
+    if db.get_bind().dialect.name == "postgresql":
+        return values(*columns, name=name).data(list(rows))
+    # Portable fallback for dialects without a VALUES table constructor (tests run on SQLite).
+    return union_all(
+        *(
+            select(*(literal(v, c.type).label(c.name) for c, v in zip(columns, row, strict=True)))
+            for row in rows
+        )
+    ).subquery(name)
+
+
+def _row_chunks(db: AsyncSession, rows: Sequence[tuple]) -> Iterator[Sequence[tuple]]:
+    size = len(rows)
+    if db.get_bind().dialect.name != "postgresql":
+        size = min(size, _SQLITE_MAX_ROWS)
+    for start in range(0, len(rows), max(1, size)):
+        yield rows[start : start + size]
+
+
+async def bulk_update_heartbeats(
+    db: AsyncSession,
+    beats: Sequence[tuple[int, datetime, int | None, int | None]],
+    on_revived: Callable[[], None] | None = None,
+) -> int:
+    """
+    Write the latest heartbeat (and optional position) of many taxis with
+    ``UPDATE ... FROM (VALUES ...)``; rows are ``(taxi_id, ts, x, y)``.
+
+    OFFLINE taxis are first revived to AVAILABLE by a primary-key UPDATE that only
+    touches them, so the status counters know exactly which taxis came back. Does
+    not commit; the spatial index follows revived and moved taxis once the caller
+    commits, and ``on_revived`` runs then if any taxi came back. Plain
+    ``last_seen_at`` refreshes leave the fleet snapshot version alone.
+
+    Positions are ignored for BUSY taxis, whose cell is owned by trip events, and
+    for heartbeats sent before the taxi's latest drop-off: a beat buffered before
+    ``events/delivered`` must not move the taxi back to where it was.
+    """
+    columns = (
+        column("id", Integer),
+        column("ts", DateTime(timezone=True)),
+        column("x", Integer),
+        column("y", Integer),
+    )
+    updated = 0
+    for chunk in _row_chunks(db, beats):
+        revive = (
+            update(models.Taxi)
+            .where(
+                models.Taxi.id.in_([row[0] for row in chunk]),
+                models.Taxi.status == models.TaxiStatus.OFFLINE,
+            )
+            .values(status=models.TaxiStatus.AVAILABLE)
+            .returning(models.Taxi.id)
+            .execution_options(**{UNTRACKED: True})
+        )
+        revived = set((await db.execute(revive)).scalars().all())
+        _count_taxis_after_commit(
+            db, models.TaxiStatus.OFFLINE, models.TaxiStatus.AVAILABLE, len(revived)
+        )
+        if revived and on_revived is not None:
+            run_after_commit(db, on_revived)
+        hb = _rows_source(db, "hb", columns, chunk)
+        keep_position = (models.Taxi.status == models.TaxiStatus.BUSY) | exists().where(
+            Trip.taxi_id == models.Taxi.id, Trip.dropoff_time >= hb.c.ts
+        )
+        stmt = (
+            update(models.Taxi)
+            .where(models.Taxi.id == hb.c.id)
+            .values(
+                last_seen_at=hb.c.ts,
+                x=case((keep_position, models.Taxi.x), else_=func.coalesce(hb.c.x, models.Taxi.x)),
+                y=case((keep_position, models.Taxi.y), else_=func.coalesce(hb.c.y, models.Taxi.y)),
+            )
+            .returning(models.Taxi.id, models.Taxi.x, models.Taxi.y, models.Taxi.status)
+            .execution_options(**{UNTRACKED: True})
+        )
+        reported = {taxi_id for taxi_id, _, x, _ in chunk if x is not None}
+        for taxi_id, x, y, status in (await db.execute(stmt)).all():
+            updated += 1
+            reindex = status == models.TaxiStatus.AVAILABLE and (
+                available_taxi_index.position(taxi_id) != (x, y)
+            )
+            moved = taxi_id in reported and status != models.TaxiStatus.BUSY
+            if reindex or moved or taxi_id in revived:
+                # Revived or moved: visible in the fleet snapshot.
+                record_taxi_change(db, taxi_id, status, x, y)
+            if reindex:
+                run_after_commit(db, lambda t=taxi_id, x=x, y=y: available_taxi_index.add(t, x, y))
+    return updated
+
+
+async def deregister_taxi_by_public_id(db: AsyncSession, public_id: str) -> bool:
+    taxi = await get_taxi_by_public_id(db, public_id)
     if not taxi:
         return False
     mark_taxi_offline(db, taxi)
@@ -45,61 +260,336 @@ def deregister_taxi_by_public_id(db: Session, public_id: str) -> bool:
     return True
 
 
-def sweep_offline_taxis(db: Session, ttl_sec: int) -> int:
+_ONLINE_STATUSES = (models.TaxiStatus.AVAILABLE, models.TaxiStatus.BUSY)
+
+
+async def _take_taxis_offline(db: AsyncSession, *criteria: ColumnElement[bool]) -> list[int]:
+    """
+    Set online taxis matching ``criteria`` OFFLINE; returns their ids. One statement
+    per previous status, so the status counters know every transition.
+    """
+    offline_ids: list[int] = []
+    for previous in _ONLINE_STATUSES:
+        stmt = (
+            update(models.Taxi)
+            .where(models.Taxi.status == previous, *criteria)
+            .values(status=models.TaxiStatus.OFFLINE)
+            .returning(models.Taxi.id, models.Taxi.x, models.Taxi.y)
+        )
+        rows = (await db.execute(stmt)).all()
+        for taxi_id, x, y in rows:
+            record_taxi_change(db, taxi_id, models.TaxiStatus.OFFLINE, x, y)
+            offline_ids.append(taxi_id)
+        _count_taxis_after_commit(db, previous, models.TaxiStatus.OFFLINE, len(rows))
+    return offline_ids
+
+
+async def sweep_offline_taxis(db: AsyncSession, ttl_sec: int) -> int:
+    """Reconciling sweep over ``(status, last_seen_at)``; the timing wheel handles steady state."""
     cutoff = datetime.now(UTC) - timedelta(seconds=ttl_sec)
+    offline_ids = await _take_taxis_offline(
+        db, (models.Taxi.last_seen_at.is_(None)) | (models.Taxi.last_seen_at < cutoff)
+    )
+    await db.commit()
+    for taxi_id in offline_ids:
+        available_taxi_index.discard(taxi_id)
+        taxi_expiry_wheel.cancel(taxi_id)
+    return len(offline_ids)
+
+
+async def mark_expired_taxis_offline(
+    db: AsyncSession, taxi_ids: Sequence[int], ttl_sec: int
+) -> list[int]:
+    """
+    Mark the given taxis OFFLINE if they are still online and their last
+    heartbeat is older than ``ttl_sec``; returns the ids actually changed.
+    """
+    if not taxi_ids:
+        return []
+    cutoff = datetime.now(UTC) - timedelta(seconds=ttl_sec)
+    offline_ids = await _take_taxis_offline(
+        db,
+        models.Taxi.id.in_(taxi_ids),
+        (models.Taxi.last_seen_at.is_(None)) | (models.Taxi.last_seen_at < cutoff),
+    )
+    await db.commit()
+    return offline_ids
+
+
+async def load_taxi_expiry_wheel(
+    db: AsyncSession, ttl_sec: int, taxi_ids: Collection[int] | None = None
+) -> None:
+    """
+    Schedule online taxis in the expiry wheel from their ``last_seen_at``.
+
+    With ``taxi_ids`` only those taxis are reloaded and AVAILABLE ones are put
+    back into the spatial index (used for taxis the wheel expired too eagerly).
+    """
+    stmt = select(
+        models.Taxi.id, models.Taxi.x, models.Taxi.y, models.Taxi.status, models.Taxi.last_seen_at
+    ).where(models.Taxi.status.in_(_ONLINE_STATUSES))
+    if taxi_ids is not None:
+        stmt = stmt.where(models.Taxi.id.in_(taxi_ids))
+    now = time.time()
+    for taxi_id, x, y, status, last_seen_at in (await db.execute(stmt)).all():
+        seen = as_utc(last_seen_at).timestamp() if last_seen_at is not None else now
+        taxi_expiry_wheel.schedule(taxi_id, seen + ttl_sec)
+        if taxi_ids is not None and status == models.TaxiStatus.AVAILABLE:
+            available_taxi_index.add(taxi_id, x, y)
+
+
+async def pick_closest_available_taxi_for_update(
+    db: AsyncSession, x: int, y: int, exclude: Collection[int] = ()
+) -> models.Taxi | None:
+    """
+    Pick the nearest AVAILABLE taxi using the in-memory spatial index and lock its row.
+
+    Candidates come from the index in distance order; only the chosen candidate's
+    row is locked. A candidate that is already locked by another transaction or
+    is no longer AVAILABLE in the DB is skipped.
+    """
+    if not available_taxi_index.loaded:
+        await load_available_taxi_index(db)
+
+    attempts = max(1, settings.SPATIAL_INDEX_MAX_CANDIDATES)
+    for _, taxi_id in available_taxi_index.iter_nearest(x, y):
+        if taxi_id in exclude:
+            continue
+        stmt: Select = (
+            select(models.Taxi)
+            .where(models.Taxi.id == taxi_id, models.Taxi.status == models.TaxiStatus.AVAILABLE)
+            .with_for_update(skip_locked=True)
+        )
+        taxi = (await db.execute(stmt)).scalars().first()
+        if taxi is not None:
+            return taxi
+        attempts -= 1
+        if attempts == 0:
+            break
+    return None
+
+
+_ACTIVE_TRIP_STATUSES = (TripStatus.REQUESTED, TripStatus.IN_PROGRESS)
+
+
+def _active_trip_count(taxi_id: ColumnElement[int]) -> ColumnElement[int]:
+    """
+    Active trips of the taxi ``taxi_id`` refers to, correlated with the outer
+    query: one probe of ``ix_trips_taxi_id_status`` per row it is evaluated
+    for, instead of grouping every active trip of the fleet.
+    """
+    trip = aliased(Trip)
+    return (
+        select(func.count())
+        .select_from(trip)
+        .where(trip.taxi_id == taxi_id, trip.status.in_(_ACTIVE_TRIP_STATUSES))
+        .scalar_subquery()
+    )
+
+
+async def busy_taxi_candidates(
+    db: AsyncSession, x: int, y: int, limit: int, within: float | None = None
+) -> list[tuple[float, int, tuple[int, int]]]:
+    """
+    ``(eta, taxi_id, (end_x, end_y))`` of BUSY taxis that could take a queued
+    trip to ``(x, y)``, best first. ``eta`` is in cells (see
+    :func:`eta_after_current_trip`); only drop-offs closer than ``within`` count.
+    """
+    to_pickup = func.abs(Trip.end_x - x) + func.abs(Trip.end_y - y)
     stmt = (
-        update(models.Taxi)
+        select(
+            Trip.taxi_id,
+            Trip.status,
+            Trip.start_x,
+            Trip.start_y,
+            Trip.end_x,
+            Trip.end_y,
+            Trip.request_time,
+            Trip.pickup_time,
+            Taxi.x,
+            Taxi.y,
+        )
+        .join(Taxi, Taxi.id == Trip.taxi_id)
         .where(
-            models.Taxi.status.in_([models.TaxiStatus.AVAILABLE, models.TaxiStatus.BUSY]),
-            (models.Taxi.last_seen_at.is_(None)) | (models.Taxi.last_seen_at < cutoff),
+            Trip.status.in_(_ACTIVE_TRIP_STATUSES),
+            Taxi.status == TaxiStatus.BUSY,
+            # Exactly one active trip: room for a queued next one.
+            _active_trip_count(Trip.taxi_id) == 1,
         )
-        .values(status=models.TaxiStatus.OFFLINE)
+        .order_by(to_pickup)
+        .limit(limit)
+    )
+    if within is not None:
+        stmt = stmt.where(to_pickup < within)
+    now = datetime.now(UTC)
+    candidates = []
+    for taxi_id, status, sx, sy, ex, ey, requested, picked_up, tx, ty in (
+        await db.execute(stmt)
+    ).all():
+        route = manhattan(sx, sy, ex, ey)
+        if status == TripStatus.REQUESTED or picked_up is None:
+            route += manhattan(tx, ty, sx, sy)
+            started = as_utc(requested)
+        else:
+            started = as_utc(picked_up)
+        elapsed_min = (now - started).total_seconds() / 60
+        eta = eta_after_current_trip(
+            route, elapsed_min, settings.LOOKAHEAD_MIN_PER_CELL, manhattan(ex, ey, x, y)
+        )
+        candidates.append((eta, taxi_id, (ex, ey)))
+    return sorted(candidates)
+
+
+async def has_active_trips(db: AsyncSession, taxi_id: int, exclude: Collection[int] = ()) -> bool:
+    stmt = select(Trip.id).where(
+        Trip.taxi_id == taxi_id, Trip.status.in_(_ACTIVE_TRIP_STATUSES), Trip.id.not_in(exclude)
     )
-    res = db.execute(stmt)
-    db.commit()
-    return res.rowcount or 0
+    return (await db.execute(stmt.limit(1))).first() is not None
+
+
+async def pick_taxi_by_eta_for_update(
+    db: AsyncSession, x: int, y: int
+) -> tuple[models.Taxi, tuple[int, int]] | None:
+    """
+    Look-ahead variant of :func:`pick_closest_available_taxi_for_update`.
+
+    Scores AVAILABLE taxis by distance and BUSY taxis with a single active trip
+    by the cells left on that trip plus the distance from its drop-off, then
+    locks the best candidate still in that state. Returns the taxi and where it
+    starts driving to the pickup from (its drop-off, for a busy taxi); the new
+    trip of a busy taxi is queued behind its current one.
+    """
+    if not available_taxi_index.loaded:
+        await load_available_taxi_index(db)
+
+    limit = max(1, settings.SPATIAL_INDEX_MAX_CANDIDATES)
+    candidates: list[tuple[float, int, int, tuple[int, int]]] = []
+    for distance, taxi_id in available_taxi_index.iter_nearest(x, y):
+        position = available_taxi_index.position(taxi_id)
+        assert position is not None
+        candidates.append((distance, 0, taxi_id, position))
+        if len(candidates) >= limit:
+            break
+    best_available = candidates[0][0] if candidates else None
+    for eta, taxi_id, end in await busy_taxi_candidates(db, x, y, limit, best_available):
+        candidates.append((eta, 1, taxi_id, end))
+
+    # Ties go to available taxis (second key): they are not committed to anything else.
+    for _, busy, taxi_id, origin in sorted(candidates)[:limit]:
+        if not busy:
+            stmt: Select = (
+                select(models.Taxi)
+                .where(models.Taxi.id == taxi_id, models.Taxi.status == TaxiStatus.AVAILABLE)
+                .with_for_update(skip_locked=True)
+            )
+        else:
+            stmt = (
+                select(models.Taxi)
+                .where(
+                    models.Taxi.id == taxi_id,
+                    models.Taxi.status == TaxiStatus.BUSY,
+                    _active_trip_count(models.Taxi.id) == 1,
+                )
+                .with_for_update(skip_locked=True)
+            )
+        taxi = (await db.execute(stmt)).scalars().first()
+        if taxi is not None:
+            return taxi, origin
+    return None
+
+
+async def available_taxi_candidates(
+    db: AsyncSession, points: Sequence[tuple[int, int]], per_point: int
+) -> dict[int, tuple[int, int]]:
+    """
+    Collect the ``per_point`` nearest AVAILABLE taxis for every point, topped up
+    until there are at least as many candidates as points (when supply allows).
+    Returns ``{taxi_id: (x, y)}`` straight from the spatial index, no row locks.
+    """
+    if not available_taxi_index.loaded:
+        await load_available_taxi_index(db)
+
+    candidates: dict[int, tuple[int, int]] = {}
+    iterators = [available_taxi_index.iter_nearest(x, y) for x, y in points]
+
+    def take(it: Iterator[tuple[int, int]]) -> bool:
+        for _, taxi_id in it:
+            if taxi_id not in candidates:
+                candidates[taxi_id] = available_taxi_index.position(taxi_id)  # type: ignore[assignment]
+                return True
+        return False
+
+    for it in iterators:
+        for _ in range(max(1, per_point)):
+            if not take(it):
+                break
+
+    wanted = min(len(points), len(available_taxi_index))
+    live = list(iterators)
+    while len(candidates) < wanted and live:
+        live = [it for it in live if take(it)]
+    return candidates
 
 
-def pick_closest_available_taxi_for_update(db: Session, x: int, y: int) -> models.Taxi | None:
-    distance = func.abs(models.Taxi.x - x) + func.abs(models.Taxi.y - y)
+async def lock_available_taxis_for_update(
+    db: AsyncSession, taxi_ids: Collection[int]
+) -> list[models.Taxi]:
+    if not taxi_ids:
+        return []
     stmt: Select = (
         select(models.Taxi)
-        .where(models.Taxi.status == models.TaxiStatus.AVAILABLE)
-        .order_by(distance, models.Taxi.id)
-        .limit(1)
+        .where(models.Taxi.id.in_(taxi_ids), models.Taxi.status == models.TaxiStatus.AVAILABLE)
+        .order_by(models.Taxi.id)
         .with_for_update(skip_locked=True)
     )
-    return db.execute(stmt).scalars().first()
+    return list((await db.execute(stmt)).scalars().all())
 
 
-def mark_taxi_busy(db: Session, taxi: models.Taxi) -> None:
+def mark_taxi_busy(db: AsyncSession, taxi: models.Taxi) -> None:
+    _count_taxis_after_commit(db, taxi.status, models.TaxiStatus.BUSY)
     taxi.status = models.TaxiStatus.BUSY
     db.add(taxi)
+    _unindex_taxi_after_commit(db, taxi)
 
 
-def mark_taxi_available(db: Session, taxi: models.Taxi) -> None:
+def mark_taxi_available(db: AsyncSession, taxi: models.Taxi) -> None:
+    _count_taxis_after_commit(db, taxi.status, models.TaxiStatus.AVAILABLE)
     taxi.status = models.TaxiStatus.AVAILABLE
     db.add(taxi)
+    _index_taxi_after_commit(db, taxi)
 
 
-def mark_taxi_offline(db: Session, taxi: models.Taxi) -> None:
+def mark_taxi_offline(db: AsyncSession, taxi: models.Taxi) -> None:
+    _count_taxis_after_commit(db, taxi.status, models.TaxiStatus.OFFLINE)
     taxi.status = models.TaxiStatus.OFFLINE
     db.add(taxi)
+    _unindex_taxi_after_commit(db, taxi)
+    taxi_id = taxi.id
+    run_after_commit(db, lambda: taxi_expiry_wheel.cancel(taxi_id))
 
 
-def count_taxis(db: Session, status: schemas.TaxiStatus = schemas.TaxiStatus.AVAILABLE) -> int:
+async def count_taxis(
+    db: AsyncSession, status: schemas.TaxiStatus = schemas.TaxiStatus.AVAILABLE
+) -> int:
     stmt: Select = select(func.count(models.Taxi.id))
     if status is not None:
         stmt = stmt.where(models.Taxi.status == status)
-    count = db.execute(stmt).scalar_one()
+    count = (await db.execute(stmt)).scalar_one()
     return count
 
 
 def create_trip_requested(
-    db: Session,
+    db: AsyncSession,
     order: schemas.OrderCreate,
     taxi_id: int | None,
+    taxi_position: tuple[int, int] | None = None,
+    deadline_at: datetime | None = None,
 ) -> models.Trip:
+    """
+    ``taxi_position`` is where the taxi was when assigned; it gives the pickup
+    distance. A trip without a taxi is a pending order, matched by
+    :func:`lock_pending_trips_for_update` until ``deadline_at``.
+    """
     trip = models.Trip(
         user_id=order.user_id,
         taxi_id=taxi_id,
@@ -108,60 +598,403 @@ def create_trip_requested(
         end_x=order.end_x,
         end_y=order.end_y,
         status=models.TripStatus.REQUESTED,
+        deadline_at=deadline_at,
     )
+    if taxi_position is not None:
+        trip.route_meta = {
+            "pickup_distance": manhattan(*taxi_position, order.start_x, order.start_y)
+        }
     db.add(trip)
+    _count_trips_after_commit(db, None, models.TripStatus.REQUESTED)
     return trip
 
 
-def event_pickup(db: Session, evt: TaxiPickupEvent) -> bool:
-    trip = db.get(Trip, evt.trip_id)
-    taxi = db.scalar(select(Taxi).where(Taxi.public_id == evt.taxi_public_id))
+def assign_pending_trip(
+    db: AsyncSession, trip: models.Trip, taxi: models.Taxi, taxi_position: tuple[int, int]
+) -> None:
+    trip.taxi_id = taxi.id
+    trip.route_meta = {
+        **(trip.route_meta or {}),
+        "pickup_distance": manhattan(*taxi_position, trip.start_x, trip.start_y),
+    }
+    db.add(trip)
 
-    if not trip or not taxi or trip.taxi_id != taxi.id:
-        return False
 
-    if trip.status not in (TripStatus.REQUESTED, TripStatus.IN_PROGRESS):
-        return True
+def _pending_trips(now: datetime) -> ColumnElement[bool]:
+    return (
+        (Trip.status == TripStatus.REQUESTED)
+        & Trip.taxi_id.is_(None)
+        & Trip.deadline_at.is_not(None)
+        & (Trip.deadline_at > now)
+    )
 
+
+async def lock_pending_trips_for_update(
+    db: AsyncSession, now: datetime, limit: int
+) -> list[models.Trip]:
+    """Oldest pending orders still within their deadline; rows locked by others are skipped."""
+    stmt: Select = (
+        select(Trip)
+        .where(_pending_trips(now))
+        .order_by(Trip.request_time, Trip.id)
+        .limit(limit)
+        .with_for_update(skip_locked=True)
+    )
+    return list((await db.execute(stmt)).scalars().all())
+
+
+async def cancel_expired_pending_trips(db: AsyncSession, now: datetime) -> list[int]:
+    """Cancel pending orders whose deadline has passed; returns their ids. Does not commit."""
+    stmt = (
+        update(Trip)
+        .where(
+            Trip.status == TripStatus.REQUESTED,
+            Trip.taxi_id.is_(None),
+            Trip.deadline_at <= now,
+        )
+        .values(status=TripStatus.CANCELLED)
+        .returning(Trip.id, Trip.start_x, Trip.start_y, Trip.end_x, Trip.end_y)
+    )
+    expired = []
+    for trip_id, start_x, start_y, end_x, end_y in (await db.execute(stmt)).all():
+        record_trip_change(db, trip_id, TripStatus.CANCELLED, (start_x, start_y), (end_x, end_y))
+        expired.append(trip_id)
+    if expired:
+        count = len(expired)
+        run_after_commit(
+            db,
+            lambda: fleet_counters.trip_transition(
+                TripStatus.REQUESTED, TripStatus.CANCELLED, count
+            ),
+        )
+    return expired
+
+
+def mark_trip_cancelled(db: AsyncSession, trip: models.Trip) -> None:
+    _count_trips_after_commit(db, trip.status, models.TripStatus.CANCELLED)
+    trip.status = models.TripStatus.CANCELLED
+    db.add(trip)
+
+
+def enqueue_assignment(db: AsyncSession, trip: models.Trip) -> models.AssignmentOutbox:
+    """Queue the taxi callback for ``trip``; it is committed together with the reservation."""
+    entry = models.AssignmentOutbox(trip=trip)
+    db.add(entry)
+    return entry
+
+
+async def claim_due_assignments(
+    db: AsyncSession, limit: int, lease_sec: float
+) -> list[models.AssignmentOutbox]:
+    """
+    Claim up to ``limit`` due outbox entries with their trip and taxi loaded.
+
+    Claiming pushes ``next_attempt_at`` forward by ``lease_sec``, so an entry whose
+    worker died mid-delivery becomes due again once the lease runs out.
+    """
+    now = datetime.now(UTC)
+    due = (
+        select(models.AssignmentOutbox.id)
+        .where(
+            models.AssignmentOutbox.status == models.OutboxStatus.PENDING,
+            models.AssignmentOutbox.next_attempt_at <= now,
+        )
+        .order_by(models.AssignmentOutbox.next_attempt_at)
+        .limit(limit)
+        .with_for_update(skip_locked=True)
+    )
+    stmt = (
+        update(models.AssignmentOutbox)
+        .where(models.AssignmentOutbox.id.in_(due.scalar_subquery()))
+        .values(
+            attempts=models.AssignmentOutbox.attempts + 1,
+            next_attempt_at=now + timedelta(seconds=lease_sec),
+        )
+        .returning(models.AssignmentOutbox.id)
+    )
+    claimed_ids = (await db.execute(stmt)).scalars().all()
+    if not claimed_ids:
+        return []
+    entries = await db.execute(
+        select(models.AssignmentOutbox)
+        .where(models.AssignmentOutbox.id.in_(claimed_ids))
+        .options(joinedload(models.AssignmentOutbox.trip).joinedload(models.Trip.taxi))
+        .order_by(models.AssignmentOutbox.id)
+    )
+    return list(entries.scalars().all())
+
+
+async def mark_assignments_processed(
+    db: AsyncSession, entry_ids: Collection[int], status: models.OutboxStatus
+) -> None:
+    if not entry_ids:
+        return
+    await db.execute(
+        update(models.AssignmentOutbox)
+        .where(models.AssignmentOutbox.id.in_(entry_ids))
+        .values(status=status, processed_at=datetime.now(UTC))
+    )
+
+
+async def lock_trips_for_update(db: AsyncSession, trip_ids: Collection[int]) -> list[models.Trip]:
+    """Lock trips together with their taxis, refreshing already loaded instances."""
+    if not trip_ids:
+        return []
+    stmt: Select = (
+        select(models.Trip)
+        .where(models.Trip.id.in_(trip_ids))
+        .options(joinedload(models.Trip.taxi, innerjoin=True))
+        .order_by(models.Trip.id)
+        .with_for_update()
+        .execution_options(populate_existing=True)
+    )
+    return list((await db.execute(stmt)).scalars().unique().all())
+
+
+TripEvent = TaxiPickupEvent | TaxiDeliveredEvent
+
+
+def _event_type(evt: TripEvent) -> str:
+    return "delivered" if isinstance(evt, TaxiDeliveredEvent) else "pickup"
+
+
+def _apply_pickup(db: AsyncSession, trip: Trip, evt: TaxiPickupEvent) -> schemas.TripEventOutcome:
+    if trip.status == TripStatus.IN_PROGRESS:
+        return schemas.TripEventOutcome.DUPLICATE
+    if trip.status != TripStatus.REQUESTED:
+        return schemas.TripEventOutcome.IGNORED
+    _count_trips_after_commit(db, trip.status, TripStatus.IN_PROGRESS)
     trip.pickup_time = as_utc(evt.timestamp)
     trip.status = TripStatus.IN_PROGRESS
     trip.waiting_time_min = int(
         (trip.pickup_time - as_utc(trip.request_time)).total_seconds() // 60
     )
+    return schemas.TripEventOutcome.APPLIED
 
-    db.add(trip)
-    db.commit()
-    return True
 
+def _apply_delivered(
+    db: AsyncSession, trip: Trip, taxi: Taxi, evt: TaxiDeliveredEvent, active: set[int]
+) -> schemas.TripEventOutcome:
+    """``active`` are the taxi's unfinished trips; a queued one keeps the taxi busy."""
+    if trip.status == TripStatus.COMPLETED:
+        return schemas.TripEventOutcome.DUPLICATE
+    _count_trips_after_commit(db, trip.status, TripStatus.COMPLETED)
+    trip.status = TripStatus.COMPLETED
+    trip.dropoff_time = as_utc(evt.dropoff_time)
+    if trip.pickup_time is not None:
+        trip.travel_time_min = int(
+            (trip.dropoff_time - as_utc(trip.pickup_time)).total_seconds() // 60
+        )
+    trip_distance = manhattan(trip.start_x, trip.start_y, evt.end_x, evt.end_y)
+    pickup_distance = (trip.route_meta or {}).get("pickup_distance", 0)
+    trip.total_distance = pickup_distance + trip_distance
+    trip.route_meta = {**(trip.route_meta or {}), "trip_distance": trip_distance}
+    _rollup_trip_after_commit(db, trip)
+    active.discard(trip.id)
+    taxi.x = evt.end_x
+    taxi.y = evt.end_y
+    if active:
+        return schemas.TripEventOutcome.APPLIED
+    _count_taxis_after_commit(db, taxi.status, TaxiStatus.AVAILABLE)
+    taxi.status = TaxiStatus.AVAILABLE
+    _index_taxi_after_commit(db, taxi)
+    return schemas.TripEventOutcome.APPLIED
+
+
+async def apply_trip_events(
+    db: AsyncSession, events: Sequence[TripEvent]
+) -> list[schemas.TripEventOutcome]:
+    """
+    Apply pickup/delivered events in order, in one transaction.
+
+    Every referenced trip and taxi is loaded (and locked) with one query each;
+    the trip query also brings the taxis' other unfinished trips, since a taxi
+    with a queued trip stays busy after a drop-off. ``(trip_id, event type)`` is
+    the idempotency key: a repeat within the batch, or an event the trip's state
+    already reflects, is reported as a duplicate. Events whose trip is unknown
+    or belongs to another taxi are ``not_found``.
+    """
+    if not events:
+        return []
+    trip_ids = {evt.trip_id for evt in events}
+    public_ids = {evt.taxi_public_id for evt in events}
+    trips = {
+        trip.id: trip
+        for trip in (
+            await db.execute(
+                select(Trip)
+                .where(
+                    Trip.id.in_(trip_ids)
+                    | (
+                        Trip.taxi_id.in_(select(Taxi.id).where(Taxi.public_id.in_(public_ids)))
+                        & Trip.status.in_(_ACTIVE_TRIP_STATUSES)
+                    )
+                )
+                .with_for_update()
+                .execution_options(populate_existing=True)
+            )
+        ).scalars()
+    }
+    taxis = {
+        taxi.public_id: taxi
+        for taxi in (
+            await db.execute(
+                select(Taxi)
+                .where(Taxi.public_id.in_(public_ids))
+                .with_for_update()
+                .execution_options(populate_existing=True)
+            )
+        ).scalars()
+    }
+
+    active: dict[int, set[int]] = {taxi.id: set() for taxi in taxis.values()}
+    for trip in trips.values():
+        if trip.status in _ACTIVE_TRIP_STATUSES and trip.taxi_id in active:
+            active[trip.taxi_id].add(trip.id)
+
+    outcomes: list[schemas.TripEventOutcome] = []
+    seen: set[tuple[int, str]] = set()
+    for evt in events:
+        key = (evt.trip_id, _event_type(evt))
+        trip = trips.get(evt.trip_id)
+        taxi = taxis.get(evt.taxi_public_id)
+        if trip is None or taxi is None or trip.taxi_id != taxi.id:
+            outcomes.append(schemas.TripEventOutcome.NOT_FOUND)
+        elif key in seen:
+            outcomes.append(schemas.TripEventOutcome.DUPLICATE)
+        elif isinstance(evt, TaxiDeliveredEvent):
+            outcomes.append(_apply_delivered(db, trip, taxi, evt, active[taxi.id]))
+        else:
+            outcomes.append(_apply_pickup(db, trip, evt))
+        seen.add(key)
 
-def event_delivered(db: Session, evt: TaxiDeliveredEvent) -> bool:
-    trip = db.get(Trip, evt.trip_id)
-    if not trip:
-        return False
+    try:
+        await db.commit()
+    except SQLAlchemyError:
+        await db.rollback()
+        raise
+    return outcomes
 
-    trip.status = TripStatus.COMPLETED
-    trip.dropoff_time = evt.dropoff_time
 
-    taxi = db.get(Taxi, trip.taxi_id)
-    if taxi:
-        taxi.status = TaxiStatus.AVAILABLE
-        taxi.x = evt.end_x
-        taxi.y = evt.end_y
-        db.add(taxi)
+async def event_pickup(db: AsyncSession, evt: TaxiPickupEvent) -> bool:
+    [outcome] = await apply_trip_events(db, [evt])
+    return outcome != schemas.TripEventOutcome.NOT_FOUND
 
-    db.add(trip)
-    db.commit()
-    return True
+
+async def event_delivered(db: AsyncSession, evt: TaxiDeliveredEvent) -> bool:
+    [outcome] = await apply_trip_events(db, [evt])
+    return outcome != schemas.TripEventOutcome.NOT_FOUND
 
 
-def get_trip(db: Session, trip_id: int) -> models.Trip | None:
-    return db.get(Trip, trip_id)
+async def get_trip(
+    db: AsyncSession, trip_id: int, populate_existing: bool = False
+) -> models.Trip | None:
+    return await db.get(Trip, trip_id, populate_existing=populate_existing)
 
 
-def get_all_trips(db: Session) -> list[models.Trip]:
+async def get_all_trips(db: AsyncSession) -> list[models.Trip]:
     stmt = select(models.Trip)
-    return db.execute(stmt).scalars().all()
+    return list((await db.execute(stmt)).scalars().all())
+
+
+def _trip_filters(
+    statuses: Collection[TripStatus] | None = None,
+    since: datetime | None = None,
+    until: datetime | None = None,
+) -> list[ColumnElement[bool]]:
+    """``WHERE`` clauses for trip listings; ``since``/``until`` bound ``request_time``."""
+    clauses: list[ColumnElement[bool]] = []
+    if statuses:
+        clauses.append(Trip.status.in_([TripStatus(status) for status in statuses]))
+    if since is not None:
+        clauses.append(Trip.request_time >= since)
+    if until is not None:
+        clauses.append(Trip.request_time < until)
+    return clauses
+
+
+async def list_trips_page(
+    db: AsyncSession,
+    limit: int,
+    cursor: int | None = None,
+    statuses: Collection[TripStatus] | None = None,
+    since: datetime | None = None,
+    until: datetime | None = None,
+) -> list[models.Trip]:
+    """
+    Newest trips first, keyset-paginated: ``cursor`` is the id of the last trip
+    of the previous page, so each page is an index range scan on the primary key.
+    """
+    stmt = select(Trip).where(*_trip_filters(statuses, since, until))
+    if cursor is not None:
+        stmt = stmt.where(Trip.id < cursor)
+    stmt = stmt.order_by(Trip.id.desc()).limit(limit)
+    return list((await db.execute(stmt)).scalars().all())
+
+
+async def stream_trips(
+    db: AsyncSession,
+    columns: Sequence[str],
+    chunk_size: int,
+    statuses: Collection[TripStatus] | None = None,
+    since: datetime | None = None,
+    until: datetime | None = None,
+) -> AsyncIterator[Sequence[Row]]:
+    """
+    Yield matching trips oldest first as chunks of plain rows with ``columns``.
+
+    Rows come from a server-side cursor (``yield_per``) and are not ORM objects,
+    so memory stays bounded by ``chunk_size`` no matter how many trips match.
+    """
+    stmt = (
+        select(*(getattr(Trip, name) for name in columns))
+        .where(*_trip_filters(statuses, since, until))
+        .order_by(Trip.id.asc())
+        .execution_options(yield_per=chunk_size)
+    )
+    result = await db.stream(stmt)
+    try:
+        async for chunk in result.partitions():
+            yield chunk
+    finally:
+        await result.close()
+
+
+async def ensure_trip_rollups(db: AsyncSession) -> None:
+    """
+    Build the trip-metric rollups on first use from trips completed within the
+    retention window; afterwards every delivered event updates them in memory.
+    """
+    if trip_rollups.loaded:
+        return
+    since = datetime.now(UTC) - trip_rollups.retention
+    stmt = (
+        select(
+            Trip.dropoff_time,
+            Trip.start_x,
+            Trip.start_y,
+            Trip.waiting_time_min,
+            Trip.travel_time_min,
+            Trip.total_distance,
+        )
+        .where(Trip.status == TripStatus.COMPLETED, Trip.dropoff_time >= since)
+        .execution_options(yield_per=settings.EXPORT_CHUNK_SIZE)
+    )
+    rows = [
+        (
+            dropoff_time,
+            start_x,
+            start_y,
+            {
+                "waiting_time_min": waiting,
+                "travel_time_min": travel,
+                "total_distance": distance,
+            },
+        )
+        async for dropoff_time, start_x, start_y, waiting, travel, distance in await db.stream(stmt)
+    ]
+    trip_rollups.load(rows)
 
 
-def get_taxi_by_public_id(db: Session, public_id: str) -> models.Taxi | None:
-    return db.scalar(select(models.Taxi).where(models.Taxi.public_id == public_id))
+async def get_taxi_by_public_id(db: AsyncSession, public_id: str) -> models.Taxi | None:
+    return await db.scalar(select(models.Taxi).where(models.Taxi.public_id == public_id))
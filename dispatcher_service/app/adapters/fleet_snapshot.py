@@ -0,0 +1,209 @@
+from __future__ import annotations
+
+import secrets
+from collections.abc import Awaitable, Callable, Mapping
+
+from pydantic import TypeAdapter
+from sqlalchemy import desc, event, func, inspect, select
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import ORMExecuteState, Session, UOWTransaction
+
+from common.schemas import TaxiRead, TripRead
+from dispatcher_service.app.domain.models import Taxi, TaxiStatus, Trip, TripStatus
+from dispatcher_service.app.domain.raster import pack_fleet_raster
+from dispatcher_service.app.settings import settings
+
+_CHANGED_KEY = "fleet_snapshot_changed"
+_DELTAS_KEY = "fleet_snapshot_deltas"
+# Execution option for statements that only touch columns the snapshot does not
+# serialize (e.g. ``last_seen_at``); such statements call :func:`mark_fleet_changed`
+# themselves when they do change something visible.
+UNTRACKED = "fleet_snapshot_untracked"
+
+_TRACKED_TABLES = frozenset({Taxi.__tablename__, Trip.__tablename__})
+
+_taxis_adapter = TypeAdapter(list[TaxiRead])
+_trips_adapter = TypeAdapter(list[TripRead])
+
+# (etag, body)
+Snapshot = tuple[str, bytes]
+# ("taxi" | "trip", id) -> visible fields of the row after the change
+Deltas = dict[tuple[str, int], dict]
+
+_TAXI_FIELDS = ("id", "status", "x", "y")
+_TRIP_FIELDS = ("id", "status", "start_x", "start_y", "end_x", "end_y")
+
+
+class FleetSnapshotCache:
+    """
+    Pre-serialized ``/taxis`` and ``/trips`` responses keyed by a fleet version.
+
+    The version is bumped after every committed transaction that wrote a taxi
+    or trip, so between mutations a poll is answered from memory without a
+    query. ETags carry a per-process epoch, so an ETag issued before a restart
+    never matches.
+    """
+
+    def __init__(self) -> None:
+        self._epoch = secrets.token_hex(4)
+        self.version = 0
+        self._cache: dict[tuple, tuple[int, Snapshot]] = {}
+        self._listeners: list[Callable[[int, Deltas], None]] = []
+
+    def add_listener(self, listener: Callable[[int, Deltas], None]) -> None:
+        """Call ``listener(version, deltas)`` after every committed fleet change."""
+        self._listeners.append(listener)
+
+    def bump(self, deltas: Deltas | None = None) -> None:
+        self.version += 1
+        for listener in self._listeners:
+            listener(self.version, deltas or {})
+
+    def clear(self) -> None:
+        self.version += 1
+        self._cache.clear()
+
+    def etag(self, key: tuple) -> str:
+        return '"' + "-".join((self._epoch, str(self.version), *map(str, key))) + '"'
+
+    async def _get(self, key: tuple, build: Callable[[], Awaitable[bytes]]) -> Snapshot:
+        cached = self._cache.get(key)
+        if cached is not None and cached[0] == self.version:
+            return cached[1]
+        # Remember the version the query started from: a mutation committed
+        # while it runs makes this entry stale right away.
+        version, etag = self.version, self.etag(key)
+        snapshot = (etag, await build())
+        self._cache[key] = (version, snapshot)
+        return snapshot
+
+    async def taxis(self, db: AsyncSession) -> Snapshot:
+        async def build() -> bytes:
+            stmt = select(Taxi.id, Taxi.public_id, Taxi.status, Taxi.x, Taxi.y).order_by(
+                Taxi.id.asc()
+            )
+            rows = (await db.execute(stmt)).all()
+            return _taxis_adapter.dump_json(
+                _taxis_adapter.validate_python(rows, from_attributes=True)
+            )
+
+        return await self._get(("taxis",), build)
+
+    async def trips(self, db: AsyncSession, limit: int) -> Snapshot:
+        async def build() -> bytes:
+            stmt = select(Trip).order_by(desc(Trip.id)).limit(limit)
+            rows = (await db.execute(stmt)).scalars().all()
+            return _trips_adapter.dump_json(
+                _trips_adapter.validate_python(rows, from_attributes=True)
+            )
+
+        return await self._get(("trips", limit), build)
+
+    async def raster(
+        self, db: AsyncSession, trips: int, trip_totals: Mapping[TripStatus, int]
+    ) -> Snapshot:
+        """
+        Fleet state packed by :func:`pack_fleet_raster`: one row per occupied cell,
+        the latest ``trips`` trips drawn and ``trip_totals`` in the header.
+        """
+
+        async def build() -> bytes:
+            taxi_stmt = select(Taxi.x, Taxi.y, Taxi.status, func.count()).group_by(
+                Taxi.x, Taxi.y, Taxi.status
+            )
+            trip_stmt = (
+                select(Trip.start_x, Trip.start_y, Trip.end_x, Trip.end_y)
+                .order_by(desc(Trip.id))
+                .limit(trips)
+            )
+            return pack_fleet_raster(
+                settings.GRID_SIZE,
+                self.version,
+                (await db.execute(taxi_stmt)).all(),
+                trip_totals,
+                (await db.execute(trip_stmt)).all(),
+            )
+
+        return await self._get(("raster", trips), build)
+
+
+fleet_snapshot = FleetSnapshotCache()
+
+
+def mark_fleet_changed(db: AsyncSession | Session) -> None:
+    """Bump the snapshot version once the session's current transaction commits."""
+    db.info[_CHANGED_KEY] = True
+
+
+def record_taxi_change(
+    db: AsyncSession | Session, taxi_id: int, status: TaxiStatus, x: int, y: int
+) -> None:
+    """Like :func:`mark_fleet_changed`, also publishing the taxi's new state as a delta."""
+    mark_fleet_changed(db)
+    delta = {"id": taxi_id, "status": TaxiStatus(status).value, "x": x, "y": y}
+    db.info.setdefault(_DELTAS_KEY, {})[("taxi", taxi_id)] = delta
+
+
+def record_trip_change(
+    db: AsyncSession | Session,
+    trip_id: int,
+    status: TripStatus,
+    start: tuple[int, int],
+    end: tuple[int, int],
+) -> None:
+    """:func:`record_taxi_change` for a trip changed by a bulk statement."""
+    mark_fleet_changed(db)
+    delta = {
+        "id": trip_id,
+        "status": TripStatus(status).value,
+        "start_x": start[0],
+        "start_y": start[1],
+        "end_x": end[0],
+        "end_y": end[1],
+    }
+    db.info.setdefault(_DELTAS_KEY, {})[("trip", trip_id)] = delta
+
+
+def _delta_of(obj: Taxi | Trip) -> tuple[tuple[str, int], dict] | None:
+    kind, fields = ("taxi", _TAXI_FIELDS) if isinstance(obj, Taxi) else ("trip", _TRIP_FIELDS)
+    # Only values already loaded: the listener must never trigger a lazy load.
+    loaded = inspect(obj).dict
+    if any(field not in loaded for field in fields):
+        return None
+    delta = {field: loaded[field] for field in fields}
+    delta["status"] = delta["status"].value
+    return (kind, delta["id"]), delta
+
+
+@event.listens_for(Session, "after_flush")
+def _track_flushed_changes(session: Session, flush_context: UOWTransaction) -> None:
+    for obj in (*session.new, *session.dirty, *session.deleted):
+        if isinstance(obj, Taxi | Trip):
+            session.info[_CHANGED_KEY] = True
+            entry = _delta_of(obj)
+            if entry is not None:
+                session.info.setdefault(_DELTAS_KEY, {})[entry[0]] = entry[1]
+
+
+@event.listens_for(Session, "do_orm_execute")
+def _track_bulk_changes(state: ORMExecuteState) -> None:
+    if not (state.is_insert or state.is_update or state.is_delete):
+        return
+    if state.execution_options.get(UNTRACKED):
+        return
+    table = getattr(state.statement, "table", None)
+    if getattr(table, "name", None) in _TRACKED_TABLES:
+        state.session.info[_CHANGED_KEY] = True
+
+
+@event.listens_for(Session, "after_commit")
+def _bump_after_commit(session: Session) -> None:
+    deltas = session.info.pop(_DELTAS_KEY, None)
+    if session.info.pop(_CHANGED_KEY, False):
+        fleet_snapshot.bump(deltas)
+
+
+@event.listens_for(Session, "after_rollback")
+def _drop_changes(session: Session) -> None:
+    session.info.pop(_CHANGED_KEY, None)
+    session.info.pop(_DELTAS_KEY, None)
@@ -0,0 +1,87 @@
+from __future__ import annotations
+
+import json
+import math
+import time
+from datetime import UTC, datetime
+
+import numpy as np
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from dispatcher_service.app.domain.heatmaps import build_heatmaps
+from dispatcher_service.app.domain.models import Taxi, TaxiStatus, Trip
+from dispatcher_service.app.domain.utils import as_utc
+from dispatcher_service.app.settings import settings
+
+
+def _layer_json(layer: np.ndarray) -> list:
+    """Row-major list of the layer; NaN (no data) becomes ``null``."""
+    flat = layer.ravel()
+    if np.issubdtype(flat.dtype, np.integer):
+        return flat.tolist()
+    values = np.round(flat, 2).astype(object)
+    values[np.isnan(flat)] = None
+    return values.tolist()
+
+
+class HeatmapCache:
+    """
+    Serialized heatmaps keyed by their window, aligned to ``bucket_sec``.
+
+    ``since`` and ``until`` are widened to bucket boundaries, so every request
+    for "the last hour" within the same bucket shares one computation. An entry
+    is reused until the clock enters the next bucket: the taxi layer and an
+    open window both change with time, so that is how stale a response can get.
+    """
+
+    def __init__(self, bucket_sec: int = 10) -> None:
+        self.bucket_sec = max(1, bucket_sec)
+        self._cache: dict[tuple[int, int], tuple[int, bytes]] = {}
+
+    def align(self, since: datetime, until: datetime) -> tuple[datetime, datetime]:
+        """Widen the window outwards to bucket boundaries."""
+        since_b = math.floor(as_utc(since).timestamp() / self.bucket_sec)
+        until_b = max(math.ceil(as_utc(until).timestamp() / self.bucket_sec), since_b + 1)
+        return (
+            datetime.fromtimestamp(since_b * self.bucket_sec, UTC),
+            datetime.fromtimestamp(until_b * self.bucket_sec, UTC),
+        )
+
+    def clear(self) -> None:
+        self._cache.clear()
+
+    async def get(self, db: AsyncSession, since: datetime, until: datetime) -> bytes:
+        since, until = self.align(since, until)
+        key = (int(since.timestamp()), int(until.timestamp()))
+        now_bucket = math.floor(time.time() / self.bucket_sec)
+        cached = self._cache.get(key)
+        if cached is not None and cached[0] == now_bucket:
+            return cached[1]
+
+        trip_stmt = select(
+            Trip.start_x, Trip.start_y, Trip.end_x, Trip.end_y, Trip.waiting_time_min
+        ).where(Trip.request_time >= since, Trip.request_time < until)
+        taxi_stmt = select(Taxi.x, Taxi.y).where(Taxi.status == TaxiStatus.AVAILABLE)
+        layers = build_heatmaps(
+            settings.GRID_SIZE,
+            (await db.execute(trip_stmt)).all(),
+            (await db.execute(taxi_stmt)).all(),
+        )
+        body = json.dumps(
+            {
+                "size": settings.GRID_SIZE,
+                "since": since.isoformat(),
+                "until": until.isoformat(),
+                "layers": {name: _layer_json(layer) for name, layer in layers.items()},
+            },
+            separators=(",", ":"),
+        ).encode()
+
+        # Entries from earlier buckets can no longer be served.
+        self._cache = {k: v for k, v in self._cache.items() if v[0] == now_bucket}
+        self._cache[key] = (now_bucket, body)
+        return body
+
+
+heatmap_cache = HeatmapCache(bucket_sec=settings.HEATMAP_BUCKET_SEC)
@@ -1,26 +1,90 @@
 from __future__ import annotations
 
-import asyncio
+import time
 
 import httpx
 
-from dispatcher_service.app.settings import settings
+from common import metrics
 from common.logger import get_logger
+from dispatcher_service.app.settings import settings
+
 logger = get_logger(__name__)
 
-async def post_json(url: str, payload: dict) -> httpx.Response:
+CALLBACK_LATENCY = metrics.histogram(
+    "dispatcher_taxi_callback_latency_seconds",
+    "Latency of a single dispatcher->taxi callback attempt.",
+    ["outcome"],
+)
+CALLBACK_REQUESTS = metrics.counter(
+    "dispatcher_taxi_callback_requests",
+    "Dispatcher->taxi callback attempts by connection reuse.",
+    ["connection"],
+)
+CONNECTIONS_OPENED = metrics.counter(
+    "dispatcher_http_connections_opened",
+    "New TCP connections opened by the shared dispatcher HTTP client.",
+)
+
+_client: httpx.AsyncClient | None = None
+
+
+def _build_client(transport: httpx.AsyncBaseTransport | None = None) -> httpx.AsyncClient:
+    limits = httpx.Limits(
+        max_connections=settings.HTTP_MAX_CONNECTIONS,
+        max_keepalive_connections=settings.HTTP_MAX_KEEPALIVE_CONNECTIONS,
+        keepalive_expiry=settings.HTTP_KEEPALIVE_EXPIRY_SEC,
+    )
     timeout = httpx.Timeout(settings.ASSIGN_TIMEOUT_SEC)
-    retry = settings.ASSIGN_RETRIES
-    for attempt in range(retry):
-        try:
-            async with httpx.AsyncClient(timeout=timeout) as client:
-                logger.info(f"POST {url} with payload: {payload}")
-                resp = await client.post(url, json=payload)
-                if resp.status_code in (200, 201, 202):
-                    return resp
-        except Exception as exc:  # noqa: BLE001
-            logger.error(f"POST {url} failed (attempt {attempt + 1}/{retry}): {exc}")
-            if attempt + 1 == retry:
-                logger.error(f"Giving up on POST {url}")
-                raise
-            await asyncio.sleep(1 + attempt * 2)  # backoff
+    return httpx.AsyncClient(limits=limits, timeout=timeout, transport=transport)
+
+
+async def open_http_client(transport: httpx.AsyncBaseTransport | None = None) -> httpx.AsyncClient:
+    global _client
+    if _client is None or _client.is_closed:
+        _client = _build_client(transport)
+    return _client
+
+
+async def close_http_client() -> None:
+    global _client
+    if _client is not None:
+        await _client.aclose()
+        _client = None
+
+
+def get_http_client() -> httpx.AsyncClient:
+    """Shared client opened in the app lifespan; created lazily outside of it (scripts, tests)."""
+    global _client
+    if _client is None or _client.is_closed:
+        _client = _build_client()
+    return _client
+
+
+async def post_json(url: str, payload: dict, timeout: float | None = None) -> httpx.Response:
+    """
+    Single POST attempt on the shared keep-alive client.
+
+    Retries and the overall time budget are the caller's responsibility.
+    """
+    new_connection = False
+
+    async def trace(event: str, info: dict) -> None:
+        nonlocal new_connection
+        if event == "connection.connect_tcp.started":
+            new_connection = True
+            CONNECTIONS_OPENED.inc()
+
+    client = get_http_client()
+    request_timeout = httpx.Timeout(timeout) if timeout is not None else httpx.USE_CLIENT_DEFAULT
+    logger.info(f"POST {url} with payload: {payload}")
+    started = time.perf_counter()
+    outcome = "error"
+    try:
+        resp = await client.post(
+            url, json=payload, timeout=request_timeout, extensions={"trace": trace}
+        )
+        outcome = str(resp.status_code)
+        return resp
+    finally:
+        CALLBACK_LATENCY.labels(outcome=outcome).observe(time.perf_counter() - started)
+        CALLBACK_REQUESTS.labels(connection="new" if new_connection else "reused").inc()
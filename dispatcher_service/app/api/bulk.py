@@ -0,0 +1,92 @@
+from __future__ import annotations
+
+import json
+from typing import Any
+
+from fastapi import HTTPException, Request, status
+from pydantic import BaseModel, TypeAdapter, ValidationError
+
+from common.schemas import BulkItemRejected
+
+NDJSON_MEDIA_TYPES = ("application/x-ndjson", "application/ndjson", "application/jsonl")
+
+
+def _is_ndjson(request: Request) -> bool:
+    content_type = request.headers.get("content-type", "").split(";")[0].strip().lower()
+    return content_type in NDJSON_MEDIA_TYPES
+
+
+def _too_many(max_items: int) -> HTTPException:
+    return HTTPException(
+        status_code=status.HTTP_413_CONTENT_TOO_LARGE,
+        detail=f"At most {max_items} items per request",
+    )
+
+
+async def _read_ndjson_items(request: Request, max_items: int) -> list[Any]:
+    """Decode NDJSON as it arrives; the body stops being read once the cap is exceeded."""
+    items: list[Any] = []
+
+    def add(line: bytes) -> None:
+        if not line.strip():
+            return
+        if len(items) >= max_items:
+            raise _too_many(max_items)
+        items.append(json.loads(line))
+
+    pending = b""
+    try:
+        async for chunk in request.stream():
+            *lines, pending = (pending + chunk).split(b"\n")
+            for line in lines:
+                add(line)
+        add(pending)
+    except ValueError as exc:
+        raise HTTPException(status_code=400, detail=f"Malformed body: {exc}") from exc
+    return items
+
+
+async def _read_raw_items(request: Request, max_items: int) -> list[Any]:
+    if _is_ndjson(request):
+        return await _read_ndjson_items(request, max_items)
+    body = await request.body()
+    try:
+        items = json.loads(body or b"[]")
+    except ValueError as exc:
+        raise HTTPException(status_code=400, detail=f"Malformed body: {exc}") from exc
+    if not isinstance(items, list):
+        raise HTTPException(status_code=400, detail="Expected a JSON array or NDJSON lines")
+    if len(items) > max_items:
+        raise _too_many(max_items)
+    return items
+
+
+async def read_bulk_items[ModelT: BaseModel](
+    request: Request, model: type[ModelT] | Any, max_items: int
+) -> tuple[list[tuple[int, ModelT]], list[BulkItemRejected]]:
+    """
+    Parse a JSON array or NDJSON body and validate all items in one pass.
+
+    NDJSON is decoded line by line as it streams in and rejected with 413 as
+    soon as it exceeds ``max_items``; a JSON array has to be read whole first.
+
+    ``model`` may also be an annotated union (e.g. a discriminated event type).
+    Returns the valid items with their position in the request plus one
+    ``invalid`` rejection per item that failed validation.
+    """
+    raw = await _read_raw_items(request, max_items)
+    adapter = TypeAdapter(list[model])  # type: ignore[valid-type]
+    try:
+        return list(enumerate(adapter.validate_python(raw))), []
+    except ValidationError as exc:
+        errors: dict[int, str] = {}
+        for error in exc.errors():
+            index = error["loc"][0]
+            errors.setdefault(index, error["msg"])  # type: ignore[arg-type]
+
+    valid_indices = [i for i in range(len(raw)) if i not in errors]
+    valid = adapter.validate_python([raw[i] for i in valid_indices])
+    rejected = [
+        BulkItemRejected(index=i, reason="invalid", detail=msg) for i, msg in sorted(errors.items())
+    ]
+    return list(zip(valid_indices, valid, strict=True)), rejected
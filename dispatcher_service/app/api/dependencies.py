@@ -1,13 +1,15 @@
-from collections.abc import Iterator
+from collections.abc import AsyncIterator
 
-from sqlalchemy.orm import Session
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker
 
 from dispatcher_service.app.adapters.database import SessionLocal
 
 
-def get_db_session() -> Iterator[Session]:
-    db = SessionLocal()
-    try:
+async def get_db_session() -> AsyncIterator[AsyncSession]:
+    async with SessionLocal() as db:
         yield db
-    finally:
-        db.close()
+
+
+def get_session_factory() -> async_sessionmaker[AsyncSession]:
+    """For endpoints that outlive their response (streams) and must not hold a session."""
+    return SessionLocal
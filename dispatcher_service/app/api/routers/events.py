@@ -1,11 +1,21 @@
 from __future__ import annotations
 
-from fastapi import APIRouter, Depends, HTTPException, status
-from sqlalchemy.orm import Session
+from fastapi import APIRouter, Depends, HTTPException, Request, status
+from sqlalchemy.ext.asyncio import AsyncSession
 
-from common.schemas import TaxiDeliveredEvent, TaxiPickupEvent
+from common.schemas import (
+    TaxiDeliveredEvent,
+    TaxiPickupEvent,
+    TripEventBatchResult,
+    TripEventItem,
+    TripEventOutcome,
+    TripEventResult,
+)
 from dispatcher_service.app.adapters import crud
+from dispatcher_service.app.api.bulk import read_bulk_items
 from dispatcher_service.app.api.dependencies import get_db_session
+from dispatcher_service.app.background.pending_orders import pending_order_matcher
+from dispatcher_service.app.settings import settings
 
 from common.logger import get_logger
 logger = get_logger(__name__)
@@ -14,9 +24,9 @@ router = APIRouter()
 
 
 @router.post("/pickup", status_code=status.HTTP_202_ACCEPTED)
-def event_pickup(evt: TaxiPickupEvent, db: Session = Depends(get_db_session)):
+async def event_pickup(evt: TaxiPickupEvent, db: AsyncSession = Depends(get_db_session)):
     logger.info(f"Pickup event received: {evt}")
-    ok = crud.event_pickup(db, evt)
+    ok = await crud.event_pickup(db, evt)
     logger.info(f"Pickup event processed: {ok}")
     if not ok:
         raise HTTPException(status_code=404, detail="Trip not found or taxi mismatch")
@@ -24,10 +34,38 @@ def event_pickup(evt: TaxiPickupEvent, db: Session = Depends(get_db_session)):
 
 
 @router.post("/delivered", status_code=status.HTTP_202_ACCEPTED)
-def event_delivered(evt: TaxiDeliveredEvent, db: Session = Depends(get_db_session)):
+async def event_delivered(evt: TaxiDeliveredEvent, db: AsyncSession = Depends(get_db_session)):
     logger.info(f"Delivered event received: {evt}")
-    ok = crud.event_delivered(db, evt)
+    ok = await crud.event_delivered(db, evt)
     logger.info(f"Delivered event processed: {ok}")
     if not ok:
         raise HTTPException(status_code=404, detail="Trip not found")
+    pending_order_matcher.wake()
     return {"status": True}
+
+
+@router.post("/batch", response_model=TripEventBatchResult)
+async def events_batch(
+    request: Request, db: AsyncSession = Depends(get_db_session)
+) -> TripEventBatchResult:
+    """Mixed pickup/delivered events (JSON array or NDJSON, ``type`` field) in one transaction."""
+    items, rejected = await read_bulk_items(
+        request, TripEventItem, max_items=settings.BULK_MAX_ITEMS
+    )
+    outcomes = await crud.apply_trip_events(db, [evt for _, evt in items])
+    if any(
+        evt.type == "delivered" and outcome == TripEventOutcome.APPLIED
+        for (_, evt), outcome in zip(items, outcomes, strict=True)
+    ):
+        pending_order_matcher.wake()
+    results = [
+        TripEventResult(index=index, outcome=outcome, trip_id=evt.trip_id, type=evt.type)
+        for (index, evt), outcome in zip(items, outcomes, strict=True)
+    ]
+    results.extend(
+        TripEventResult(index=r.index, outcome=TripEventOutcome.INVALID, detail=r.detail)
+        for r in rejected
+    )
+    results.sort(key=lambda r: r.index)
+    logger.info(f"Event batch of {len(results)} processed")
+    return TripEventBatchResult(results=results)
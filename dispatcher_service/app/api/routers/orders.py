@@ -1,32 +1,94 @@
 from __future__ import annotations
 
-from fastapi import APIRouter, Depends, HTTPException, Path, status
-from sqlalchemy.orm import Session
+import time
 
+from fastapi import APIRouter, Depends, HTTPException, Path, Query, status
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from common import metrics
 from common.schemas import OrderCreate, TripRead
 from dispatcher_service.app.adapters import crud
 from dispatcher_service.app.api.dependencies import get_db_session
-from dispatcher_service.app.domain.services import assign_order
+from dispatcher_service.app.background.assignment_outbox import assignment_outbox_workers
+from dispatcher_service.app.background.pending_orders import PENDING_ORDERS, pending_order_matcher
+from dispatcher_service.app.domain.models import Trip, TripStatus
+from dispatcher_service.app.domain.order_batcher import order_batcher
+from dispatcher_service.app.domain.services import assign_order, queue_order
+from dispatcher_service.app.settings import settings
 
 from common.logger import get_logger
 logger = get_logger(__name__)
 
 router = APIRouter()
 
+ORDER_CONFLICTS = metrics.counter(
+    "dispatcher_order_conflicts",
+    "Orders rejected with 409 because no taxi was free and queueing is off.",
+)
+
+
+def _is_pending(trip: Trip) -> bool:
+    return trip.status == TripStatus.REQUESTED and trip.taxi_id is None
+
 
 @router.post("", response_model=TripRead, status_code=status.HTTP_202_ACCEPTED)
-async def create_order(order: OrderCreate, db: Session = Depends(get_db_session)):
-    trip = await assign_order(db, order)
-    if trip is None:
+async def create_order(order: OrderCreate, db: AsyncSession = Depends(get_db_session)):
+    """
+    Assign the order to a taxi, or queue it when none is free.
+
+    A queued order comes back as a REQUESTED trip without a taxi; poll
+    ``GET /orders/{id}`` or block on ``GET /orders/{id}/wait`` until it is
+    matched or cancelled at ``deadline_at``.
+    """
+    if settings.ORDER_BATCHING_ENABLED:
+        trip = await order_batcher.submit(order)
+    else:
+        trip = await assign_order(db, order)
+    if trip is not None:
+        assignment_outbox_workers.wake()
+        return trip
+    if not settings.ORDER_QUEUE_ENABLED:
         logger.info("No available taxi found")
+        ORDER_CONFLICTS.inc()
         raise HTTPException(status_code=status.HTTP_409_CONFLICT, detail="No available taxi found")
+    trip = await queue_order(db, order)
+    PENDING_ORDERS.labels(outcome="queued").inc()
+    logger.info(f"No available taxi, order queued as trip id={trip.id}")
+    # A taxi may have freed up since the lookup; let the matcher take a look.
+    pending_order_matcher.wake()
     return trip
 
 
 @router.get("/{trip_id}", response_model=TripRead)
-def get_trip(trip_id: int = Path(..., ge=1), db: Session = Depends(get_db_session)):
-    trip = crud.get_trip(db, trip_id)
+async def get_trip(trip_id: int = Path(..., ge=1), db: AsyncSession = Depends(get_db_session)):
+    trip = await crud.get_trip(db, trip_id)
     if not trip:
         logger.info(f"Trip id={trip_id} not found")
         raise HTTPException(status_code=404, detail="Trip not found")
     return trip
+
+
+@router.get("/{trip_id}/wait", response_model=TripRead)
+async def wait_for_trip(
+    trip_id: int = Path(..., ge=1),
+    timeout: float = Query(30.0, gt=0, le=settings.ORDER_WAIT_MAX_SEC),
+    db: AsyncSession = Depends(get_db_session),
+):
+    """
+    Long-poll a pending order: returns once it has a taxi or was cancelled, or
+    as it is when ``timeout`` seconds have passed.
+    """
+    deadline = time.monotonic() + timeout
+    while True:
+        trip = await crud.get_trip(db, trip_id, populate_existing=True)
+        if not trip:
+            raise HTTPException(status_code=404, detail="Trip not found")
+        remaining = deadline - time.monotonic()
+        if not _is_pending(trip) or remaining <= 0:
+            return trip
+        # Don't hold a connection while waiting. Orders matched by another
+        # dispatcher process are seen on the next poll.
+        await db.rollback()
+        await pending_order_matcher.wait(
+            trip_id, min(remaining, settings.ORDER_QUEUE_POLL_INTERVAL_SEC)
+        )
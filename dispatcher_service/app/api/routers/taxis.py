@@ -1,21 +1,29 @@
 from __future__ import annotations
 
-from fastapi import APIRouter, Depends, HTTPException, status
-from sqlalchemy.orm import Session
+from fastapi import APIRouter, Depends, HTTPException, Request, status
+from sqlalchemy.ext.asyncio import AsyncSession
 
 from common import schemas
 from dispatcher_service.app.adapters import crud
+from dispatcher_service.app.api.bulk import read_bulk_items
 from dispatcher_service.app.api.dependencies import get_db_session
+from dispatcher_service.app.background.heartbeat_buffer import heartbeat_buffer
+from dispatcher_service.app.background.pending_orders import pending_order_matcher
+from dispatcher_service.app.domain.fleet_counters import fleet_counters
+from dispatcher_service.app.domain.models import TaxiStatus
+from dispatcher_service.app.settings import settings
 
 router = APIRouter()
 
 
 @router.post("/register", response_model=schemas.TaxiRead, status_code=status.HTTP_201_CREATED)
-def register_taxi(
+async def register_taxi(
     taxi_in: schemas.TaxiCreate,
-    db: Session = Depends(get_db_session),
+    db: AsyncSession = Depends(get_db_session),
 ):
-    taxi = crud.create_taxi(db=db, taxi_in=taxi_in)
+    taxi = await crud.create_taxi(db=db, taxi_in=taxi_in)
+    heartbeat_buffer.remember(taxi.public_id, taxi.id)
+    pending_order_matcher.wake()
     return schemas.TaxiRead(
         id=taxi.id,
         public_id=str(taxi.public_id),
@@ -26,25 +34,57 @@ def register_taxi(
 
 
 @router.post("/heartbeat", status_code=status.HTTP_204_NO_CONTENT)
-def taxi_heartbeat(evt: schemas.TaxiHeartbeat, db: Session = Depends(get_db_session)) -> None:
-    taxi = crud.get_taxi_by_public_id(db, evt.taxi_public_id)
-    if not taxi:
+async def taxi_heartbeat(
+    evt: schemas.TaxiHeartbeat, db: AsyncSession = Depends(get_db_session)
+) -> None:
+    taxi_id = await heartbeat_buffer.resolve(db, evt.taxi_public_id)
+    if taxi_id is None:
         raise HTTPException(status_code=404, detail="Taxi not found")
-    crud.update_taxi_heartbeat(db, taxi, evt.timestamp)
-    db.commit()
+    heartbeat_buffer.record(taxi_id, evt.timestamp)
+
+
+@router.post("/heartbeat/batch", response_model=schemas.TaxiHeartbeatBatchResult)
+async def taxi_heartbeat_batch(
+    request: Request, db: AsyncSession = Depends(get_db_session)
+) -> schemas.TaxiHeartbeatBatchResult:
+    """
+    Heartbeats (with optional positions) for many taxis, as a JSON array or NDJSON.
+
+    Accepted items go through the same coalescing buffer as single heartbeats;
+    unknown taxis and invalid items are reported by their index in the request.
+    """
+    items, rejected = await read_bulk_items(
+        request, schemas.TaxiHeartbeatItem, max_items=settings.BULK_MAX_ITEMS
+    )
+    taxi_ids = await heartbeat_buffer.resolve_many(db, {item.taxi_public_id for _, item in items})
+    accepted = 0
+    for index, item in items:
+        taxi_id = taxi_ids.get(item.taxi_public_id)
+        if taxi_id is None:
+            rejected.append(schemas.BulkItemRejected(index=index, reason="not_found"))
+            continue
+        heartbeat_buffer.record(taxi_id, item.timestamp, item.x, item.y)
+        accepted += 1
+    rejected.sort(key=lambda r: r.index)
+    return schemas.TaxiHeartbeatBatchResult(accepted=accepted, rejected=rejected)
 
 
 @router.post("/deregister", status_code=status.HTTP_204_NO_CONTENT)
-def taxi_deregister(req: schemas.TaxiDeregister, db: Session = Depends(get_db_session)) -> None:
-    ok = crud.deregister_taxi_by_public_id(db, req.taxi_public_id)
+async def taxi_deregister(
+    req: schemas.TaxiDeregister, db: AsyncSession = Depends(get_db_session)
+) -> None:
+    ok = await crud.deregister_taxi_by_public_id(db, req.taxi_public_id)
     if not ok:
         raise HTTPException(status_code=404, detail="Taxi not found")
-    db.commit()
+    heartbeat_buffer.discard(req.taxi_public_id)
+    await db.commit()
 
 
 @router.get("/count", response_model=schemas.TaxiCount)
-def number_of_taxis(
-    db: Session = Depends(get_db_session), status: schemas.TaxiStatus = schemas.TaxiStatus.AVAILABLE
+async def number_of_taxis(
+    db: AsyncSession = Depends(get_db_session),
+    status: schemas.TaxiStatus = schemas.TaxiStatus.AVAILABLE,
 ) -> schemas.TaxiCount:
-    count = crud.count_taxis(db, status=status)
+    await crud.ensure_fleet_counters(db)
+    count = fleet_counters.taxis[TaxiStatus(status.value)]
     return schemas.TaxiCount(count=count, status=status)
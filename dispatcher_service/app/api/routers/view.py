@@ -1,25 +1,295 @@
 from __future__ import annotations
 
-from fastapi import APIRouter, Depends, Query
-from sqlalchemy import desc, select
-from sqlalchemy.orm import Session
+import asyncio
+import csv
+import io
+import json
+from collections.abc import AsyncIterator, Sequence
+from datetime import UTC, datetime, timedelta
+from typing import Literal
 
-from common.schemas import TaxiRead, TripRead
-from dispatcher_service.app.api.dependencies import get_db_session
-from dispatcher_service.app.domain.models import Taxi, Trip
+from fastapi import APIRouter, Depends, HTTPException, Query, Request, Response, status
+from fastapi.responses import StreamingResponse
+from pydantic import TypeAdapter
+from sqlalchemy import Row
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker
+
+from common.schemas import (
+    FleetStats,
+    Heatmaps,
+    MetricStats,
+    TaxiRead,
+    TripRead,
+    TripRollupResult,
+    TripRollupRow,
+    TripStatus,
+)
+from dispatcher_service.app.adapters import crud
+from dispatcher_service.app.adapters.fleet_snapshot import Snapshot, fleet_snapshot
+from dispatcher_service.app.adapters.heatmap_cache import heatmap_cache
+from dispatcher_service.app.api.dependencies import get_db_session, get_session_factory
+from dispatcher_service.app.background.fleet_stream import fleet_stream, sse_event
+from dispatcher_service.app.domain import models
+from dispatcher_service.app.domain.fleet_counters import fleet_counters
+from dispatcher_service.app.domain.trip_rollups import MetricRollup, trip_rollups
+from dispatcher_service.app.settings import settings
 
 router = APIRouter()
 
 
+def _not_modified(request: Request, etag: str) -> bool:
+    header = request.headers.get("if-none-match")
+    if not header:
+        return False
+    tags = {tag.strip().removeprefix("W/") for tag in header.split(",")}
+    return etag in tags or "*" in tags
+
+
+def _snapshot_response(snapshot: Snapshot, media_type: str = "application/json") -> Response:
+    etag, body = snapshot
+    return Response(
+        content=body,
+        media_type=media_type,
+        headers={"ETag": etag, "Cache-Control": "no-cache"},
+    )
+
+
+def _not_modified_response(etag: str) -> Response:
+    return Response(
+        status_code=status.HTTP_304_NOT_MODIFIED,
+        headers={"ETag": etag, "Cache-Control": "no-cache"},
+    )
+
+
 @router.get("/taxis", response_model=list[TaxiRead])
-def list_taxis(db: Session = Depends(get_db_session)) -> list[Taxi]:
-    return db.execute(select(Taxi).order_by(Taxi.id.asc())).scalars().all()
+async def list_taxis(request: Request, db: AsyncSession = Depends(get_db_session)) -> Response:
+    etag = fleet_snapshot.etag(("taxis",))
+    if _not_modified(request, etag):
+        return _not_modified_response(etag)
+    return _snapshot_response(await fleet_snapshot.taxis(db))
 
 
 @router.get("/trips", response_model=list[TripRead])
-def list_trips(
+async def list_trips(
+    request: Request,
     limit: int = Query(50, ge=1, le=500),
-    db: Session = Depends(get_db_session),
-) -> list[Trip]:
-    stmt = select(Trip).order_by(desc(Trip.id)).limit(limit)
-    return db.execute(stmt).scalars().all()
+    cursor: int | None = Query(None, ge=1, description="id of the last trip of the previous page"),
+    status_in: list[TripStatus] | None = Query(None, alias="status"),
+    since: datetime | None = Query(None, description="request_time >= since"),
+    until: datetime | None = Query(None, description="request_time < until"),
+    db: AsyncSession = Depends(get_db_session),
+) -> Response | list[models.Trip]:
+    if cursor is not None or status_in or since is not None or until is not None:
+        return await crud.list_trips_page(db, limit, cursor, status_in, since, until)
+    # The unfiltered first page is what the dashboards poll: serve it from the snapshot.
+    etag = fleet_snapshot.etag(("trips", limit))
+    if _not_modified(request, etag):
+        return _not_modified_response(etag)
+    return _snapshot_response(await fleet_snapshot.trips(db, limit))
+
+
+_EXPORT_COLUMNS = tuple(TripRead.model_fields)
+_trip_row = TypeAdapter(TripRead)
+
+
+def _ndjson_chunk(rows: Sequence[Row]) -> bytes:
+    return b"".join(
+        _trip_row.dump_json(_trip_row.validate_python(row, from_attributes=True)) + b"\n"
+        for row in rows
+    )
+
+
+def _csv_chunk(rows: Sequence[Row], header: bool = False) -> bytes:
+    out = io.StringIO()
+    writer = csv.writer(out)
+    if header:
+        writer.writerow(_EXPORT_COLUMNS)
+    for row in rows:
+        item = _trip_row.validate_python(row, from_attributes=True).model_dump(mode="json")
+        writer.writerow(
+            json.dumps(value) if isinstance(value, dict) else value for value in item.values()
+        )
+    return out.getvalue().encode()
+
+
+@router.get("/trips/export")
+async def export_trips(
+    export_format: Literal["ndjson", "csv"] = Query("ndjson", alias="format"),
+    status_in: list[TripStatus] | None = Query(None, alias="status"),
+    since: datetime | None = Query(None, description="request_time >= since"),
+    until: datetime | None = Query(None, description="request_time < until"),
+    db: AsyncSession = Depends(get_db_session),
+) -> StreamingResponse:
+    """Stream every matching trip, oldest first, as NDJSON or CSV in constant memory."""
+
+    async def body() -> AsyncIterator[bytes]:
+        if export_format == "csv":
+            yield _csv_chunk([], header=True)
+        async for rows in crud.stream_trips(
+            db, _EXPORT_COLUMNS, settings.EXPORT_CHUNK_SIZE, status_in, since, until
+        ):
+            yield _csv_chunk(rows) if export_format == "csv" else _ndjson_chunk(rows)
+
+    media_type = "text/csv" if export_format == "csv" else "application/x-ndjson"
+    return StreamingResponse(
+        body(),
+        media_type=media_type,
+        headers={"Content-Disposition": f'attachment; filename="trips.{export_format}"'},
+    )
+
+
+@router.get("/stats", response_model=FleetStats)
+async def fleet_stats(db: AsyncSession = Depends(get_db_session)) -> FleetStats:
+    """Taxis and trips per status from in-memory counters; no query once they are loaded."""
+    await crud.ensure_fleet_counters(db)
+    return FleetStats(
+        taxis=fleet_counters.taxis,
+        trips=fleet_counters.trips,
+        reconciled_at=fleet_counters.reconciled_at,
+    )
+
+
+def _metric_stats(rollup: MetricRollup) -> MetricStats:
+    if not rollup.count:
+        return MetricStats(count=0, sum=0.0)
+    return MetricStats(
+        count=rollup.count,
+        sum=rollup.total,
+        mean=rollup.total / rollup.count,
+        p50=rollup.sketch.quantile(0.50),
+        p95=rollup.sketch.quantile(0.95),
+        p99=rollup.sketch.quantile(0.99),
+    )
+
+
+@router.get("/analytics/trips", response_model=TripRollupResult)
+async def trip_analytics(
+    since: datetime | None = Query(None, description="dropoff_time >= since (default: 1h ago)"),
+    until: datetime | None = Query(None, description="dropoff_time < until (default: now)"),
+    cell_x: int | None = Query(None, ge=0),
+    cell_y: int | None = Query(None, ge=0),
+    group_by: Literal["minute", "cell"] | None = Query(None),
+    db: AsyncSession = Depends(get_db_session),
+) -> TripRollupResult:
+    """
+    Waiting time, travel time and distance of completed trips: counts, sums and
+    p50/p95/p99, merged from in-memory per-minute, per-cell rollups. Cells index
+    the pickup position and are ``ROLLUP_CELL_SIZE`` wide.
+    """
+    if (cell_x is None) != (cell_y is None):
+        raise HTTPException(status_code=422, detail="cell_x and cell_y go together")
+    until = until or datetime.now(UTC)
+    since = since or until - timedelta(hours=1)
+    if since >= until:
+        raise HTTPException(status_code=422, detail="since must be before until")
+    await crud.ensure_trip_rollups(db)
+    cell = (cell_x, cell_y) if cell_x is not None and cell_y is not None else None
+    rows = []
+    for group, metrics in trip_rollups.query(since, until, cell, group_by).items():
+        row = {name: _metric_stats(rollup) for name, rollup in metrics.items()}
+        if group_by == "minute":
+            row["minute"] = group[0]
+        elif group_by == "cell":
+            row["cell_x"], row["cell_y"] = group
+        rows.append(TripRollupRow(**row))
+    return TripRollupResult(since=since, until=until, cell_size=trip_rollups.cell_size, rows=rows)
+
+
+@router.get("/analytics/heatmaps", response_model=Heatmaps)
+async def heatmaps(
+    since: datetime | None = Query(None, description="request_time >= since (default: 1h ago)"),
+    until: datetime | None = Query(None, description="request_time < until (default: now)"),
+    db: AsyncSession = Depends(get_db_session),
+) -> Response:
+    """
+    Grid heatmaps of order origins, destinations, average waiting time (per
+    origin cell) of trips requested in the window, and of available taxis now.
+    The window is aligned to ``HEATMAP_BUCKET_SEC`` and cached per bucket.
+    """
+    until = until or datetime.now(UTC)
+    since = since or until - timedelta(hours=1)
+    if since >= until:
+        raise HTTPException(status_code=422, detail="since must be before until")
+    return Response(
+        content=await heatmap_cache.get(db, since, until),
+        media_type="application/json",
+        headers={"Cache-Control": f"max-age={heatmap_cache.bucket_sec}"},
+    )
+
+
+@router.get(
+    "/fleet/raster",
+    response_class=Response,
+    responses={200: {"content": {"application/octet-stream": {}}}},
+)
+async def fleet_raster(
+    request: Request,
+    trips: int = Query(100, ge=0, le=500),
+    db: AsyncSession = Depends(get_db_session),
+) -> Response:
+    """
+    Fleet state as a packed binary raster (see ``domain/raster.py`` for the layout).
+
+    The latest ``trips`` trips are drawn; the trip totals in the header come
+    from the fleet counters and cover all trips.
+    """
+    etag = fleet_snapshot.etag(("raster", trips))
+    if _not_modified(request, etag):
+        return _not_modified_response(etag)
+    await crud.ensure_fleet_counters(db)
+    return _snapshot_response(
+        await fleet_snapshot.raster(db, trips, fleet_counters.trips),
+        media_type="application/octet-stream",
+    )
+
+
+@router.get("/stream/fleet")
+async def stream_fleet(
+    request: Request,
+    trips: int = Query(100, ge=1, le=500),
+    session_factory: async_sessionmaker[AsyncSession] = Depends(get_session_factory),
+) -> StreamingResponse:
+    """
+    Server-sent events: one ``snapshot`` with the fleet and the latest ``trips``
+    trips, then ``delta`` events with the taxis and trips that changed.
+
+    The snapshot is read on its own short session: a request-scoped one would
+    stay checked out of the pool for as long as the viewer is connected.
+    """
+    # Subscribe before reading the snapshot so no change can fall in between.
+    queue = fleet_stream.subscribe()
+    try:
+        async with session_factory() as db:
+            _, taxis_body = await fleet_snapshot.taxis(db)
+            _, trips_body = await fleet_snapshot.trips(db, trips)
+    except BaseException:
+        fleet_stream.unsubscribe(queue)
+        raise
+    snapshot = b'{"version":%d,"taxis":%b,"trips":%b}' % (
+        fleet_snapshot.version,
+        taxis_body,
+        trips_body,
+    )
+
+    async def events() -> AsyncIterator[bytes]:
+        try:
+            yield sse_event("snapshot", snapshot)
+            while True:
+                try:
+                    frame = await asyncio.wait_for(queue.get(), settings.FLEET_STREAM_KEEPALIVE_SEC)
+                except TimeoutError:
+                    if await request.is_disconnected():
+                        return
+                    yield b": keep-alive\n\n"
+                    continue
+                if frame is None:
+                    return
+                yield frame
+        finally:
+            fleet_stream.unsubscribe(queue)
+
+    return StreamingResponse(
+        events(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
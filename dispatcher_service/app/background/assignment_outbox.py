@@ -0,0 +1,89 @@
+from __future__ import annotations
+
+import asyncio
+from collections.abc import Callable
+
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from common.logger import get_logger
+from dispatcher_service.app.adapters.database import SessionLocal
+from dispatcher_service.app.domain.services import deliver_pending_assignments
+from dispatcher_service.app.settings import settings
+
+logger = get_logger(__name__)
+
+
+class AssignmentOutboxWorkers:
+    """
+    Pool of workers draining the assignment outbox.
+
+    Workers poll every ``poll_interval`` seconds; :meth:`wake` lets them pick up
+    freshly committed entries right away instead of waiting for the next poll.
+    """
+
+    def __init__(
+        self,
+        session_factory: Callable[..., AsyncSession],
+        workers: int,
+        batch_size: int,
+        poll_interval: float,
+    ) -> None:
+        self._session_factory = session_factory
+        self._workers = max(1, workers)
+        self._batch_size = max(1, batch_size)
+        self._poll_interval = max(0.01, poll_interval)
+        self._wakeup: asyncio.Event | None = None
+        self._tasks: list[asyncio.Task] = []
+
+    @property
+    def running(self) -> bool:
+        return any(not task.done() for task in self._tasks)
+
+    async def start(self) -> None:
+        if self.running:
+            return
+        self._wakeup = asyncio.Event()
+        self._tasks = [asyncio.create_task(self._run()) for _ in range(self._workers)]
+
+    async def stop(self) -> None:
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._tasks = []
+        self._wakeup = None
+
+    def wake(self) -> None:
+        if self._wakeup is not None:
+            self._wakeup.set()
+
+    async def drain(self) -> int:
+        """Deliver everything that is due now; returns the number of entries handled."""
+        handled = 0
+        while True:
+            async with self._session_factory() as db:
+                claimed = await deliver_pending_assignments(db, limit=self._batch_size)
+            if not claimed:
+                return handled
+            handled += claimed
+
+    async def _run(self) -> None:
+        wakeup = self._wakeup
+        assert wakeup is not None
+        while True:
+            wakeup.clear()
+            try:
+                await self.drain()
+            except Exception as exc:
+                logger.error(f"Assignment outbox worker failed: {exc}")
+            try:
+                await asyncio.wait_for(wakeup.wait(), self._poll_interval)
+            except TimeoutError:
+                pass
+
+
+assignment_outbox_workers = AssignmentOutboxWorkers(
+    SessionLocal,
+    workers=settings.OUTBOX_WORKERS,
+    batch_size=settings.OUTBOX_BATCH_SIZE,
+    poll_interval=settings.OUTBOX_POLL_INTERVAL_SEC,
+)
@@ -0,0 +1,55 @@
+from __future__ import annotations
+
+import asyncio
+from collections.abc import Callable
+
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from common import metrics
+from common.logger import get_logger
+from dispatcher_service.app.adapters.crud import count_fleet_by_status
+from dispatcher_service.app.adapters.database import SessionLocal
+from dispatcher_service.app.domain.fleet_counters import fleet_counters
+from dispatcher_service.app.settings import settings
+
+logger = get_logger(__name__)
+
+COUNTER_DRIFT = metrics.counter(
+    "dispatcher_fleet_counter_drift",
+    "Absolute drift corrected by status counter reconciliation.",
+)
+
+# Retries when a transition lands while the counts are being read.
+_ATTEMPTS = 3
+
+
+async def reconcile_fleet_counters(
+    session_factory: Callable[..., AsyncSession] = SessionLocal,
+) -> dict[str, int]:
+    """
+    Reset the status counters from ``GROUP BY status`` queries; returns the drift.
+
+    Counts read while transitions were being applied may already be stale, so the
+    read is retried a few times before the last result is used anyway.
+    """
+    for _ in range(_ATTEMPTS):
+        before = fleet_counters.transitions
+        async with session_factory() as db:
+            taxis, trips = await count_fleet_by_status(db)
+        if fleet_counters.transitions == before:
+            break
+    drift = fleet_counters.reset(taxis, trips)
+    if drift:
+        COUNTER_DRIFT.inc(sum(abs(delta) for delta in drift.values()))
+        logger.warning(f"Fleet counters drifted from the database: {drift}")
+    return drift
+
+
+async def fleet_counters_reconciler() -> None:
+    interval = max(1.0, settings.COUNTERS_RECONCILE_INTERVAL_SEC)
+    while True:
+        try:
+            await reconcile_fleet_counters()
+        except Exception as exc:
+            logger.error(f"Fleet counter reconciliation failed: {exc}")
+        await asyncio.sleep(interval)
@@ -0,0 +1,125 @@
+from __future__ import annotations
+
+import asyncio
+import json
+
+from common import metrics
+from common.logger import get_logger
+from dispatcher_service.app.adapters.fleet_snapshot import Deltas, fleet_snapshot
+from dispatcher_service.app.settings import settings
+
+logger = get_logger(__name__)
+
+SUBSCRIBERS = metrics.gauge(
+    "dispatcher_fleet_stream_subscribers",
+    "Clients connected to the fleet delta stream.",
+)
+DELTAS_SENT = metrics.counter(
+    "dispatcher_fleet_stream_deltas",
+    "Taxi and trip deltas published to the fleet stream.",
+)
+
+
+def sse_event(event: str, data: bytes) -> bytes:
+    return b"event: " + event.encode() + b"\ndata: " + data + b"\n\n"
+
+
+class FleetStream:
+    """
+    Fans committed taxi/trip changes out to server-sent-event subscribers.
+
+    Deltas are coalesced per row for ``interval_ms`` and serialized once per
+    flush, so the cost follows the change rate rather than fleet size times
+    viewers. A subscriber that falls ``queue_size`` frames behind is dropped;
+    its client reconnects and starts over from a fresh snapshot.
+    """
+
+    def __init__(self, interval_ms: int, queue_size: int) -> None:
+        self._interval = max(1, interval_ms) / 1000
+        self._queue_size = max(1, queue_size)
+        self._pending: Deltas = {}
+        self._version = 0
+        self._subscribers: set[asyncio.Queue[bytes | None]] = set()
+        self._task: asyncio.Task | None = None
+
+    def __len__(self) -> int:
+        return len(self._subscribers)
+
+    @property
+    def running(self) -> bool:
+        return self._task is not None and not self._task.done()
+
+    def publish(self, version: int, deltas: Deltas) -> None:
+        self._version = version
+        if self._subscribers:
+            self._pending.update(deltas)
+
+    def subscribe(self) -> asyncio.Queue[bytes | None]:
+        queue: asyncio.Queue[bytes | None] = asyncio.Queue(maxsize=self._queue_size)
+        self._subscribers.add(queue)
+        return queue
+
+    def unsubscribe(self, queue: asyncio.Queue[bytes | None]) -> None:
+        self._subscribers.discard(queue)
+
+    def clear(self) -> None:
+        for queue in self._subscribers:
+            self._close(queue)
+        self._subscribers.clear()
+        self._pending.clear()
+
+    def _close(self, queue: asyncio.Queue[bytes | None]) -> None:
+        """End the subscriber's stream after the frames it already has, if they fit."""
+        if queue.full():
+            while not queue.empty():
+                queue.get_nowait()
+        queue.put_nowait(None)
+
+    def flush(self) -> int:
+        """Send the coalesced deltas to every subscriber; returns how many were sent."""
+        if not self._pending:
+            return 0
+        pending, self._pending = self._pending, {}
+        body = {"version": self._version, "taxis": [], "trips": []}
+        for (kind, _), delta in pending.items():
+            body[kind + "s"].append(delta)
+        frame = sse_event("delta", json.dumps(body, separators=(",", ":")).encode())
+        for queue in list(self._subscribers):
+            try:
+                queue.put_nowait(frame)
+            except asyncio.QueueFull:
+                logger.info("Dropping a fleet stream subscriber that fell behind")
+                self._subscribers.discard(queue)
+                self._close(queue)
+        DELTAS_SENT.inc(len(pending))
+        return len(pending)
+
+    async def start(self) -> None:
+        if self.running:
+            return
+        self._task = asyncio.create_task(self._run())
+
+    async def stop(self) -> None:
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+        self.clear()
+
+    async def _run(self) -> None:
+        while True:
+            await asyncio.sleep(self._interval)
+            try:
+                self.flush()
+            except Exception as exc:
+                logger.error(f"Fleet stream flush failed: {exc}")
+
+
+fleet_stream = FleetStream(
+    interval_ms=settings.FLEET_STREAM_INTERVAL_MS, queue_size=settings.FLEET_STREAM_QUEUE_SIZE
+)
+fleet_snapshot.add_listener(fleet_stream.publish)
+SUBSCRIBERS.set_function(lambda: len(fleet_stream))
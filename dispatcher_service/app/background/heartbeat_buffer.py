@@ -0,0 +1,178 @@
+from __future__ import annotations
+
+import asyncio
+import time
+import uuid
+from collections.abc import Callable, Iterable
+from datetime import UTC, datetime
+
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from common import metrics
+from common.logger import get_logger
+from dispatcher_service.app.adapters import crud
+from dispatcher_service.app.adapters.database import SessionLocal
+from dispatcher_service.app.background.pending_orders import pending_order_matcher
+from dispatcher_service.app.domain.timing_wheel import taxi_expiry_wheel
+from dispatcher_service.app.settings import settings
+
+logger = get_logger(__name__)
+
+# (timestamp, x, y); the position is optional.
+_Beat = tuple[datetime, int | None, int | None]
+
+BUFFER_DEPTH = metrics.gauge(
+    "dispatcher_heartbeat_buffer_depth",
+    "Taxis with a heartbeat waiting to be flushed.",
+)
+FLUSH_SIZE = metrics.histogram(
+    "dispatcher_heartbeat_flush_size",
+    "Taxis written per heartbeat flush.",
+    buckets=(1, 10, 50, 100, 500, 1000, 5000, 10000, 50000),
+)
+FLUSH_LATENCY = metrics.histogram(
+    "dispatcher_heartbeat_flush_latency_seconds",
+    "Duration of one heartbeat flush transaction.",
+)
+
+
+class HeartbeatBuffer:
+    """
+    Coalesces taxi heartbeats in memory and writes them in bulk.
+
+    Only the newest timestamp per taxi is kept between flushes, so a flush costs
+    one statement no matter how often taxis report. ``public_id -> id`` lookups
+    are cached; taxis are never deleted, so the cache needs no invalidation.
+    """
+
+    def __init__(
+        self,
+        session_factory: Callable[..., AsyncSession],
+        flush_interval_ms: int,
+    ) -> None:
+        self._session_factory = session_factory
+        self._interval = max(1, flush_interval_ms) / 1000
+        self._pending: dict[int, _Beat] = {}
+        self._taxi_ids: dict[uuid.UUID, int] = {}
+        self._task: asyncio.Task | None = None
+
+    def __len__(self) -> int:
+        return len(self._pending)
+
+    @property
+    def running(self) -> bool:
+        return self._task is not None and not self._task.done()
+
+    def remember(self, public_id: uuid.UUID | str, taxi_id: int) -> None:
+        self._taxi_ids[uuid.UUID(str(public_id))] = taxi_id
+
+    async def resolve(self, db: AsyncSession, public_id: uuid.UUID | str) -> int | None:
+        key = uuid.UUID(str(public_id))
+        taxi_id = self._taxi_ids.get(key)
+        if taxi_id is None:
+            taxi_id = await crud.get_taxi_id_by_public_id(db, key)
+            if taxi_id is not None:
+                self._taxi_ids[key] = taxi_id
+        return taxi_id
+
+    async def resolve_many(
+        self, db: AsyncSession, public_ids: Iterable[uuid.UUID]
+    ) -> dict[uuid.UUID, int]:
+        """Like :meth:`resolve` for many taxis, with one query for all cache misses."""
+        keys = {uuid.UUID(str(public_id)) for public_id in public_ids}
+        found = {key: self._taxi_ids[key] for key in keys if key in self._taxi_ids}
+        missing = keys - found.keys()
+        if missing:
+            loaded = await crud.get_taxi_ids_by_public_ids(db, missing)
+            self._taxi_ids.update(loaded)
+            found.update(loaded)
+        return found
+
+    def record(
+        self, taxi_id: int, ts: datetime, x: int | None = None, y: int | None = None
+    ) -> None:
+        ts = (ts if ts.tzinfo else ts.replace(tzinfo=UTC)).astimezone(UTC)
+        expires_at = ts.timestamp() + settings.HEARTBEAT_TTL_SEC
+        if (taxi_expiry_wheel.deadline(taxi_id) or 0.0) < expires_at:
+            taxi_expiry_wheel.schedule(taxi_id, expires_at)
+        position = (x, y) if x is not None and y is not None else None
+        current = self._pending.get(taxi_id)
+        if current is None:
+            self._pending[taxi_id] = (ts, *(position or (None, None)))
+            return
+        current_ts, cx, cy = current
+        if ts > current_ts:
+            # A heartbeat without a position keeps the last one reported.
+            self._pending[taxi_id] = (ts, *(position or (cx, cy)))
+        elif cx is None and position is not None:
+            self._pending[taxi_id] = (current_ts, *position)
+
+    def discard(self, public_id: uuid.UUID | str) -> None:
+        """Drop a buffered heartbeat so it cannot revive a taxi that just went offline."""
+        taxi_id = self._taxi_ids.get(uuid.UUID(str(public_id)))
+        if taxi_id is not None:
+            self._pending.pop(taxi_id, None)
+
+    def clear(self) -> None:
+        self._pending.clear()
+        self._taxi_ids.clear()
+
+    async def flush(self, db: AsyncSession) -> int:
+        """Write everything buffered so far in one transaction; returns the rows updated."""
+        if not self._pending:
+            return 0
+        batch, self._pending = self._pending, {}
+        started = time.perf_counter()
+        try:
+            updated = await crud.bulk_update_heartbeats(
+                db,
+                [(taxi_id, *beat) for taxi_id, beat in sorted(batch.items())],
+                # Revived taxis are free supply for queued orders.
+                on_revived=pending_order_matcher.wake,
+            )
+            await db.commit()
+        except BaseException:
+            # Also on cancellation (``stop()`` during the UPDATE): the final flush
+            # must still see this batch.
+            await db.rollback()
+            # Keep the heartbeats for the next flush unless newer ones arrived meanwhile.
+            for taxi_id, (ts, x, y) in batch.items():
+                self.record(taxi_id, ts, x, y)
+            raise
+        FLUSH_LATENCY.observe(time.perf_counter() - started)
+        FLUSH_SIZE.observe(len(batch))
+        return updated
+
+    async def start(self) -> None:
+        if self.running:
+            return
+        self._task = asyncio.create_task(self._run())
+
+    async def stop(self) -> None:
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+        try:
+            async with self._session_factory() as db:
+                await self.flush(db)
+        except Exception as exc:
+            logger.error(f"Final heartbeat flush failed: {exc}")
+
+    async def _run(self) -> None:
+        while True:
+            await asyncio.sleep(self._interval)
+            try:
+                async with self._session_factory() as db:
+                    await self.flush(db)
+            except Exception as exc:
+                logger.error(f"Heartbeat flush failed: {exc}")
+
+
+heartbeat_buffer = HeartbeatBuffer(
+    SessionLocal, flush_interval_ms=settings.HEARTBEAT_FLUSH_INTERVAL_MS
+)
+BUFFER_DEPTH.set_function(lambda: len(heartbeat_buffer))
@@ -1,19 +1,95 @@
 from __future__ import annotations
 
 import asyncio
+import time
+from collections.abc import Callable
 
-from dispatcher_service.app.adapters.crud import sweep_offline_taxis
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from common import metrics
+from common.logger import get_logger
+from dispatcher_service.app.adapters.crud import (
+    load_taxi_expiry_wheel,
+    mark_expired_taxis_offline,
+    sweep_offline_taxis,
+)
 from dispatcher_service.app.adapters.database import SessionLocal
+from dispatcher_service.app.domain.spatial_index import available_taxi_index
+from dispatcher_service.app.domain.timing_wheel import taxi_expiry_wheel
 from dispatcher_service.app.settings import settings
 
+logger = get_logger(__name__)
+
+SWEEPS = metrics.counter(
+    "dispatcher_offline_sweeps",
+    "Offline detection passes that found work: the startup sweep or expired wheel slots.",
+    ["kind"],
+)
+TAXIS_MARKED_OFFLINE = metrics.counter(
+    "dispatcher_taxis_marked_offline",
+    "Taxis set OFFLINE for missing heartbeats, by detection path.",
+    ["kind"],
+)
+
+
+async def reconcile_offline_taxis(
+    session_factory: Callable[..., AsyncSession] = SessionLocal,
+) -> int:
+    """Startup sweep over ``(status, last_seen_at)``, then seed the wheel from the survivors."""
+    ttl = max(1, settings.HEARTBEAT_TTL_SEC)
+    async with session_factory() as db:
+        swept = await sweep_offline_taxis(db, ttl_sec=ttl)
+        await load_taxi_expiry_wheel(db, ttl_sec=ttl)
+    SWEEPS.labels(kind="reconcile").inc()
+    TAXIS_MARKED_OFFLINE.labels(kind="reconcile").inc(swept)
+    logger.info(
+        f"Reconciling sweep marked {swept} taxis offline, tracking {len(taxi_expiry_wheel)}"
+    )
+    return swept
+
+
+async def expire_taxis(
+    now: float | None = None,
+    session_factory: Callable[..., AsyncSession] = SessionLocal,
+) -> int:
+    """
+    Mark taxis whose heartbeat deadline passed as OFFLINE; returns how many changed.
+
+    Expired taxis leave the spatial index right away, so nearest-taxi selection
+    stops offering them before the batched UPDATEs run.
+    """
+    expired = taxi_expiry_wheel.advance(time.time() if now is None else now)
+    if not expired:
+        return 0
+    for taxi_id in expired:
+        available_taxi_index.discard(taxi_id)
 
-async def heartbeat_sweeper() -> None:
-    interval = max(1, settings.HEARTBEAT_SWEEP_INTERVAL_SEC)
     ttl = max(1, settings.HEARTBEAT_TTL_SEC)
+    batch_size = max(1, settings.OFFLINE_BATCH_SIZE)
+    marked = 0
+    async with session_factory() as db:
+        for start in range(0, len(expired), batch_size):
+            batch = expired[start : start + batch_size]
+            offline = await mark_expired_taxis_offline(db, batch, ttl_sec=ttl)
+            marked += len(offline)
+            # The DB saw a newer heartbeat (e.g. written by another instance): track them again.
+            alive = set(batch).difference(offline)
+            if alive:
+                await load_taxi_expiry_wheel(db, ttl_sec=ttl, taxi_ids=alive)
+    SWEEPS.labels(kind="wheel").inc()
+    TAXIS_MARKED_OFFLINE.labels(kind="wheel").inc(marked)
+    return marked
+
+
+async def heartbeat_sweeper() -> None:
+    interval = max(1, settings.HEARTBEAT_WHEEL_TICK_MS) / 1000
+    try:
+        await reconcile_offline_taxis()
+    except Exception as exc:
+        logger.error(f"Reconciling offline sweep failed: {exc}")
     while True:
         try:
-            with SessionLocal() as db:
-                sweep_offline_taxis(db, ttl_sec=ttl)
-        except Exception:
-            pass
+            await expire_taxis()
+        except Exception as exc:
+            logger.error(f"Offline detection failed: {exc}")
         await asyncio.sleep(interval)
@@ -0,0 +1,130 @@
+from __future__ import annotations
+
+import asyncio
+from collections.abc import Callable, Iterable
+
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from common import metrics
+from common.logger import get_logger
+from dispatcher_service.app.adapters.database import SessionLocal
+from dispatcher_service.app.background.assignment_outbox import assignment_outbox_workers
+from dispatcher_service.app.domain.services import match_pending_orders
+from dispatcher_service.app.settings import settings
+
+logger = get_logger(__name__)
+
+PENDING_ORDERS = metrics.counter(
+    "dispatcher_pending_orders",
+    "Orders that waited for a free taxi, by outcome.",
+    ["outcome"],
+)
+
+
+class PendingOrderMatcher:
+    """
+    Matches queued orders with taxis as supply frees up.
+
+    Whatever frees a taxi (a drop-off, a revived or newly registered taxi) calls
+    :meth:`wake`; a poll every ``poll_interval`` seconds covers everything else,
+    including deadlines running out. Callers of :meth:`wait` are woken once an
+    order they wait on is matched or expired by this process.
+    """
+
+    def __init__(
+        self,
+        session_factory: Callable[..., AsyncSession],
+        batch_size: int,
+        poll_interval: float,
+    ) -> None:
+        self._session_factory = session_factory
+        self._batch_size = max(1, batch_size)
+        self._poll_interval = max(0.01, poll_interval)
+        self._wakeup: asyncio.Event | None = None
+        self._task: asyncio.Task | None = None
+        self._waiters: dict[int, list[asyncio.Future]] = {}
+
+    @property
+    def running(self) -> bool:
+        return self._task is not None and not self._task.done()
+
+    async def start(self) -> None:
+        if self.running:
+            return
+        self._wakeup = asyncio.Event()
+        self._task = asyncio.create_task(self._run())
+
+    async def stop(self) -> None:
+        if self._task is not None:
+            self._task.cancel()
+            await asyncio.gather(self._task, return_exceptions=True)
+            self._task = None
+        self._wakeup = None
+
+    def wake(self) -> None:
+        if self._wakeup is not None:
+            self._wakeup.set()
+
+    def clear(self) -> None:
+        for futures in self._waiters.values():
+            for future in futures:
+                future.cancel()
+        self._waiters.clear()
+
+    async def wait(self, trip_id: int, timeout: float) -> bool:
+        """Wait until ``trip_id`` leaves the queue; False if ``timeout`` ran out first."""
+        future = asyncio.get_running_loop().create_future()
+        self._waiters.setdefault(trip_id, []).append(future)
+        try:
+            await asyncio.wait_for(future, timeout)
+            return True
+        except TimeoutError:
+            return False
+        finally:
+            futures = self._waiters.get(trip_id, [])
+            if future in futures:
+                futures.remove(future)
+            if not futures:
+                self._waiters.pop(trip_id, None)
+
+    def _notify(self, trip_ids: Iterable[int]) -> None:
+        for trip_id in trip_ids:
+            for future in self._waiters.pop(trip_id, []):
+                if not future.done():
+                    future.set_result(None)
+
+    async def drain(self) -> int:
+        """Match pending orders until supply or the queue runs out; returns the orders matched."""
+        handled = 0
+        while True:
+            async with self._session_factory() as db:
+                matched, expired = await match_pending_orders(db, limit=self._batch_size)
+            PENDING_ORDERS.labels(outcome="matched").inc(len(matched))
+            PENDING_ORDERS.labels(outcome="expired").inc(len(expired))
+            self._notify([*matched, *expired])
+            if matched:
+                assignment_outbox_workers.wake()
+            handled += len(matched)
+            if len(matched) < self._batch_size:
+                return handled
+
+    async def _run(self) -> None:
+        wakeup = self._wakeup
+        assert wakeup is not None
+        while True:
+            wakeup.clear()
+            try:
+                await self.drain()
+            except Exception as exc:
+                logger.error(f"Pending order matching failed: {exc}")
+            try:
+                await asyncio.wait_for(wakeup.wait(), self._poll_interval)
+            except TimeoutError:
+                pass
+
+
+pending_order_matcher = PendingOrderMatcher(
+    SessionLocal,
+    batch_size=settings.ORDER_QUEUE_BATCH_SIZE,
+    poll_interval=settings.ORDER_QUEUE_POLL_INTERVAL_SEC,
+)
@@ -0,0 +1,96 @@
+from __future__ import annotations
+
+import asyncio
+import time
+from collections.abc import Callable
+from datetime import UTC, datetime, timedelta
+
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from common import metrics
+from common.logger import get_logger
+from common.schemas import RepositionPayload
+from dispatcher_service.app.adapters.crud import idle_taxi_callbacks, recent_order_origins
+from dispatcher_service.app.adapters.database import SessionLocal
+from dispatcher_service.app.adapters.http_client import post_json
+from dispatcher_service.app.domain.rebalancing import Reposition, plan_rebalance, region_demand
+from dispatcher_service.app.settings import settings
+
+logger = get_logger(__name__)
+
+REPOSITIONS = metrics.counter(
+    "dispatcher_taxi_repositions",
+    "Reposition commands sent to idle taxis, by outcome.",
+    ["outcome"],
+)
+
+# taxi id -> monotonic time until which it is not moved again
+_cooldown: dict[int, float] = {}
+
+
+def reposition_url(callback_url: str) -> str:
+    """Taxis register their ``/assign`` callback; ``/reposition`` sits next to it."""
+    return callback_url.rstrip("/").removesuffix("/assign") + "/reposition"
+
+
+async def _send(move: Reposition, callback_url: str) -> bool:
+    payload = RepositionPayload(x=move.x, y=move.y).model_dump()
+    try:
+        resp = await post_json(reposition_url(callback_url), payload)
+        ok = 200 <= resp.status_code < 300
+    except Exception as exc:  # noqa: BLE001
+        logger.error(f"Reposition of taxi {move.taxi_id} failed: {exc}")
+        ok = False
+    REPOSITIONS.labels(outcome="sent" if ok else "failed").inc()
+    return ok
+
+
+async def rebalance_idle_taxis(
+    session_factory: Callable[..., AsyncSession] = SessionLocal,
+) -> list[Reposition]:
+    """
+    One rebalancing round: compare order origins of the last ``REBALANCE_WINDOW_MIN``
+    with idle taxis per region and send reposition commands; returns the moves sent.
+
+    The dispatcher only learns the new position once the taxi reports it, so a
+    moved taxi is left alone for ``REBALANCE_COOLDOWN_SEC``.
+    """
+    now = time.monotonic()
+    for taxi_id in [taxi_id for taxi_id, until in _cooldown.items() if until <= now]:
+        del _cooldown[taxi_id]
+
+    since = datetime.now(UTC) - timedelta(minutes=settings.REBALANCE_WINDOW_MIN)
+    async with session_factory() as db:
+        origins = await recent_order_origins(db, since)
+        idle = [row for row in await idle_taxi_callbacks(db) if row[0] not in _cooldown]
+    callbacks = {taxi_id: callback_url for taxi_id, _, _, callback_url in idle}
+
+    region_size = max(1, settings.REBALANCE_REGION_SIZE)
+    moves = plan_rebalance(
+        [(taxi_id, x, y) for taxi_id, x, y, _ in idle],
+        region_demand(origins, settings.GRID_SIZE, region_size),
+        settings.GRID_SIZE,
+        region_size,
+        settings.REBALANCE_MAX_MOVES,
+    )
+    sent = await asyncio.gather(*(_send(move, callbacks[move.taxi_id]) for move in moves))
+    until = time.monotonic() + settings.REBALANCE_COOLDOWN_SEC
+    for move in moves:
+        _cooldown[move.taxi_id] = until
+    if moves:
+        logger.info(f"Rebalancing sent {sum(sent)}/{len(moves)} idle taxis toward demand")
+    return [move for move, ok in zip(moves, sent, strict=True) if ok]
+
+
+def clear_cooldowns() -> None:
+    _cooldown.clear()
+
+
+async def idle_taxi_rebalancer() -> None:
+    interval = max(1.0, settings.REBALANCE_INTERVAL_SEC)
+    while True:
+        await asyncio.sleep(interval)
+        try:
+            await rebalance_idle_taxis()
+        except Exception as exc:
+            logger.error(f"Idle taxi rebalancing failed: {exc}")
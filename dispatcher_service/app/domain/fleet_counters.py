@@ -0,0 +1,75 @@
+from __future__ import annotations
+
+from collections.abc import Iterable
+from datetime import UTC, datetime
+
+from dispatcher_service.app.domain.models import TaxiStatus, TripStatus
+
+
+class FleetCounters:
+    """
+    Number of taxis and trips per status, kept in memory.
+
+    ``crud`` applies every status transition after its transaction commits, so
+    reads cost nothing. Until :meth:`reset` loads the real numbers the counters
+    are not ``loaded`` and transitions are ignored; a periodic reconciliation
+    resets them again to correct any drift.
+    """
+
+    def __init__(self) -> None:
+        self.loaded = False
+        self.reconciled_at: datetime | None = None
+        self.transitions = 0
+        self.taxis: dict[TaxiStatus, int] = dict.fromkeys(TaxiStatus, 0)
+        self.trips: dict[TripStatus, int] = dict.fromkeys(TripStatus, 0)
+
+    def taxi_transition(
+        self, old: TaxiStatus | None, new: TaxiStatus | None, count: int = 1
+    ) -> None:
+        self._apply(self.taxis, old, new, count)
+
+    def trip_transition(
+        self, old: TripStatus | None, new: TripStatus | None, count: int = 1
+    ) -> None:
+        self._apply(self.trips, old, new, count)
+
+    def _apply(self, counts: dict, old: object, new: object, count: int) -> None:
+        if not self.loaded or old == new:
+            return
+        if old is not None:
+            counts[old] -= count
+        if new is not None:
+            counts[new] += count
+        self.transitions += 1
+
+    def reset(
+        self,
+        taxis: Iterable[tuple[TaxiStatus, int]],
+        trips: Iterable[tuple[TripStatus, int]],
+    ) -> dict[str, int]:
+        """Replace the counts with ones read from the database; returns the drift fixed."""
+        fresh_taxis = dict.fromkeys(TaxiStatus, 0) | dict(taxis)
+        fresh_trips = dict.fromkeys(TripStatus, 0) | dict(trips)
+        drift: dict[str, int] = {}
+        if self.loaded:
+            for prefix, current, fresh in (
+                ("taxi", self.taxis, fresh_taxis),
+                ("trip", self.trips, fresh_trips),
+            ):
+                for status, count in fresh.items():
+                    if current[status] != count:
+                        drift[f"{prefix}:{status.value}"] = count - current[status]
+        self.taxis, self.trips = fresh_taxis, fresh_trips
+        self.loaded = True
+        self.reconciled_at = datetime.now(UTC)
+        return drift
+
+    def clear(self) -> None:
+        self.loaded = False
+        self.reconciled_at = None
+        self.transitions = 0
+        self.taxis = dict.fromkeys(TaxiStatus, 0)
+        self.trips = dict.fromkeys(TripStatus, 0)
+
+
+fleet_counters = FleetCounters()
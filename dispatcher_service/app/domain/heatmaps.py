@@ -0,0 +1,56 @@
+"""
+Demand and supply heatmaps of the grid, computed with NumPy.
+
+Every layer is a ``size x size`` array indexed ``[y - 1, x - 1]``. Counts come
+from one ``np.bincount`` over the flattened cell index of a whole column, so
+the cost is a single pass in C no matter how many trips the window holds.
+"""
+
+from __future__ import annotations
+
+from collections.abc import Sequence
+
+import numpy as np
+
+HEATMAP_LAYERS = ("origins", "destinations", "available_taxis", "avg_waiting_time_min")
+
+
+def cell_counts(
+    xs: np.ndarray, ys: np.ndarray, size: int, weights: np.ndarray | None = None
+) -> np.ndarray:
+    """Number (or sum of ``weights``) of points per cell; points off the grid are dropped."""
+    inside = (xs >= 1) & (xs <= size) & (ys >= 1) & (ys <= size)
+    cells = (ys[inside] - 1) * size + (xs[inside] - 1)
+    counts = np.bincount(
+        cells.astype(np.intp),
+        weights=None if weights is None else weights[inside],
+        minlength=size * size,
+    )
+    return counts.reshape(size, size)
+
+
+def build_heatmaps(
+    size: int, trips: Sequence[Sequence], taxis: Sequence[Sequence]
+) -> dict[str, np.ndarray]:
+    """
+    ``trips`` are ``(start_x, start_y, end_x, end_y, waiting_time_min)`` rows,
+    ``taxis`` are ``(x, y)`` rows of available taxis. The average waiting time
+    is per origin cell over trips that were picked up, NaN where there were none.
+    """
+    trip_cols = np.array(trips, dtype=np.float64).reshape(-1, 5).T
+    start_x, start_y, end_x, end_y, waiting = trip_cols
+    start_x, start_y = start_x.astype(np.int64), start_y.astype(np.int64)
+    taxi_cols = np.array(taxis, dtype=np.int64).reshape(-1, 2).T
+
+    picked_up = ~np.isnan(waiting)
+    waited = cell_counts(start_x[picked_up], start_y[picked_up], size, waiting[picked_up])
+    pickups = cell_counts(start_x[picked_up], start_y[picked_up], size)
+    with np.errstate(invalid="ignore", divide="ignore"):
+        avg_waiting = np.where(pickups > 0, waited / pickups, np.nan)
+
+    return {
+        "origins": cell_counts(start_x, start_y, size),
+        "destinations": cell_counts(end_x.astype(np.int64), end_y.astype(np.int64), size),
+        "available_taxis": cell_counts(taxi_cols[0], taxi_cols[1], size),
+        "avg_waiting_time_min": avg_waiting,
+    }
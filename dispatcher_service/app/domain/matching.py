@@ -0,0 +1,107 @@
+from __future__ import annotations
+
+from collections.abc import Sequence
+
+INF = float("inf")
+
+
+def manhattan(x1: int, y1: int, x2: int, y2: int) -> int:
+    return abs(x1 - x2) + abs(y1 - y2)
+
+
+def min_cost_assignment(cost: Sequence[Sequence[float]]) -> list[tuple[int, int]]:
+    """
+    Solve the rectangular assignment problem (Hungarian algorithm, O(n^2 * m)).
+
+    Returns ``(row, col)`` pairs minimising the total cost. Every row is matched
+    when there are at least as many columns as rows; otherwise every column is.
+    """
+    n = len(cost)
+    m = len(cost[0]) if n else 0
+    if n == 0 or m == 0:
+        return []
+    if n > m:
+        return sorted((r, c) for c, r in min_cost_assignment(_transpose(cost)))
+
+    # Potentials and matching use 1-based indices; column 0 is a virtual column.
+    u = [0.0] * (n + 1)
+    v = [0.0] * (m + 1)
+    p = [0] * (m + 1)
+    way = [0] * (m + 1)
+    for i in range(1, n + 1):
+        _add_row(cost, i, u, v, p, way)
+    return sorted((p[j] - 1, j - 1) for j in range(1, m + 1) if p[j])
+
+
+def _transpose(cost: Sequence[Sequence[float]]) -> list[list[float]]:
+    return [list(column) for column in zip(*cost, strict=True)]
+
+
+def _add_row(
+    cost: Sequence[Sequence[float]],
+    i: int,
+    u: list[float],
+    v: list[float],
+    p: list[int],
+    way: list[int],
+) -> None:
+    """Match row ``i`` by growing a shortest augmenting path, then flip it."""
+    m = len(v) - 1
+    p[0] = i
+    j0 = 0
+    minv = [INF] * (m + 1)
+    used = [False] * (m + 1)
+    while True:
+        used[j0] = True
+        delta, j1 = _relax_columns(cost[p[j0] - 1], p[j0], j0, u, v, minv, used, way)
+        for j in range(m + 1):
+            if used[j]:
+                u[p[j]] += delta
+                v[j] -= delta
+            else:
+                minv[j] -= delta
+        j0 = j1
+        if p[j0] == 0:
+            break
+    while j0:
+        j1 = way[j0]
+        p[j0] = p[j1]
+        j0 = j1
+
+
+def _relax_columns(
+    row: Sequence[float],
+    i0: int,
+    j0: int,
+    u: list[float],
+    v: list[float],
+    minv: list[float],
+    used: list[bool],
+    way: list[int],
+) -> tuple[float, int]:
+    """Update the reduced costs reachable through row ``i0``; return the cheapest free column."""
+    delta = INF
+    j1 = 0
+    for j in range(1, len(v)):
+        if used[j]:
+            continue
+        cur = row[j - 1] - u[i0] - v[j]
+        if cur < minv[j]:
+            minv[j] = cur
+            way[j] = j0
+        if minv[j] < delta:
+            delta = minv[j]
+            j1 = j
+    return delta, j1
+
+
+def eta_after_current_trip(
+    route_cells: int, elapsed_min: float, min_per_cell: float, end_to_pickup: int
+) -> float:
+    """
+    Cells a busy taxi still drives before reaching a new pickup: what is left of
+    its current route (estimated from the time spent on it), then on from the
+    drop-off. Comparable with an available taxi's plain Manhattan distance.
+    """
+    left = max(0.0, route_cells - elapsed_min / max(min_per_cell, 1e-9))
+    return left + end_to_pickup
@@ -3,7 +3,7 @@ import uuid
 from datetime import UTC, datetime
 from typing import Optional
 
-from sqlalchemy import JSON, UUID, CheckConstraint, DateTime, ForeignKey
+from sqlalchemy import JSON, CheckConstraint, DateTime, ForeignKey, Index, Uuid
 from sqlalchemy import Enum as SQLAlchemyEnum
 from sqlalchemy.orm import DeclarativeBase, Mapped, mapped_column, relationship
 
@@ -25,16 +25,23 @@ class TripStatus(str, enum.Enum):
     CANCELLED = "cancelled"
 
 
+class OutboxStatus(str, enum.Enum):
+    PENDING = "pending"
+    DELIVERED = "delivered"
+    FAILED = "failed"
+
+
 class Taxi(Base):
     __tablename__ = "taxis"
     __table_args__ = (
         CheckConstraint("x BETWEEN 1 AND 100", name="ck_taxis_x_range"),
         CheckConstraint("y BETWEEN 1 AND 100", name="ck_taxis_y_range"),
+        Index("ix_taxis_status_last_seen_at", "status", "last_seen_at"),
     )
 
     id: Mapped[int] = mapped_column(primary_key=True, index=True)  # internal PK
     public_id: Mapped[uuid.UUID] = mapped_column(
-        UUID(as_uuid=True), unique=True, nullable=False, default=uuid.uuid4
+        Uuid(as_uuid=True), unique=True, nullable=False, default=uuid.uuid4
     )
     status: Mapped[TaxiStatus] = mapped_column(
         SQLAlchemyEnum(TaxiStatus), default=TaxiStatus.AVAILABLE, nullable=False
@@ -50,10 +57,15 @@ class Taxi(Base):
 
 class Trip(Base):
     __tablename__ = "trips"
+    __table_args__ = (
+        Index("ix_trips_status_deadline_at", "status", "deadline_at"),
+        Index("ix_trips_taxi_id_status", "taxi_id", "status"),
+        Index("ix_trips_taxi_id_dropoff_time", "taxi_id", "dropoff_time"),
+    )
 
     id: Mapped[int] = mapped_column(primary_key=True, index=True)
     public_id: Mapped[uuid.UUID] = mapped_column(
-        UUID(as_uuid=True), unique=True, nullable=False, default=uuid.uuid4
+        Uuid(as_uuid=True), unique=True, nullable=False, default=uuid.uuid4
     )
     user_id: Mapped[int] = mapped_column(nullable=False)
     taxi_id: Mapped[int | None] = mapped_column(ForeignKey("taxis.id"), nullable=True)
@@ -65,14 +77,49 @@ class Trip(Base):
         SQLAlchemyEnum(TripStatus), default=TripStatus.REQUESTED, nullable=False
     )
     request_time: Mapped[datetime] = mapped_column(
-        default=lambda: datetime.now(UTC), nullable=False
+        DateTime(timezone=True), default=lambda: datetime.now(UTC), nullable=False
+    )
+    pickup_time: Mapped[datetime | None] = mapped_column(
+        DateTime(timezone=True), nullable=True, default=None
+    )
+    dropoff_time: Mapped[datetime | None] = mapped_column(
+        DateTime(timezone=True), nullable=True, default=None
     )
-    pickup_time: Mapped[datetime | None] = mapped_column(nullable=True, default=None)
-    dropoff_time: Mapped[datetime | None] = mapped_column(nullable=True, default=None)
 
     waiting_time_min: Mapped[int | None] = mapped_column(nullable=True, default=None)
     travel_time_min: Mapped[int | None] = mapped_column(nullable=True, default=None)
     total_distance: Mapped[int | None] = mapped_column(nullable=True, default=None)
     route_meta: Mapped[dict | None] = mapped_column(JSON, nullable=True, default=None)
+    # Set on orders queued without a taxi: they are cancelled if still unmatched by then.
+    deadline_at: Mapped[datetime | None] = mapped_column(
+        DateTime(timezone=True), nullable=True, default=None
+    )
 
     taxi: Mapped[Optional["Taxi"]] = relationship(back_populates="trips")
+
+
+class AssignmentOutbox(Base):
+    """Taxi callback still to be delivered for a reserved trip; written with the reservation."""
+
+    __tablename__ = "assignment_outbox"
+    __table_args__ = (
+        Index("ix_assignment_outbox_status_next_attempt_at", "status", "next_attempt_at"),
+    )
+
+    id: Mapped[int] = mapped_column(primary_key=True)
+    trip_id: Mapped[int] = mapped_column(ForeignKey("trips.id"), unique=True, nullable=False)
+    status: Mapped[OutboxStatus] = mapped_column(
+        SQLAlchemyEnum(OutboxStatus), default=OutboxStatus.PENDING, nullable=False
+    )
+    attempts: Mapped[int] = mapped_column(default=0, nullable=False)
+    next_attempt_at: Mapped[datetime] = mapped_column(
+        DateTime(timezone=True), default=lambda: datetime.now(UTC), nullable=False
+    )
+    created_at: Mapped[datetime] = mapped_column(
+        DateTime(timezone=True), default=lambda: datetime.now(UTC), nullable=False
+    )
+    processed_at: Mapped[datetime | None] = mapped_column(
+        DateTime(timezone=True), nullable=True, default=None
+    )
+
+    trip: Mapped["Trip"] = relationship()
@@ -0,0 +1,121 @@
+from __future__ import annotations
+
+import asyncio
+from collections.abc import Callable
+
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from common.logger import get_logger
+from common.schemas import OrderCreate
+from dispatcher_service.app.adapters.database import SessionLocal
+from dispatcher_service.app.domain import models
+from dispatcher_service.app.domain.services import assign_orders_batch
+from dispatcher_service.app.settings import settings
+
+logger = get_logger(__name__)
+
+_Pending = tuple[OrderCreate, "asyncio.Future[models.Trip | None]"]
+
+
+class OrderBatcher:
+    """
+    Collects incoming orders for a short window and assigns them as one batch.
+
+    Each caller of :meth:`submit` still gets its own trip (or ``None``) back.
+    """
+
+    def __init__(
+        self,
+        session_factory: Callable[..., AsyncSession],
+        window_ms: int,
+        max_size: int,
+    ) -> None:
+        self._session_factory = session_factory
+        self._window = max(0, window_ms) / 1000
+        self._max_size = max(1, max_size)
+        self._queue: asyncio.Queue[_Pending] | None = None
+        self._task: asyncio.Task | None = None
+        self._inflight: set[asyncio.Task] = set()
+
+    @property
+    def running(self) -> bool:
+        return self._task is not None and not self._task.done()
+
+    async def start(self) -> None:
+        if self.running:
+            return
+        self._queue = asyncio.Queue()
+        self._task = asyncio.create_task(self._run())
+
+    async def stop(self) -> None:
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+        if self._inflight:
+            await asyncio.gather(*self._inflight, return_exceptions=True)
+        while self._queue is not None and not self._queue.empty():
+            _, fut = self._queue.get_nowait()
+            if not fut.done():
+                fut.set_exception(RuntimeError("Order batcher stopped"))
+
+    async def submit(self, order: OrderCreate) -> models.Trip | None:
+        await self.start()
+        fut: asyncio.Future[models.Trip | None] = asyncio.get_running_loop().create_future()
+        self._queue.put_nowait((order, fut))  # type: ignore[union-attr]
+        return await fut
+
+    async def _collect(self) -> list[_Pending]:
+        queue = self._queue
+        assert queue is not None
+        batch = [await queue.get()]
+        loop = asyncio.get_running_loop()
+        deadline = loop.time() + self._window
+        try:
+            while len(batch) < self._max_size:
+                timeout = deadline - loop.time()
+                if timeout <= 0:
+                    break
+                try:
+                    batch.append(await asyncio.wait_for(queue.get(), timeout))
+                except TimeoutError:
+                    break
+        except asyncio.CancelledError:
+            # Hand the partial batch back so stop() fails it along with the rest of the queue.
+            for item in batch:
+                queue.put_nowait(item)
+            raise
+        return batch
+
+    async def _run(self) -> None:
+        while True:
+            batch = await self._collect()
+            task = asyncio.create_task(self._process(batch))
+            self._inflight.add(task)
+            task.add_done_callback(self._inflight.discard)
+
+    async def _process(self, batch: list[_Pending]) -> None:
+        orders = [order for order, _ in batch]
+        logger.info(f"Assigning batch of {len(orders)} orders")
+        try:
+            async with self._session_factory(expire_on_commit=False) as db:
+                trips = await assign_orders_batch(db, orders)
+        except Exception as exc:
+            logger.error(f"Batch assignment failed: {exc}")
+            for _, fut in batch:
+                if not fut.done():
+                    fut.set_exception(exc)
+            return
+        for (_, fut), trip in zip(batch, trips, strict=True):
+            if not fut.done():
+                fut.set_result(trip)
+
+
+order_batcher = OrderBatcher(
+    SessionLocal,
+    window_ms=settings.ORDER_BATCH_WINDOW_MS,
+    max_size=settings.ORDER_BATCH_MAX_SIZE,
+)
@@ -0,0 +1,83 @@
+"""
+Packed binary fleet state for the grid view.
+
+Layout (little endian)::
+
+    header  magic "TXR1", width u16, height u16, version u32,
+            taxis available/busy/offline u32 x3,
+            trips active/completed/cancelled u32 x3        (36 bytes)
+            (trip totals cover every trip, not just the ones drawn)
+    mask    u8  [width * height]   bit flags per cell, see ``*_BIT``
+    counts  u16 [width * height]   taxis per cell (saturating)
+
+Cells are row-major, cell ``(x, y)`` sits at ``(y - 1) * width + (x - 1)``.
+"""
+
+from __future__ import annotations
+
+import struct
+import sys
+from array import array
+from collections.abc import Iterable, Mapping
+
+from dispatcher_service.app.domain.models import TaxiStatus, TripStatus
+
+MAGIC = b"TXR1"
+HEADER = struct.Struct("<4sHHI6I")
+
+TRIP_START_BIT = 1 << 0
+TRIP_END_BIT = 1 << 1
+TAXI_BITS = {
+    TaxiStatus.AVAILABLE: 1 << 2,
+    TaxiStatus.BUSY: 1 << 3,
+    TaxiStatus.OFFLINE: 1 << 4,
+}
+_TRIP_STATS = {
+    TripStatus.REQUESTED: 0,
+    TripStatus.IN_PROGRESS: 0,
+    TripStatus.COMPLETED: 1,
+    TripStatus.CANCELLED: 2,
+}
+_MAX_COUNT = 0xFFFF
+
+
+def pack_fleet_raster(
+    size: int,
+    version: int,
+    taxi_cells: Iterable[tuple[int, int, TaxiStatus, int]],
+    trip_totals: Mapping[TripStatus, int],
+    trips: Iterable[tuple[int, int, int, int]],
+) -> bytes:
+    """
+    Pack per-cell taxi counts ``(x, y, status, count)``, fleet-wide trip counts
+    per status and the endpoints ``(start_x, start_y, end_x, end_y)`` of the
+    trips to draw into the raster described above.
+    """
+    mask = bytearray(size * size)
+    counts = array("H", bytes(2 * size * size))
+    taxi_totals = dict.fromkeys(TAXI_BITS, 0)
+    trip_stats = [0, 0, 0]
+    for status, count in trip_totals.items():
+        trip_stats[_TRIP_STATS[status]] += count
+
+    for x, y, status, count in taxi_cells:
+        cell = (y - 1) * size + (x - 1)
+        mask[cell] |= TAXI_BITS[status]
+        counts[cell] = min(_MAX_COUNT, counts[cell] + count)
+        taxi_totals[status] += count
+
+    for start_x, start_y, end_x, end_y in trips:
+        mask[(start_y - 1) * size + (start_x - 1)] |= TRIP_START_BIT
+        mask[(end_y - 1) * size + (end_x - 1)] |= TRIP_END_BIT
+
+    if sys.byteorder != "little":
+        counts.byteswap()
+    header = HEADER.pack(
+        MAGIC,
+        size,
+        size,
+        version & 0xFFFFFFFF,
+        *(taxi_totals[status] for status in TAXI_BITS),
+        *trip_stats,
+    )
+    return header + bytes(mask) + counts.tobytes()
@@ -0,0 +1,88 @@
+"""
+Planning of idle-taxi moves toward regions where recent orders outnumber supply.
+
+The grid is split into square regions. Each region's fair share of the idle
+fleet is proportional to its share of recent order origins; regions holding
+more idle taxis than that give whole taxis to regions holding fewer, and the
+pairing of surplus taxis with deficit slots minimises the total distance
+driven (:func:`min_cost_assignment`).
+"""
+
+from __future__ import annotations
+
+import math
+from collections.abc import Sequence
+from dataclasses import dataclass
+
+import numpy as np
+
+from dispatcher_service.app.domain.matching import manhattan, min_cost_assignment
+
+
+@dataclass(frozen=True)
+class Reposition:
+    taxi_id: int
+    x: int
+    y: int
+
+
+def region_demand(
+    origins: Sequence[tuple[int, int]], grid_size: int, region_size: int
+) -> np.ndarray:
+    """Order origins per region, as a flat array indexed ``ry * per_side + rx``."""
+    per_side = math.ceil(grid_size / region_size)
+    if not origins:
+        return np.zeros(per_side * per_side, dtype=np.int64)
+    xs, ys = np.array(origins, dtype=np.int64).reshape(-1, 2).T
+    inside = (xs >= 1) & (xs <= grid_size) & (ys >= 1) & (ys <= grid_size)
+    regions = ((ys[inside] - 1) // region_size) * per_side + (xs[inside] - 1) // region_size
+    return np.bincount(regions, minlength=per_side * per_side)
+
+
+def plan_rebalance(
+    idle_taxis: Sequence[tuple[int, int, int]],
+    demand: np.ndarray,
+    grid_size: int,
+    region_size: int,
+    max_moves: int,
+) -> list[Reposition]:
+    """
+    Moves of ``(taxi_id, x, y)`` idle taxis toward the centres of under-served
+    regions; at most ``max_moves``, largest deficits first.
+    """
+    total_demand = int(demand.sum())
+    if not idle_taxis or total_demand == 0 or max_moves <= 0:
+        return []
+    per_side = math.ceil(grid_size / region_size)
+
+    def region_of(x: int, y: int) -> int:
+        return ((y - 1) // region_size) * per_side + (x - 1) // region_size
+
+    by_region: dict[int, list[tuple[int, int, int]]] = {}
+    for taxi in idle_taxis:
+        by_region.setdefault(region_of(taxi[1], taxi[2]), []).append(taxi)
+    target = demand * (len(idle_taxis) / total_demand)
+
+    spare: list[tuple[int, int, int]] = []
+    slots: list[tuple[float, int]] = []
+    for region in range(per_side * per_side):
+        taxis = by_region.get(region, [])
+        gap = target[region] - len(taxis)
+        if gap <= -1:
+            spare.extend(sorted(taxis)[: int(-gap)])
+        elif gap >= 1:
+            slots.extend((gap - i, region) for i in range(int(gap)))
+    slots = sorted(slots, reverse=True)[: min(max_moves, len(spare))]
+    if not slots:
+        return []
+
+    def centre(region: int) -> tuple[int, int]:
+        ry, rx = divmod(region, per_side)
+        return (
+            min(grid_size, rx * region_size + (region_size + 1) // 2),
+            min(grid_size, ry * region_size + (region_size + 1) // 2),
+        )
+
+    centres = [centre(region) for _, region in slots]
+    cost = [[manhattan(x, y, cx, cy) for _, x, y in spare] for cx, cy in centres]
+    return [Reposition(spare[col][0], *centres[row]) for row, col in min_cost_assignment(cost)]
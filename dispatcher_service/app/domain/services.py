@@ -1,70 +1,294 @@
+import asyncio
+import time
+from collections.abc import Sequence
+from datetime import UTC, datetime, timedelta
+
 from sqlalchemy.exc import SQLAlchemyError
-from sqlalchemy.orm import Session
+from sqlalchemy.ext.asyncio import AsyncSession
 
+from common import metrics
+from common.logger import get_logger
 from common.schemas import AssignPayload, OrderCreate
 from dispatcher_service.app.adapters import crud
 from dispatcher_service.app.adapters.http_client import post_json
 from dispatcher_service.app.domain import models
+from dispatcher_service.app.domain.matching import manhattan, min_cost_assignment
 from dispatcher_service.app.settings import settings
 
+logger = get_logger(__name__)
+
+ASSIGNMENT_STAGE = metrics.histogram(
+    "dispatcher_assignment_stage_seconds",
+    "Time spent in each stage of assigning orders to taxis.",
+    ["stage"],
+)
+CALLBACK_RETRIES = metrics.counter(
+    "dispatcher_taxi_callback_retries",
+    "Assign callback attempts repeated after a failed or rejected one.",
+)
+COMPENSATIONS = metrics.counter(
+    "dispatcher_assignment_compensations",
+    "Trips cancelled because their taxi never accepted the assignment.",
+)
+
+
+async def _pick_taxi_for_update(
+    db: AsyncSession, x: int, y: int
+) -> tuple[models.Taxi, tuple[int, int]] | None:
+    """Lock the taxi ``MATCHING_POLICY`` picks for a pickup at ``(x, y)``, with its origin."""
+    if settings.MATCHING_POLICY == "lookahead":
+        return await crud.pick_taxi_by_eta_for_update(db, x, y)
+    taxi = await crud.pick_closest_available_taxi_for_update(db, x, y)
+    return (taxi, (taxi.x, taxi.y)) if taxi is not None else None
+
 
-def _create_trip_and_reserve_taxi(
-    db: Session, order: OrderCreate
+async def _create_trip_and_reserve_taxi(
+    db: AsyncSession, order: OrderCreate
 ) -> tuple[models.Trip, models.Taxi] | None:
     try:
-        taxi = crud.pick_closest_available_taxi_for_update(db, order.start_x, order.start_y)
-        if taxi is None:
+        with ASSIGNMENT_STAGE.labels(stage="pick").time():
+            picked = await _pick_taxi_for_update(db, order.start_x, order.start_y)
+        if picked is None:
             return None
+        taxi, origin = picked
         crud.mark_taxi_busy(db, taxi)
-        trip = crud.create_trip_requested(db, order, taxi_id=taxi.id)
-        db.commit()
-        db.refresh(trip)
-        db.refresh(taxi)
+        trip = crud.create_trip_requested(db, order, taxi_id=taxi.id, taxi_position=origin)
+        crud.enqueue_assignment(db, trip)
+        # Sessions don't expire on commit, so no refresh is needed here.
+        with ASSIGNMENT_STAGE.labels(stage="commit").time():
+            await db.commit()
         return trip, taxi
     except SQLAlchemyError:
-        db.rollback()
+        await db.rollback()
+        raise
+
+
+async def _match_batch(db: AsyncSession, orders: Sequence[OrderCreate]) -> dict[int, int]:
+    """Min-cost matching of orders to candidate taxis; returns ``{order_index: taxi_id}``."""
+    candidates = await crud.available_taxi_candidates(
+        db,
+        [(order.start_x, order.start_y) for order in orders],
+        per_point=settings.ORDER_BATCH_CANDIDATES_PER_ORDER,
+    )
+    taxi_ids = list(candidates)
+    cost = [
+        [manhattan(order.start_x, order.start_y, *candidates[taxi_id]) for taxi_id in taxi_ids]
+        for order in orders
+    ]
+    return {row: taxi_ids[col] for row, col in min_cost_assignment(cost)}
+
+
+async def _create_trips_and_reserve_taxis(
+    db: AsyncSession, orders: Sequence[OrderCreate]
+) -> list[tuple[models.Trip, models.Taxi] | None]:
+    try:
+        with ASSIGNMENT_STAGE.labels(stage="match").time():
+            chosen = await _match_batch(db, orders)
+        with ASSIGNMENT_STAGE.labels(stage="pick").time():
+            locked = {
+                taxi.id: taxi
+                for taxi in await crud.lock_available_taxis_for_update(db, chosen.values())
+            }
+
+        reserved: list[tuple[models.Trip, models.Taxi] | None] = [None] * len(orders)
+        taken: set[int] = set()
+        for i, order in enumerate(orders):
+            taxi = locked.get(chosen.get(i, -1))
+            if taxi is None:
+                # Chosen taxi was grabbed meanwhile (or supply ran out): fall back to greedy.
+                taxi = await crud.pick_closest_available_taxi_for_update(
+                    db, order.start_x, order.start_y, exclude=taken | locked.keys()
+                )
+                if taxi is None:
+                    continue
+            taken.add(taxi.id)
+            crud.mark_taxi_busy(db, taxi)
+            trip = crud.create_trip_requested(
+                db, order, taxi_id=taxi.id, taxi_position=(taxi.x, taxi.y)
+            )
+            crud.enqueue_assignment(db, trip)
+            reserved[i] = (trip, taxi)
+
+        with ASSIGNMENT_STAGE.labels(stage="commit").time():
+            await db.commit()
+        return reserved
+    except SQLAlchemyError:
+        await db.rollback()
         raise
 
 
-async def _notify_taxi_assignment(taxi: models.Taxi, trip: models.Trip, order: OrderCreate) -> bool:
+async def _notify_taxi_assignment(taxi: models.Taxi, trip: models.Trip) -> bool:
     payload = AssignPayload(
         trip_id=trip.id,
-        start_x=order.start_x,
-        start_y=order.start_y,
-        end_x=order.end_x,
-        end_y=order.end_y,
+        start_x=trip.start_x,
+        start_y=trip.start_y,
+        end_x=trip.end_x,
+        end_y=trip.end_y,
     ).model_dump()
 
-    for _ in range(max(1, settings.ASSIGN_RETRIES)):
+    # One budget for the whole assignment: every attempt's timeout and the
+    # backoff between attempts are cut to whatever is left of it.
+    deadline = time.monotonic() + settings.ASSIGN_BUDGET_SEC
+    attempts = max(1, settings.ASSIGN_RETRIES)
+    for attempt in range(attempts):
+        remaining = deadline - time.monotonic()
+        if remaining <= 0:
+            break
         try:
-            resp = await post_json(taxi.callback_url, payload)  # type: ignore[arg-type]
+            resp = await post_json(
+                taxi.callback_url,  # type: ignore[arg-type]
+                payload,
+                timeout=min(settings.ASSIGN_TIMEOUT_SEC, remaining),
+            )
             if 200 <= resp.status_code < 300:
                 return True
-        except Exception:
-            pass
+        except Exception as exc:  # noqa: BLE001
+            logger.error(
+                f"Assign callback for trip {trip.id} failed "
+                f"(attempt {attempt + 1}/{attempts}): {exc}"
+            )
+        if attempt + 1 < attempts:
+            CALLBACK_RETRIES.inc()
+            backoff = min(settings.ASSIGN_BACKOFF_SEC * (attempt + 1), deadline - time.monotonic())
+            if backoff > 0:
+                await asyncio.sleep(backoff)
+    logger.error(f"Giving up on assign callback for trip {trip.id}")
     return False
 
 
-def _compensate_failed_assignment(db: Session, trip: models.Trip, taxi: models.Taxi) -> None:
-    try:
-        trip.status = models.TripStatus.CANCELLED
-        crud.mark_taxi_available(db, taxi)
-        db.add(trip)
-        db.commit()
-    except SQLAlchemyError:
-        db.rollback()
-        # best-effort
+async def _timed_notify_taxi_assignment(taxi: models.Taxi, trip: models.Trip) -> bool:
+    with ASSIGNMENT_STAGE.labels(stage="callback").time():
+        return await _notify_taxi_assignment(taxi, trip)
+
+
+async def _compensate_failed_assignments(db: AsyncSession, trip_ids: Sequence[int]) -> None:
+    """Cancel trips whose taxi never accepted them and release their taxis."""
+    for trip in await crud.lock_trips_for_update(db, trip_ids):
+        # The taxi may have picked the passenger up even though its answer was lost.
+        if trip.status != models.TripStatus.REQUESTED:
+            continue
+        crud.mark_trip_cancelled(db, trip)
+        COMPENSATIONS.inc()
+        if trip.taxi is None or trip.taxi.status != models.TaxiStatus.BUSY:
+            continue
+        # A queued trip's taxi is still busy with the trip ahead of it.
+        if not await crud.has_active_trips(db, trip.taxi.id, exclude=trip_ids):
+            crud.mark_taxi_available(db, trip.taxi)
 
 
-async def assign_order(db: Session, order: OrderCreate) -> models.Trip | None:
-    reserved = _create_trip_and_reserve_taxi(db, order)
+async def assign_order(db: AsyncSession, order: OrderCreate) -> models.Trip | None:
+    """
+    Reserve the nearest taxi and queue its callback in one transaction.
+
+    The callback itself is delivered by the assignment outbox workers, so the
+    caller never waits on the taxi.
+    """
+    reserved = await _create_trip_and_reserve_taxi(db, order)
     if not reserved:
         return None
+    trip, _ = reserved
+    return trip
+
 
-    trip, taxi = reserved
-    success = await _notify_taxi_assignment(taxi, trip, order)
-    if success:
+async def assign_orders_batch(
+    db: AsyncSession, orders: Sequence[OrderCreate]
+) -> list[models.Trip | None]:
+    """
+    Assign a whole batch of orders at once: one min-cost matching over Manhattan
+    pickup distance and one reservation transaction that also queues the callbacks.
+    """
+    if not orders:
+        return []
+    reserved = await _create_trips_and_reserve_taxis(db, orders)
+    return [pair[0] if pair is not None else None for pair in reserved]
+
+
+async def queue_order(db: AsyncSession, order: OrderCreate) -> models.Trip:
+    """
+    Store an order no taxi was free for as a pending trip (REQUESTED, no taxi).
+
+    It waits for :func:`match_pending_orders` until ``order.max_wait_sec`` (or
+    ``ORDER_QUEUE_MAX_WAIT_SEC``) has passed, after which it is cancelled.
+    """
+    wait = order.max_wait_sec
+    if wait is None:
+        wait = settings.ORDER_QUEUE_MAX_WAIT_SEC
+    deadline_at = datetime.now(UTC) + timedelta(seconds=wait)
+    try:
+        trip = crud.create_trip_requested(db, order, taxi_id=None, deadline_at=deadline_at)
+        await db.commit()
         return trip
+    except SQLAlchemyError:
+        await db.rollback()
+        raise
+
+
+async def match_pending_orders(db: AsyncSession, limit: int) -> tuple[list[int], list[int]]:
+    """
+    Give free taxis to the oldest pending orders, in one transaction.
+
+    Expired orders are cancelled first. Orders are matched one by one with the
+    same policy as new ones and their callbacks queued in the outbox; matching
+    stops at the first order no taxi is found for. Returns the ids of the
+    matched and of the expired trips.
+    """
+    now = datetime.now(UTC)
+    matched: list[int] = []
+    try:
+        expired = await crud.cancel_expired_pending_trips(db, now)
+        for trip in await crud.lock_pending_trips_for_update(db, now, limit):
+            picked = await _pick_taxi_for_update(db, trip.start_x, trip.start_y)
+            if picked is None:
+                break
+            taxi, origin = picked
+            crud.mark_taxi_busy(db, taxi)
+            crud.assign_pending_trip(db, trip, taxi, origin)
+            crud.enqueue_assignment(db, trip)
+            # The session does not autoflush: the next pick must see this taxi as taken.
+            await db.flush()
+            matched.append(trip.id)
+        await db.commit()
+    except SQLAlchemyError:
+        await db.rollback()
+        raise
+    return matched, expired
+
+
+async def deliver_pending_assignments(db: AsyncSession, limit: int) -> int:
+    """
+    Deliver one batch of due outbox entries; returns how many were claimed.
+
+    The claim is committed before any callback goes out, so no connection is held
+    while taxis answer. Failed deliveries are compensated in the same transaction
+    that records the outcomes.
+    """
+    try:
+        with ASSIGNMENT_STAGE.labels(stage="outbox_claim").time():
+            entries = await crud.claim_due_assignments(
+                db, limit=limit, lease_sec=settings.OUTBOX_LEASE_SEC
+            )
+            await db.commit()
+    except SQLAlchemyError:
+        await db.rollback()
+        raise
+    if not entries:
+        return 0
 
-    _compensate_failed_assignment(db, trip, taxi)
-    return None
+    outcomes = await asyncio.gather(
+        *(_timed_notify_taxi_assignment(entry.trip.taxi, entry.trip) for entry in entries)
+    )
+    delivered = [entry.id for entry, ok in zip(entries, outcomes, strict=True) if ok]
+    failed = [entry for entry, ok in zip(entries, outcomes, strict=True) if not ok]
+
+    try:
+        await crud.mark_assignments_processed(db, delivered, models.OutboxStatus.DELIVERED)
+        await crud.mark_assignments_processed(
+            db, [entry.id for entry in failed], models.OutboxStatus.FAILED
+        )
+        await _compensate_failed_assignments(db, [entry.trip_id for entry in failed])
+        await db.commit()
+    except SQLAlchemyError as exc:
+        await db.rollback()
+        # Entries stay claimed and are retried once their lease runs out.
+        logger.error(f"Could not record outcome of {len(entries)} assignments: {exc}")
+    return len(entries)
@@ -0,0 +1,54 @@
+from __future__ import annotations
+
+import math
+
+
+class QuantileSketch:
+    """
+    Mergeable quantile sketch with relative error ``alpha`` (DDSketch-style).
+
+    Values fall into logarithmic buckets ``gamma**(i-1) < v <= gamma**i`` with
+    ``gamma = (1 + alpha) / (1 - alpha)``, so any quantile is answered within
+    ``alpha`` of the true value. Two sketches with the same ``alpha`` merge by
+    adding bucket counts, which is what makes per-minute, per-cell rollups
+    combinable over arbitrary windows. Values ``<= 0`` share one zero bucket.
+    """
+
+    __slots__ = ("alpha", "count", "zero_count", "_buckets", "_gamma_log")
+
+    def __init__(self, alpha: float = 0.01) -> None:
+        self.alpha = alpha
+        self._gamma_log = math.log((1 + alpha) / (1 - alpha))
+        self._buckets: dict[int, int] = {}
+        self.zero_count = 0
+        self.count = 0
+
+    def add(self, value: float, count: int = 1) -> None:
+        if value <= 0:
+            self.zero_count += count
+        else:
+            index = math.ceil(math.log(value) / self._gamma_log)
+            self._buckets[index] = self._buckets.get(index, 0) + count
+        self.count += count
+
+    def merge(self, other: QuantileSketch) -> None:
+        if other.alpha != self.alpha:
+            raise ValueError("Cannot merge sketches with different accuracy")
+        for index, count in other._buckets.items():
+            self._buckets[index] = self._buckets.get(index, 0) + count
+        self.zero_count += other.zero_count
+        self.count += other.count
+
+    def quantile(self, q: float) -> float | None:
+        if self.count == 0:
+            return None
+        rank = q * (self.count - 1)
+        seen = self.zero_count
+        if rank < seen:
+            return 0.0
+        for index in sorted(self._buckets):
+            seen += self._buckets[index]
+            if rank < seen:
+                # Midpoint of the bucket in relative terms: within alpha of any value in it.
+                return 2 * math.exp(index * self._gamma_log) / (1 + math.exp(self._gamma_log))
+        return None
@@ -0,0 +1,119 @@
+from __future__ import annotations
+
+import heapq
+from collections.abc import Iterable, Iterator
+
+from dispatcher_service.app.settings import settings
+
+
+class TaxiSpatialIndex:
+    """
+    Cell-bucketed index of taxi positions on the grid.
+
+    The grid is split into square cells of ``cell_size`` units. Nearest-taxi
+    lookups walk the cells in expanding Manhattan rings around the query cell
+    and stop as soon as no unvisited ring can hold a closer taxi.
+    """
+
+    def __init__(self, grid_size: int = 100, cell_size: int = 5) -> None:
+        self.grid_size = grid_size
+        self.cell_size = max(1, cell_size)
+        self.cells_per_side = -(-grid_size // self.cell_size)
+        self.loaded = False
+        self._positions: dict[int, tuple[int, int]] = {}
+        self._cells: dict[tuple[int, int], set[int]] = {}
+
+    def __len__(self) -> int:
+        return len(self._positions)
+
+    def __contains__(self, taxi_id: object) -> bool:
+        return taxi_id in self._positions
+
+    def _cell_of(self, x: int, y: int) -> tuple[int, int]:
+        return (x - 1) // self.cell_size, (y - 1) // self.cell_size
+
+    def position(self, taxi_id: int) -> tuple[int, int] | None:
+        return self._positions.get(taxi_id)
+
+    def add(self, taxi_id: int, x: int, y: int) -> None:
+        """Insert the taxi or move it if it is already indexed."""
+        previous = self._positions.get(taxi_id)
+        if previous == (x, y):
+            return
+        if previous is not None:
+            self._remove_from_cell(taxi_id, previous)
+        self._positions[taxi_id] = (x, y)
+        self._cells.setdefault(self._cell_of(x, y), set()).add(taxi_id)
+
+    def discard(self, taxi_id: int) -> None:
+        previous = self._positions.pop(taxi_id, None)
+        if previous is not None:
+            self._remove_from_cell(taxi_id, previous)
+
+    def _remove_from_cell(self, taxi_id: int, position: tuple[int, int]) -> None:
+        cell = self._cell_of(*position)
+        bucket = self._cells.get(cell)
+        if bucket is None:
+            return
+        bucket.discard(taxi_id)
+        if not bucket:
+            del self._cells[cell]
+
+    def rebuild(self, taxis: Iterable[tuple[int, int, int]]) -> None:
+        """Replace the index content with ``(taxi_id, x, y)`` rows."""
+        self.clear()
+        for taxi_id, x, y in taxis:
+            self.add(taxi_id, x, y)
+        self.loaded = True
+
+    def clear(self) -> None:
+        self._positions.clear()
+        self._cells.clear()
+        self.loaded = False
+
+    def _ring(self, cx: int, cy: int, radius: int) -> Iterator[tuple[int, int]]:
+        if radius == 0:
+            yield cx, cy
+            return
+        for dx in range(-radius, radius + 1):
+            dy = radius - abs(dx)
+            yield cx + dx, cy + dy
+            if dy:
+                yield cx + dx, cy - dy
+
+    def _ring_lower_bound(self, radius: int) -> int:
+        # Closest point of any cell `radius` Manhattan-cells away from the query cell.
+        return max(0, (radius - 2) * self.cell_size + 2)
+
+    def iter_nearest(self, x: int, y: int) -> Iterator[tuple[int, int]]:
+        """
+        Yield ``(distance, taxi_id)`` pairs ordered by Manhattan distance to
+        ``(x, y)``, ties broken by taxi id.
+        """
+        if not self._positions:
+            return
+        cx, cy = self._cell_of(x, y)
+        max_radius = 2 * self.cells_per_side
+        heap: list[tuple[int, int]] = []
+        remaining = len(self._positions)
+        radius = 0
+        while radius <= max_radius and remaining > 0:
+            for cell in self._ring(cx, cy, radius):
+                for taxi_id in self._cells.get(cell, ()):
+                    tx, ty = self._positions[taxi_id]
+                    heapq.heappush(heap, (abs(tx - x) + abs(ty - y), taxi_id))
+                    remaining -= 1
+            radius += 1
+            bound = self._ring_lower_bound(radius)
+            while heap and heap[0][0] < bound:
+                yield heapq.heappop(heap)
+        while heap:
+            yield heapq.heappop(heap)
+
+    def nearest(self, x: int, y: int) -> tuple[int, int] | None:
+        return next(self.iter_nearest(x, y), None)
+
+
+available_taxi_index = TaxiSpatialIndex(
+    grid_size=settings.GRID_SIZE, cell_size=settings.SPATIAL_INDEX_CELL_SIZE
+)
@@ -0,0 +1,121 @@
+from __future__ import annotations
+
+import math
+import time
+from collections.abc import Callable, Hashable
+
+from dispatcher_service.app.settings import settings
+
+
+class HierarchicalTimingWheel:
+    """
+    Hierarchical timing wheel of per-key deadlines (seconds since the epoch).
+
+    Level ``n`` has ``slots`` buckets of ``tick * slots**n`` seconds each; keys far
+    in the future sit in coarse buckets and cascade down as time advances, so
+    scheduling, rescheduling and cancelling are O(1) and :meth:`advance` only
+    touches the buckets that came due. Deadlines beyond the top level wait in an
+    overflow bucket that is re-sorted each time the top level wraps.
+    """
+
+    def __init__(
+        self,
+        tick_sec: float = 0.5,
+        slots: int = 64,
+        levels: int = 4,
+        clock: Callable[[], float] = time.time,
+    ) -> None:
+        self.tick = tick_sec
+        self._clock = clock
+        self.slots = slots
+        self.levels = levels
+        self._wheels: list[list[set[Hashable]]] = [
+            [set() for _ in range(slots)] for _ in range(levels)
+        ]
+        self._overflow: set[Hashable] = set()
+        self._due: set[Hashable] = set()
+        # key -> (deadline tick, bucket holding it)
+        self._where: dict[Hashable, tuple[int, set[Hashable]]] = {}
+        self._current: int | None = None
+
+    def __len__(self) -> int:
+        return len(self._where)
+
+    def __contains__(self, key: Hashable) -> bool:
+        return key in self._where
+
+    def _tick_of(self, ts: float) -> int:
+        return math.ceil(ts / self.tick)
+
+    def deadline(self, key: Hashable) -> float | None:
+        entry = self._where.get(key)
+        return entry[0] * self.tick if entry is not None else None
+
+    def schedule(self, key: Hashable, deadline: float) -> None:
+        """(Re)schedule ``key`` to expire at ``deadline``."""
+        self.cancel(key)
+        if self._current is None:
+            self._current = math.floor(self._clock() / self.tick)
+        self._place(key, self._tick_of(deadline))
+
+    def cancel(self, key: Hashable) -> None:
+        entry = self._where.pop(key, None)
+        if entry is not None:
+            entry[1].discard(key)
+
+    def clear(self) -> None:
+        for wheel in self._wheels:
+            for bucket in wheel:
+                bucket.clear()
+        self._overflow.clear()
+        self._due.clear()
+        self._where.clear()
+        self._current = None
+
+    def _place(self, key: Hashable, tick: int) -> None:
+        assert self._current is not None
+        delta = tick - self._current
+        if delta <= 0:
+            bucket = self._due
+        else:
+            bucket = self._overflow
+            for level in range(self.levels):
+                if delta < self.slots ** (level + 1):
+                    bucket = self._wheels[level][(tick // self.slots**level) % self.slots]
+                    break
+        bucket.add(key)
+        self._where[key] = (tick, bucket)
+
+    def _cascade(self, bucket: set[Hashable]) -> None:
+        keys = list(bucket)
+        bucket.clear()
+        for key in keys:
+            self._place(key, self._where[key][0])
+
+    def advance(self, now: float) -> list[Hashable]:
+        """Move the wheel to ``now`` and return the keys whose deadline has passed."""
+        target = math.floor(now / self.tick)
+        if self._current is None:
+            self._current = target
+        expired = list(self._due)
+        self._due.clear()
+        while self._current < target:
+            self._current += 1
+            tick = self._current
+            if tick % self.slots**self.levels == 0:
+                self._cascade(self._overflow)
+            for level in range(self.levels - 1, 0, -1):
+                span = self.slots**level
+                if tick % span == 0:
+                    self._cascade(self._wheels[level][(tick // span) % self.slots])
+            bucket = self._wheels[0][tick % self.slots]
+            expired.extend(bucket)
+            bucket.clear()
+            expired.extend(self._due)
+            self._due.clear()
+        for key in expired:
+            del self._where[key]
+        return expired
+
+
+taxi_expiry_wheel = HierarchicalTimingWheel(tick_sec=settings.HEARTBEAT_WHEEL_TICK_MS / 1000)
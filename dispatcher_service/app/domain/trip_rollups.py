@@ -0,0 +1,140 @@
+from __future__ import annotations
+
+from collections.abc import Iterable
+from dataclasses import dataclass, field
+from datetime import datetime, timedelta
+
+from dispatcher_service.app.domain.sketch import QuantileSketch
+from dispatcher_service.app.domain.utils import as_utc
+from dispatcher_service.app.settings import settings
+
+TRIP_METRICS = ("waiting_time_min", "travel_time_min", "total_distance")
+
+# Aggregates of one metric set, keyed by metric name.
+Rollup = dict[str, "MetricRollup"]
+
+
+@dataclass
+class MetricRollup:
+    count: int = 0
+    total: float = 0.0
+    sketch: QuantileSketch = field(default_factory=QuantileSketch)
+
+    def add(self, value: float) -> None:
+        self.count += 1
+        self.total += value
+        self.sketch.add(value)
+
+    def merge(self, other: MetricRollup) -> None:
+        self.count += other.count
+        self.total += other.total
+        self.sketch.merge(other.sketch)
+
+
+def _empty() -> Rollup:
+    return {name: MetricRollup() for name in TRIP_METRICS}
+
+
+def _minute(ts: datetime) -> datetime:
+    return as_utc(ts).replace(second=0, microsecond=0)
+
+
+class TripRollups:
+    """
+    Per-minute, per-cell aggregates of completed trips, updated as trips finish.
+
+    Every ``(dropoff minute, pickup cell)`` keeps a count, a sum and a
+    :class:`QuantileSketch` per metric; queries merge the buckets of a window
+    instead of scanning trips. Buckets older than ``retention_min`` are pruned.
+    Like the status counters, updates are ignored until the rollups are
+    ``loaded`` from the database once.
+    """
+
+    def __init__(self, cell_size: int = 10, retention_min: int = 1440) -> None:
+        self.cell_size = max(1, cell_size)
+        self.retention = timedelta(minutes=max(1, retention_min))
+        self.loaded = False
+        # dropoff minute -> pickup cell -> metric aggregates
+        self._minutes: dict[datetime, dict[tuple[int, int], Rollup]] = {}
+        self._newest: datetime | None = None
+
+    def __len__(self) -> int:
+        return sum(len(cells) for cells in self._minutes.values())
+
+    def cell_of(self, x: int, y: int) -> tuple[int, int]:
+        return (x - 1) // self.cell_size, (y - 1) // self.cell_size
+
+    def record(
+        self, dropoff_time: datetime, start_x: int, start_y: int, values: dict[str, float | None]
+    ) -> None:
+        """Add one completed trip; ignored until the rollups are loaded."""
+        if self.loaded:
+            self._add(dropoff_time, start_x, start_y, values)
+
+    def _add(
+        self, dropoff_time: datetime, start_x: int, start_y: int, values: dict[str, float | None]
+    ) -> None:
+        minute = _minute(dropoff_time)
+        cells = self._minutes.setdefault(minute, {})
+        bucket = cells.get(self.cell_of(start_x, start_y))
+        if bucket is None:
+            bucket = cells[self.cell_of(start_x, start_y)] = _empty()
+        for name, value in values.items():
+            if value is not None:
+                bucket[name].add(value)
+        if self._newest is None or minute > self._newest:
+            self._newest = minute
+            self.prune(minute - self.retention)
+
+    def prune(self, before: datetime) -> None:
+        for minute in [minute for minute in self._minutes if minute < before]:
+            del self._minutes[minute]
+
+    def load(self, trips: Iterable[tuple[datetime, int, int, dict[str, float | None]]]) -> None:
+        """Rebuild from ``(dropoff_time, start_x, start_y, metrics)`` of completed trips."""
+        self.clear()
+        for dropoff_time, start_x, start_y, values in trips:
+            self._add(dropoff_time, start_x, start_y, values)
+        self.loaded = True
+
+    def clear(self) -> None:
+        self.loaded = False
+        self._minutes.clear()
+        self._newest = None
+
+    def query(
+        self,
+        since: datetime,
+        until: datetime,
+        cell: tuple[int, int] | None = None,
+        group_by: str | None = None,
+    ) -> dict[tuple, Rollup]:
+        """
+        Merge the buckets with ``since <= minute < until`` (and in ``cell``, if
+        given), grouped by ``"minute"``, ``"cell"`` or not at all (key ``()``).
+        """
+        since, until = as_utc(since), as_utc(until)
+        groups: dict[tuple, Rollup] = {}
+        for minute, cells in self._minutes.items():
+            if not since <= minute < until:
+                continue
+            for (cx, cy), bucket in cells.items():
+                if cell is not None and (cx, cy) != cell:
+                    continue
+                if group_by == "minute":
+                    group: tuple = (minute,)
+                elif group_by == "cell":
+                    group = (cx, cy)
+                else:
+                    group = ()
+                merged = groups.get(group)
+                if merged is None:
+                    merged = groups[group] = _empty()
+                for name, rollup in bucket.items():
+                    merged[name].merge(rollup)
+        return dict(sorted(groups.items()))
+
+
+trip_rollups = TripRollups(
+    cell_size=settings.ROLLUP_CELL_SIZE, retention_min=settings.ROLLUP_RETENTION_MIN
+)
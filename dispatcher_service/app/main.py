@@ -1,23 +1,65 @@
 import asyncio
 
-from fastapi import FastAPI
+from fastapi import FastAPI, Response
 from fastapi.middleware.cors import CORSMiddleware
 
+from dispatcher_service.app.adapters.crud import ensure_trip_rollups, load_available_taxi_index
+from dispatcher_service.app.adapters.database import SessionLocal, engine
+from dispatcher_service.app.adapters.http_client import close_http_client, open_http_client
 from dispatcher_service.app.api.routers import events, orders, taxis, view
+from dispatcher_service.app.background.assignment_outbox import assignment_outbox_workers
+from dispatcher_service.app.background.counter_reconciler import fleet_counters_reconciler
+from dispatcher_service.app.background.fleet_stream import fleet_stream
+from dispatcher_service.app.background.heartbeat_buffer import heartbeat_buffer
 from dispatcher_service.app.background.heartbeat_monitor import heartbeat_sweeper
+from dispatcher_service.app.background.pending_orders import pending_order_matcher
+from dispatcher_service.app.background.rebalancer import idle_taxi_rebalancer
+from dispatcher_service.app.domain.order_batcher import order_batcher
+from dispatcher_service.app.settings import settings
 
+from common import metrics
 from common.logger import configure_root_logging, get_logger
 
+configure_root_logging(service_name="dispatcher")
+log = get_logger(__name__)
+log.info("Dispatcher app booting")
+
+
 async def lifespan(app: FastAPI):
+    await open_http_client()
+    await metrics.event_loop_lag_monitor.start()
+    try:
+        async with SessionLocal() as db:
+            await load_available_taxi_index(db)
+    except Exception as exc:
+        log.error(f"Could not warm up available taxi index: {exc}")
+    try:
+        async with SessionLocal() as db:
+            await ensure_trip_rollups(db)
+    except Exception as exc:
+        log.error(f"Could not load trip rollups: {exc}")
+    await heartbeat_buffer.start()
     asyncio.create_task(heartbeat_sweeper())
+    asyncio.create_task(fleet_counters_reconciler())
+    await assignment_outbox_workers.start()
+    await pending_order_matcher.start()
+    await fleet_stream.start()
+    if settings.ORDER_BATCHING_ENABLED:
+        await order_batcher.start()
+    if settings.REBALANCE_ENABLED:
+        asyncio.create_task(idle_taxi_rebalancer())
     yield
+    await order_batcher.stop()
+    await fleet_stream.stop()
+    await pending_order_matcher.stop()
+    await assignment_outbox_workers.stop()
+    await heartbeat_buffer.stop()
+    await close_http_client()
+    await metrics.event_loop_lag_monitor.stop()
+    await engine.dispose()
 
 
-app = FastAPI(title="Taxi Dispatch Service")
-
-configure_root_logging(service_name="dispatcher")
-log = get_logger(__name__)
-log.info("Dispatcher app booting")
+app = FastAPI(title="Taxi Dispatch Service", lifespan=lifespan)
 
 app.add_middleware(
     CORSMiddleware,
@@ -26,6 +68,7 @@ app.add_middleware(
     allow_methods=["*"],
     allow_headers=["*"],
 )
+app.add_middleware(metrics.RequestMetricsMiddleware)
 
 app.include_router(taxis.router, prefix="/taxis", tags=["Taxis"])
 app.include_router(orders.router, prefix="/orders", tags=["Orders"])
@@ -36,3 +79,8 @@ app.include_router(view.router, tags=["View"])
 @app.get("/healthz", tags=["Health"])
 def health_check():
     return {"status": "ok"}
+
+
+@app.get("/metrics", tags=["Health"], include_in_schema=False)
+def metrics_endpoint():
+    return Response(metrics.render_latest(), media_type=metrics.CONTENT_TYPE_LATEST)
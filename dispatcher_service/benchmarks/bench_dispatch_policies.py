@@ -0,0 +1,351 @@
+"""
+Dispatch policies compared over a simulated city day, without any services.
+
+A discrete-event simulation: a virtual clock (in minutes) jumps from event to
+event, taken in time order from a heap, so a day of a 10k-taxi city runs in
+seconds. Orders arrive as a Poisson stream whose rate follows a day profile
+with morning and evening peaks, mostly from a few demand hotspots, and go
+anywhere. Taxis drive with the taxi service's time model (``drive_minutes``:
+SPEED_MIN..SPEED_MAX minutes per cell) and are matched by the dispatcher's own
+code:
+
+- ``nearest``: the closest available taxi (``TaxiSpatialIndex``);
+- ``lookahead``: busy taxis with a single trip compete too, scored by
+  ``eta_after_current_trip``, and the new trip is queued behind theirs;
+- ``batch``: orders placed within ``--batch-window`` minutes are matched
+  together with ``min_cost_assignment``, as ``POST /orders/batch`` does.
+
+Orders no taxi can take wait in a FIFO queue, as in the dispatcher's pending
+order queue: they are matched as taxis free up and dropped after
+``--max-wait`` minutes. Every policy sees the same order stream.
+
+    PYTHONPATH=. python dispatcher_service/benchmarks/bench_dispatch_policies.py --taxis 10000
+"""
+
+from __future__ import annotations
+
+import argparse
+import heapq
+import itertools
+import json
+import math
+import random
+import statistics
+import time
+from collections import deque
+from collections.abc import Callable, Iterator
+from typing import NamedTuple
+
+from dispatcher_service.app.domain.matching import (
+    eta_after_current_trip,
+    manhattan,
+    min_cost_assignment,
+)
+from dispatcher_service.app.domain.spatial_index import TaxiSpatialIndex
+from dispatcher_service.app.settings import settings
+from taxi_service.app.services.simulation import drive_minutes
+
+GRID = 100
+POLICIES = ("nearest", "lookahead", "batch")
+
+
+class Order(NamedTuple):
+    placed: float
+    start_x: int
+    start_y: int
+    end_x: int
+    end_y: int
+
+
+class EventScheduler:
+    """Virtual clock plus a heap of pending events; events at the same time run in FIFO order."""
+
+    def __init__(self) -> None:
+        self.now = 0.0
+        self.processed = 0
+        self._events: list[tuple[float, int, Callable[..., None], tuple]] = []
+        self._seq = itertools.count()
+
+    def at(self, when: float, handler: Callable[..., None], *args: object) -> None:
+        heapq.heappush(self._events, (max(when, self.now), next(self._seq), handler, args))
+
+    def after(self, delay: float, handler: Callable[..., None], *args: object) -> None:
+        self.at(self.now + delay, handler, *args)
+
+    def run(self) -> None:
+        while self._events:
+            self.now, _, handler, args = heapq.heappop(self._events)
+            self.processed += 1
+            handler(*args)
+
+
+def _percentile(values: list[float], pct: float) -> float:
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    k = min(len(ordered) - 1, max(0, round(pct / 100 * (len(ordered) - 1))))
+    return float(ordered[k])
+
+
+def _demand_shape(minute: float) -> float:
+    """Relative order rate over the day: a night trough and morning and evening peaks."""
+    hour = (minute / 60) % 24
+    return 0.3 + math.exp(-(((hour - 8.5) / 1.5) ** 2)) + 1.2 * math.exp(-(((hour - 18) / 2) ** 2))
+
+
+def _orders(args: argparse.Namespace) -> list[Order]:
+    """A thinned Poisson stream with ``args.orders`` orders expected over the run."""
+    rng = random.Random(args.seed)
+    hotspots = [(rng.randint(10, 90), rng.randint(10, 90)) for _ in range(args.hotspots)]
+    horizon = args.hours * 60
+    steps = [_demand_shape(m) for m in range(int(horizon) + 1)]
+    peak_rate = max(steps) * args.orders / sum(steps)
+
+    def clamp(v: float) -> int:
+        return min(GRID, max(1, round(v)))
+
+    def point(hot: bool) -> tuple[int, int]:
+        if hot:
+            hx, hy = rng.choice(hotspots)
+            return clamp(rng.gauss(hx, args.spread)), clamp(rng.gauss(hy, args.spread))
+        return rng.randint(1, GRID), rng.randint(1, GRID)
+
+    orders = []
+    now = rng.expovariate(peak_rate)
+    while now < horizon:
+        if rng.random() * max(steps) < _demand_shape(now):
+            orders.append(Order(now, *point(rng.random() < args.hot_share), *point(False)))
+        now += rng.expovariate(peak_rate)
+    return orders
+
+
+class CitySimulation:
+    """One policy over one order stream; :meth:`run` returns the summary row."""
+
+    def __init__(self, policy: str, args: argparse.Namespace, orders: list[Order]) -> None:
+        self.policy = policy
+        self.args = args
+        self.orders = orders
+        self.horizon = args.hours * 60
+        self.clock = EventScheduler()
+        self.rng = random.Random(args.seed + 1)
+        self.limit = max(1, settings.SPATIAL_INDEX_MAX_CANDIDATES)
+
+        self.available = TaxiSpatialIndex(GRID, settings.SPATIAL_INDEX_CELL_SIZE)
+        # BUSY taxis with a single trip, indexed by its drop-off: look-ahead candidates.
+        # Most of the fleet is in here at peak, hence the finer cells.
+        self.dropoffs = TaxiSpatialIndex(GRID, 2)
+        self.position = [
+            (self.rng.randint(1, GRID), self.rng.randint(1, GRID)) for _ in range(args.taxis)
+        ]
+        for taxi_id, (x, y) in enumerate(self.position):
+            self.available.add(taxi_id, x, y)
+        # (route cells, started at) of the active trip, as the dispatcher estimates it.
+        self.route: list[tuple[int, float]] = [(0, 0.0)] * args.taxis
+        self.queued: list[Order | None] = [None] * args.taxis
+        self.busy_minutes = [0.0] * args.taxis
+
+        self.pending: deque[Order] = deque()
+        self.batch: list[Order] = []
+        self.pickup_distances: list[int] = []
+        self.waits: list[float] = []
+        self.expired = 0
+
+    # --- matching, as the dispatcher does it --------------------------------
+
+    def _pick(self, x: int, y: int) -> tuple[int, bool] | None:
+        """``(taxi_id, busy)`` for a pickup at ``(x, y)``, or None when no taxi can take it."""
+        if self.policy != "lookahead":
+            nearest = self.available.nearest(x, y)
+            return (nearest[1], False) if nearest is not None else None
+
+        # Without row locks to lose, only the best candidate matters: the closest
+        # available taxi, then busy ones until no drop-off can beat the best ETA.
+        nearest = self.available.nearest(x, y)
+        best = (nearest[0], 0, nearest[1]) if nearest is not None else None
+        for seen, (end_to_pickup, taxi_id) in enumerate(self.dropoffs.iter_nearest(x, y)):
+            if seen >= self.limit or (best is not None and end_to_pickup >= best[0]):
+                break
+            route, started = self.route[taxi_id]
+            eta = eta_after_current_trip(
+                route, self.clock.now - started, settings.LOOKAHEAD_MIN_PER_CELL, end_to_pickup
+            )
+            # Ties go to available taxis (second key), as in pick_taxi_by_eta_for_update.
+            best = min(best, (eta, 1, taxi_id)) if best is not None else (eta, 1, taxi_id)
+        if best is None:
+            return None
+        return best[2], bool(best[1])
+
+    def _candidates(self, points: list[tuple[int, int]]) -> dict[int, tuple[int, int]]:
+        """Same selection as ``crud.available_taxi_candidates``."""
+        candidates: dict[int, tuple[int, int]] = {}
+        iterators = [self.available.iter_nearest(x, y) for x, y in points]
+
+        def take(it: Iterator[tuple[int, int]]) -> bool:
+            for _, taxi_id in it:
+                if taxi_id not in candidates:
+                    candidates[taxi_id] = self.position[taxi_id]
+                    return True
+            return False
+
+        for it in iterators:
+            for _ in range(max(1, settings.ORDER_BATCH_CANDIDATES_PER_ORDER)):
+                if not take(it):
+                    break
+        wanted = min(len(points), len(self.available))
+        live = list(iterators)
+        while len(candidates) < wanted and live:
+            live = [it for it in live if take(it)]
+        return candidates
+
+    def _dispatch(self, order: Order) -> bool:
+        picked = self._pick(order.start_x, order.start_y)
+        if picked is None:
+            return False
+        taxi_id, busy = picked
+        if busy:
+            self.dropoffs.discard(taxi_id)
+            self.queued[taxi_id] = order
+        else:
+            self.available.discard(taxi_id)
+            self._start(taxi_id, order)
+        return True
+
+    def _drain_pending(self) -> None:
+        while self.pending:
+            order = self.pending[0]
+            if order.placed + self.args.max_wait < self.clock.now:
+                self.pending.popleft()
+                self.expired += 1
+            elif self._dispatch(order):
+                self.pending.popleft()
+            else:
+                return
+
+    # --- events --------------------------------------------------------------
+
+    def _arrive(self, i: int) -> None:
+        if i + 1 < len(self.orders):
+            self.clock.at(self.orders[i + 1].placed, self._arrive, i + 1)
+        order = self.orders[i]
+        if self.policy == "batch":
+            self.batch.append(order)
+        elif not self._dispatch(order):
+            self.pending.append(order)
+
+    def _flush_batch(self) -> None:
+        if self.clock.now < self.horizon:
+            self.clock.after(self.args.batch_window, self._flush_batch)
+        orders, self.batch = self.batch, []
+        if not orders:
+            return
+        candidates = self._candidates([(o.start_x, o.start_y) for o in orders])
+        taxi_ids = list(candidates)
+        cost = [
+            [manhattan(o.start_x, o.start_y, *candidates[taxi_id]) for taxi_id in taxi_ids]
+            for o in orders
+        ]
+        chosen = {row: taxi_ids[col] for row, col in min_cost_assignment(cost)}
+        for i, order in enumerate(orders):
+            taxi_id = chosen.get(i)
+            if taxi_id is None:
+                if not self._dispatch(order):
+                    self.pending.append(order)
+                continue
+            self.available.discard(taxi_id)
+            self._start(taxi_id, order)
+
+    def _start(self, taxi_id: int, order: Order) -> None:
+        now = self.clock.now
+        d1 = manhattan(*self.position[taxi_id], order.start_x, order.start_y)
+        d2 = manhattan(order.start_x, order.start_y, order.end_x, order.end_y)
+        pickup_minutes = drive_minutes(d1, self.rng)
+        travel_minutes = drive_minutes(d2, self.rng)
+        self.pickup_distances.append(d1)
+        self.route[taxi_id] = (d1 + d2, order.placed)
+        if self.queued[taxi_id] is None:
+            self.dropoffs.add(taxi_id, order.end_x, order.end_y)
+        end = now + pickup_minutes + travel_minutes
+        self.busy_minutes[taxi_id] += max(0.0, min(end, self.horizon) - min(now, self.horizon))
+        self.clock.after(pickup_minutes, self._pickup, taxi_id, order, d2)
+        self.clock.at(end, self._deliver, taxi_id, order)
+
+    def _pickup(self, taxi_id: int, order: Order, route: int) -> None:
+        self.waits.append(self.clock.now - order.placed)
+        self.route[taxi_id] = (route, self.clock.now)
+
+    def _deliver(self, taxi_id: int, order: Order) -> None:
+        self.position[taxi_id] = (order.end_x, order.end_y)
+        self.dropoffs.discard(taxi_id)
+        queued = self.queued[taxi_id]
+        if queued is not None:
+            self.queued[taxi_id] = None
+            self._start(taxi_id, queued)
+            return
+        self.available.add(taxi_id, order.end_x, order.end_y)
+        self._drain_pending()
+
+    # --- run -----------------------------------------------------------------
+
+    def run(self) -> dict:
+        started = time.perf_counter()
+        if self.orders:
+            self.clock.at(self.orders[0].placed, self._arrive, 0)
+        if self.policy == "batch":
+            self.clock.after(self.args.batch_window, self._flush_batch)
+        self.clock.run()
+        elapsed = time.perf_counter() - started
+
+        utilization = [busy / self.horizon for busy in self.busy_minutes]
+        waits = self.waits
+        return {
+            "policy": self.policy,
+            "orders": len(self.orders),
+            "served": len(waits),
+            "expired": self.expired + len(self.pending),
+            "events": self.clock.processed,
+            "wall_sec": round(elapsed, 2),
+            "mean_pickup_distance": round(statistics.fmean(self.pickup_distances or [0]), 2),
+            "p50_pickup_distance": _percentile(self.pickup_distances, 50),
+            "p90_pickup_distance": _percentile(self.pickup_distances, 90),
+            "p99_pickup_distance": _percentile(self.pickup_distances, 99),
+            "mean_wait_min": round(statistics.fmean(waits or [0]), 2),
+            "p50_wait_min": round(_percentile(waits, 50), 1),
+            "p90_wait_min": round(_percentile(waits, 90), 1),
+            "p99_wait_min": round(_percentile(waits, 99), 1),
+            "mean_utilization": round(statistics.fmean(utilization or [0]), 3),
+            "p10_utilization": round(_percentile(utilization, 10), 3),
+            "p50_utilization": round(_percentile(utilization, 50), 3),
+            "p90_utilization": round(_percentile(utilization, 90), 3),
+        }
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--taxis", type=int, default=10000)
+    parser.add_argument("--orders", type=int, default=45000, help="orders expected over the run")
+    parser.add_argument("--hours", type=float, default=24)
+    parser.add_argument("--policies", nargs="+", choices=POLICIES, default=list(POLICIES))
+    parser.add_argument("--hotspots", type=int, default=5)
+    parser.add_argument("--hot-share", type=float, default=0.6)
+    parser.add_argument("--spread", type=float, default=8.0)
+    parser.add_argument("--max-wait", type=float, default=30, help="minutes an order may queue")
+    parser.add_argument("--batch-window", type=float, default=0.25, help="minutes per batch")
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--json", action="store_true", help="print raw JSON results")
+    args = parser.parse_args()
+
+    orders = _orders(args)
+    results = [CitySimulation(policy, args, orders).run() for policy in args.policies]
+
+    if args.json:
+        print(json.dumps(results, indent=2))
+        return
+    keys = [key for key in results[0] if key != "policy"]
+    print(f"{'metric':<24}" + "".join(f"{row['policy']:>12}" for row in results))
+    for key in keys:
+        print(f"{key:<24}" + "".join(f"{row[key]:>12}" for row in results))
+
+
+if __name__ == "__main__":
+    main()
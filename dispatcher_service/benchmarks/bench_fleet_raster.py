@@ -0,0 +1,155 @@
+"""
+JSON ``/taxis`` + ``/trips`` payloads vs the packed ``/fleet/raster`` buffer.
+
+Seeds an in-memory SQLite DB with a fleet of each size, then measures payload
+size (raw and gzipped) and server-side build time of both representations.
+When ``node`` is available it also times decoding and dirty-cell rendering of
+the raster in ``grid_service/app/static/raster.mjs`` after ``--moved`` percent
+of the fleet changed cells.
+
+    PYTHONPATH=. python dispatcher_service/benchmarks/bench_fleet_raster.py --sizes 1000 10000 100000
+"""
+
+from __future__ import annotations
+
+import argparse
+import asyncio
+import gzip
+import json
+import random
+import shutil
+import subprocess
+import tempfile
+import time
+from collections import Counter
+from pathlib import Path
+
+from sqlalchemy import insert, update
+from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
+from sqlalchemy.pool import StaticPool
+
+from dispatcher_service.app.adapters.fleet_snapshot import FleetSnapshotCache
+from dispatcher_service.app.domain.models import Base, Taxi, TaxiStatus, Trip, TripStatus
+
+RENDER_BENCH = Path(__file__).parents[2] / "grid_service" / "benchmarks" / "bench_raster_render.mjs"
+TRIPS = 100
+
+
+def _ms(started: float) -> float:
+    return round((time.perf_counter() - started) * 1000, 2)
+
+
+async def _run(size: int, args: argparse.Namespace, workdir: Path) -> dict:
+    rng = random.Random(args.seed)
+    engine = create_async_engine(
+        "sqlite+aiosqlite://", connect_args={"check_same_thread": False}, poolclass=StaticPool
+    )
+    async with engine.begin() as conn:
+        await conn.run_sync(Base.metadata.create_all)
+    Session = async_sessionmaker(bind=engine, expire_on_commit=False)
+    statuses = list(TaxiStatus)
+    trip_statuses = [rng.choice(list(TripStatus)) for _ in range(TRIPS)]
+
+    async with Session() as db:
+        await db.execute(
+            insert(Taxi),
+            [
+                {
+                    "x": rng.randint(1, 100),
+                    "y": rng.randint(1, 100),
+                    "status": rng.choice(statuses),
+                    "callback_url": "http://bench/assign",
+                }
+                for _ in range(size)
+            ],
+        )
+        await db.execute(
+            insert(Trip),
+            [
+                {
+                    "user_id": i,
+                    "start_x": rng.randint(1, 100),
+                    "start_y": rng.randint(1, 100),
+                    "end_x": rng.randint(1, 100),
+                    "end_y": rng.randint(1, 100),
+                    "status": trip_statuses[i],
+                }
+                for i in range(TRIPS)
+            ],
+        )
+        await db.commit()
+
+        # A fresh cache per measurement so every call really builds its payload.
+        started = time.perf_counter()
+        _, taxis_json = await FleetSnapshotCache().taxis(db)
+        _, trips_json = await FleetSnapshotCache().trips(db, TRIPS)
+        json_ms = _ms(started)
+        started = time.perf_counter()
+        _, raster = await FleetSnapshotCache().raster(db, TRIPS, Counter(trip_statuses))
+        raster_ms = _ms(started)
+
+        moved = rng.sample(range(1, size + 1), max(1, size * args.moved // 100))
+        for taxi_id in moved:
+            await db.execute(
+                update(Taxi)
+                .where(Taxi.id == taxi_id)
+                .values(x=rng.randint(1, 100), y=rng.randint(1, 100))
+            )
+        await db.commit()
+        _, raster_next = await FleetSnapshotCache().raster(db, TRIPS, Counter(trip_statuses))
+
+    await engine.dispose()
+    (workdir / f"{size}-0.bin").write_bytes(raster)
+    (workdir / f"{size}-1.bin").write_bytes(raster_next)
+    return {
+        "taxis": size,
+        "json_bytes": len(taxis_json) + len(trips_json),
+        "json_gzip_bytes": len(gzip.compress(taxis_json)) + len(gzip.compress(trips_json)),
+        "json_build_ms": json_ms,
+        "raster_bytes": len(raster),
+        "raster_gzip_bytes": len(gzip.compress(raster)),
+        "raster_build_ms": raster_ms,
+    }
+
+
+def _render_times(workdir: Path, sizes: list[int]) -> dict[int, dict]:
+    node = shutil.which("node")
+    if node is None:
+        return {}
+    files = [str(workdir / f"{size}-{frame}.bin") for size in sizes for frame in (0, 1)]
+    out = subprocess.run([node, str(RENDER_BENCH), *files], check=True, capture_output=True)
+    rows = [json.loads(line) for line in out.stdout.decode().splitlines() if line.strip()]
+    return {
+        size: {k: v for k, v in row.items() if k != "file"}
+        for size, row in zip(sizes, rows, strict=True)
+    }
+
+
+async def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--sizes", type=int, nargs="+", default=[1000, 10000, 100000])
+    parser.add_argument(
+        "--moved", type=int, default=1, help="percent of taxis moved between frames"
+    )
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--json", action="store_true", help="print raw JSON results")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        workdir = Path(tmp)
+        results = [await _run(size, args, workdir) for size in args.sizes]
+        render = _render_times(workdir, args.sizes)
+    for row in results:
+        row.update(render.get(row["taxis"], {}))
+
+    if args.json:
+        print(json.dumps(results, indent=2))
+        return
+    keys = [key for key in results[0] if key != "taxis"]
+    print(f"{'metric':<20}" + "".join(f"{row['taxis']:>14}" for row in results))
+    for key in keys:
+        print(f"{key:<20}" + "".join(f"{row.get(key, '-'):>14}" for row in results))
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
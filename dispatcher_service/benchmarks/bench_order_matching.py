@@ -0,0 +1,140 @@
+"""
+Greedy vs micro-batched order matching.
+
+Seeds a fleet in an in-memory SQLite DB, replays bursts of random orders through
+``assign_order`` (one by one) and ``assign_orders_batch`` (one batch per burst)
+and compares pickup distance and throughput. Taxi callbacks are stubbed out.
+
+    PYTHONPATH=. python dispatcher_service/benchmarks/bench_order_matching.py --taxis 2000 --burst 100
+"""
+
+from __future__ import annotations
+
+import argparse
+import asyncio
+import json
+import random
+import statistics
+import time
+
+from sqlalchemy import update
+from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
+from sqlalchemy.pool import StaticPool
+
+from common.schemas import OrderCreate
+from dispatcher_service.app.adapters import crud
+from dispatcher_service.app.domain import services
+from dispatcher_service.app.domain.matching import manhattan
+from dispatcher_service.app.domain.models import Base, Taxi, TaxiStatus
+from dispatcher_service.app.domain.spatial_index import available_taxi_index
+
+
+class _Accepted:
+    status_code = 202
+
+
+async def _accept(url: str, payload: dict) -> _Accepted:
+    return _Accepted()
+
+
+def _percentile(values: list[int], pct: float) -> float:
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    k = min(len(ordered) - 1, max(0, round(pct / 100 * (len(ordered) - 1))))
+    return float(ordered[k])
+
+
+def _summary(distances: list[int], elapsed: float, orders: int) -> dict:
+    return {
+        "assigned": len(distances),
+        "total_pickup_distance": sum(distances),
+        "mean_pickup_distance": round(statistics.fmean(distances), 2) if distances else 0.0,
+        "p95_pickup_distance": _percentile(distances, 95),
+        "orders_per_sec": round(orders / elapsed, 1) if elapsed else 0.0,
+    }
+
+
+async def _run(mode: str, args: argparse.Namespace) -> dict:
+    rng = random.Random(args.seed)
+    engine = create_async_engine(
+        "sqlite+aiosqlite://", connect_args={"check_same_thread": False}, poolclass=StaticPool
+    )
+    async with engine.begin() as conn:
+        await conn.run_sync(Base.metadata.create_all)
+    Session = async_sessionmaker(bind=engine, expire_on_commit=False)
+
+    positions: dict[int, tuple[int, int]] = {}
+    async with Session() as db:
+        taxis = [
+            Taxi(x=rng.randint(1, 100), y=rng.randint(1, 100), callback_url="http://bench/assign")
+            for _ in range(args.taxis)
+        ]
+        db.add_all(taxis)
+        await db.commit()
+        positions = {taxi.id: (taxi.x, taxi.y) for taxi in taxis}
+
+    bursts = [
+        [
+            OrderCreate(
+                user_id=i,
+                start_x=rng.randint(1, 100),
+                start_y=rng.randint(1, 100),
+                end_x=rng.randint(1, 100),
+                end_y=rng.randint(1, 100),
+            )
+            for i in range(args.burst)
+        ]
+        for _ in range(args.bursts)
+    ]
+
+    distances: list[int] = []
+    elapsed = 0.0
+    async with Session() as db:
+        for burst in bursts:
+            # Every burst starts from a fully available fleet.
+            await db.execute(update(Taxi).values(status=TaxiStatus.AVAILABLE))
+            await db.commit()
+            available_taxi_index.clear()
+            await crud.load_available_taxi_index(db)
+
+            started = time.perf_counter()
+            if mode == "greedy":
+                trips = [await services.assign_order(db, order) for order in burst]
+            else:
+                trips = await services.assign_orders_batch(db, burst)
+            elapsed += time.perf_counter() - started
+
+            for order, trip in zip(burst, trips, strict=True):
+                if trip is not None:
+                    distances.append(
+                        manhattan(order.start_x, order.start_y, *positions[trip.taxi_id])
+                    )
+
+    await engine.dispose()
+    return _summary(distances, elapsed, args.burst * args.bursts)
+
+
+async def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--taxis", type=int, default=1000)
+    parser.add_argument("--burst", type=int, default=100, help="orders per batching window")
+    parser.add_argument("--bursts", type=int, default=20)
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--json", action="store_true", help="print raw JSON results")
+    args = parser.parse_args()
+
+    services.post_json = _accept  # type: ignore[assignment]
+    results = {mode: await _run(mode, args) for mode in ("greedy", "batch")}
+
+    if args.json:
+        print(json.dumps(results, indent=2))
+        return
+    keys = list(results["greedy"])
+    print(f"{'metric':<24}{'greedy':>14}{'batch':>14}")
+    for key in keys:
+        print(f"{key:<24}{results['greedy'][key]:>14}{results['batch'][key]:>14}")
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
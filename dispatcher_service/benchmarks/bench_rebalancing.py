@@ -0,0 +1,174 @@
+"""
+Pickup distance with and without idle-taxi rebalancing.
+
+A minute-stepped simulation of the grid: orders arrive as a Poisson stream,
+mostly from a few demand hotspots, and go anywhere; every order is given to the
+closest idle taxi (``TaxiSpatialIndex``), which drives one cell per minute.
+With rebalancing on, every ``--interval`` minutes the dispatcher's planner
+(``domain/rebalancing.py``) sends idle taxis toward regions whose recent
+orders outnumber their supply. Both runs see the same order stream.
+
+    PYTHONPATH=. python dispatcher_service/benchmarks/bench_rebalancing.py --taxis 300 --minutes 600
+"""
+
+from __future__ import annotations
+
+import argparse
+import json
+import random
+import statistics
+from collections import deque
+
+from dispatcher_service.app.domain.matching import manhattan
+from dispatcher_service.app.domain.rebalancing import plan_rebalance, region_demand
+from dispatcher_service.app.domain.spatial_index import TaxiSpatialIndex
+
+GRID = 100
+
+
+def _percentile(values: list[int], pct: float) -> float:
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    k = min(len(ordered) - 1, max(0, round(pct / 100 * (len(ordered) - 1))))
+    return float(ordered[k])
+
+
+def _orders(args: argparse.Namespace) -> list[list[tuple[int, int, int, int]]]:
+    """Per minute: ``(start_x, start_y, end_x, end_y)`` of the orders placed in it."""
+    rng = random.Random(args.seed)
+    hotspots = [(rng.randint(10, 90), rng.randint(10, 90)) for _ in range(args.hotspots)]
+
+    def clamp(v: float) -> int:
+        return min(GRID, max(1, round(v)))
+
+    def point(hot: bool) -> tuple[int, int]:
+        if hot:
+            hx, hy = rng.choice(hotspots)
+            return clamp(rng.gauss(hx, args.spread)), clamp(rng.gauss(hy, args.spread))
+        return rng.randint(1, GRID), rng.randint(1, GRID)
+
+    minutes = []
+    for _ in range(args.minutes):
+        count, budget = 0, rng.expovariate(1.0)
+        while budget < args.rate:
+            count += 1
+            budget += rng.expovariate(1.0)
+        minutes.append(
+            [(*point(rng.random() < args.hot_share), *point(False)) for _ in range(count)]
+        )
+    return minutes
+
+
+class _Fleet:
+    """Taxi positions and timers of one run; idle taxis are in the spatial index."""
+
+    def __init__(self, taxis: int, rng: random.Random) -> None:
+        self.index = TaxiSpatialIndex(GRID, 5)
+        self.positions = {i: (rng.randint(1, GRID), rng.randint(1, GRID)) for i in range(taxis)}
+        for taxi_id, (x, y) in self.positions.items():
+            self.index.add(taxi_id, x, y)
+        self.idle = set(self.positions)
+        self.busy_until: dict[int, tuple[int, tuple[int, int]]] = {}
+        self.driving: dict[int, tuple[int, tuple[int, int]]] = {}
+        self.distances: list[int] = []
+        self.unserved = 0
+        self.moves = 0
+
+    def arrive(self, minute: int) -> None:
+        """Finish the trips and repositioning drives due by ``minute``."""
+        for taxi_id, (until, end) in list(self.busy_until.items()):
+            if until <= minute:
+                del self.busy_until[taxi_id]
+                self.positions[taxi_id] = end
+                self.index.add(taxi_id, *end)
+                self.idle.add(taxi_id)
+        for taxi_id, (until, target) in list(self.driving.items()):
+            if until <= minute:
+                del self.driving[taxi_id]
+                self.positions[taxi_id] = target
+                self.index.add(taxi_id, *target)
+
+    def dispatch(self, minute: int, sx: int, sy: int, ex: int, ey: int) -> None:
+        nearest = self.index.nearest(sx, sy)
+        if nearest is None:
+            self.unserved += 1
+            return
+        taxi_id = nearest[1]
+        # A taxi still driving to its new region is picked up where the
+        # dispatcher last saw it: the drive is cancelled.
+        self.driving.pop(taxi_id, None)
+        self.index.discard(taxi_id)
+        self.idle.discard(taxi_id)
+        d1 = manhattan(*self.positions[taxi_id], sx, sy)
+        self.distances.append(d1)
+        self.busy_until[taxi_id] = (minute + d1 + manhattan(sx, sy, ex, ey), (ex, ey))
+
+    def rebalance(
+        self, minute: int, origins: list[tuple[int, int]], args: argparse.Namespace
+    ) -> None:
+        movable = [
+            (taxi_id, *self.positions[taxi_id]) for taxi_id in self.idle - self.driving.keys()
+        ]
+        demand = region_demand(origins, GRID, args.region)
+        for move in plan_rebalance(movable, demand, GRID, args.region, args.max_moves):
+            eta = manhattan(*self.positions[move.taxi_id], move.x, move.y)
+            self.driving[move.taxi_id] = (minute + eta, (move.x, move.y))
+            self.moves += 1
+
+
+def _simulate(rebalance: bool, args: argparse.Namespace, orders: list) -> dict:
+    fleet = _Fleet(args.taxis, random.Random(args.seed + 1))
+    recent: deque[tuple[int, tuple[int, int]]] = deque()
+
+    for minute, placed in enumerate(orders):
+        fleet.arrive(minute)
+        for sx, sy, ex, ey in placed:
+            recent.append((minute, (sx, sy)))
+            fleet.dispatch(minute, sx, sy, ex, ey)
+        while recent and recent[0][0] <= minute - args.window:
+            recent.popleft()
+        if rebalance and minute % args.interval == 0:
+            fleet.rebalance(minute, [p for _, p in recent], args)
+
+    warm = fleet.distances[len(fleet.distances) // 10 :]
+    return {
+        "mode": "rebalanced" if rebalance else "baseline",
+        "orders": sum(len(placed) for placed in orders),
+        "unserved": fleet.unserved,
+        "repositions": fleet.moves,
+        "mean_pickup_distance": round(statistics.fmean(warm), 2) if warm else 0.0,
+        "p95_pickup_distance": _percentile(warm, 95),
+    }
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--taxis", type=int, default=300)
+    parser.add_argument("--minutes", type=int, default=600)
+    parser.add_argument("--rate", type=float, default=2.0, help="orders per minute")
+    parser.add_argument("--hotspots", type=int, default=3)
+    parser.add_argument("--hot-share", type=float, default=0.8)
+    parser.add_argument("--spread", type=float, default=6.0)
+    parser.add_argument("--window", type=int, default=15, help="demand window in minutes")
+    parser.add_argument("--interval", type=int, default=5, help="minutes between rounds")
+    parser.add_argument("--region", type=int, default=10)
+    parser.add_argument("--max-moves", type=int, default=20)
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--json", action="store_true", help="print raw JSON results")
+    args = parser.parse_args()
+
+    orders = _orders(args)
+    results = [_simulate(rebalance, args, orders) for rebalance in (False, True)]
+
+    if args.json:
+        print(json.dumps(results, indent=2))
+        return
+    keys = [key for key in results[0] if key != "mode"]
+    print(f"{'metric':<24}" + "".join(f"{row['mode']:>14}" for row in results))
+    for key in keys:
+        print(f"{key:<24}" + "".join(f"{row[key]:>14}" for row in results))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,124 @@
+"""
+Load test: request latency while slow taxi callbacks are in flight.
+
+Runs the dispatcher app in-process (httpx ASGI transport) on a temporary SQLite
+file, stubs the taxi callback with ``asyncio.sleep(--callback-delay)`` and fires
+``--orders`` concurrent POST /orders. Callbacks are delivered by the assignment
+outbox workers, so the orders themselves should return in milliseconds. While
+the callbacks are in flight it probes GET /taxis/count and reports the probe
+latency, which should stay in the millisecond range as well.
+
+    PYTHONPATH=. python dispatcher_service/benchmarks/load_slow_callbacks.py --orders 200
+"""
+
+from __future__ import annotations
+
+import argparse
+import asyncio
+import json
+import random
+import statistics
+import tempfile
+import time
+from pathlib import Path
+
+import httpx
+from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
+
+from dispatcher_service.app.api.dependencies import get_db_session
+from dispatcher_service.app.background.assignment_outbox import AssignmentOutboxWorkers
+from dispatcher_service.app.domain import services
+from dispatcher_service.app.domain.models import Base, Taxi
+from dispatcher_service.app.main import app
+
+
+def _percentile(values: list[float], pct: float) -> float:
+    ordered = sorted(values)
+    k = min(len(ordered) - 1, max(0, round(pct / 100 * (len(ordered) - 1))))
+    return ordered[k]
+
+
+async def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--taxis", type=int, default=500)
+    parser.add_argument("--orders", type=int, default=200)
+    parser.add_argument("--probes", type=int, default=200)
+    parser.add_argument("--callback-delay", type=float, default=2.0)
+    args = parser.parse_args()
+
+    rng = random.Random(1)
+    with tempfile.TemporaryDirectory() as tmp:
+        url = f"sqlite+aiosqlite:///{Path(tmp) / 'load.db'}"
+        engine = create_async_engine(url, connect_args={"timeout": 30})
+        async with engine.begin() as conn:
+            await conn.run_sync(Base.metadata.create_all)
+        Session = async_sessionmaker(bind=engine, autoflush=False, expire_on_commit=False)
+        async with Session() as db:
+            db.add_all(
+                Taxi(x=rng.randint(1, 100), y=rng.randint(1, 100), callback_url="http://slow")
+                for _ in range(args.taxis)
+            )
+            await db.commit()
+
+        class Accepted:
+            status_code = 202
+
+        async def slow_callback(url: str, payload: dict, **kwargs) -> Accepted:
+            await asyncio.sleep(args.callback_delay)
+            return Accepted()
+
+        async def session_override():
+            async with Session() as db:
+                yield db
+
+        services.post_json = slow_callback  # type: ignore[assignment]
+        app.dependency_overrides[get_db_session] = session_override
+        workers = AssignmentOutboxWorkers(Session, workers=4, batch_size=50, poll_interval=0.1)
+        await workers.start()
+
+        transport = httpx.ASGITransport(app=app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://load") as client:
+
+            async def order(i: int) -> int:
+                payload = {
+                    "user_id": i,
+                    "start_x": rng.randint(1, 100),
+                    "start_y": rng.randint(1, 100),
+                    "end_x": rng.randint(1, 100),
+                    "end_y": rng.randint(1, 100),
+                }
+                return (await client.post("/orders", json=payload)).status_code
+
+            async def probe() -> float:
+                started = time.perf_counter()
+                await client.get("/taxis/count")
+                return (time.perf_counter() - started) * 1000
+
+            started = time.perf_counter()
+            statuses = await asyncio.gather(*(order(i) for i in range(args.orders)))
+            elapsed = time.perf_counter() - started
+            await asyncio.sleep(min(0.5, args.callback_delay / 2))
+            probe_ms = [await probe() for _ in range(args.probes)]
+
+        await workers.stop()
+        app.dependency_overrides.clear()
+        await engine.dispose()
+
+    print(
+        json.dumps(
+            {
+                "orders": args.orders,
+                "orders_accepted": statuses.count(202),
+                "callback_delay_sec": args.callback_delay,
+                "orders_wall_time_sec": round(elapsed, 2),
+                "probe_p50_ms": round(statistics.median(probe_ms), 2),
+                "probe_p95_ms": round(_percentile(probe_ms, 95), 2),
+                "probe_max_ms": round(max(probe_ms), 2),
+            },
+            indent=2,
+        )
+    )
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
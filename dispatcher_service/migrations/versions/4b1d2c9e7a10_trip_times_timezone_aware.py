@@ -0,0 +1,46 @@
+"""Trip times timezone aware
+
+Revision ID: 4b1d2c9e7a10
+Revises: 73f721630312
+Create Date: 2025-10-20 10:12:41.518203
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '4b1d2c9e7a10'
+down_revision: Union[str, Sequence[str], None] = '73f721630312'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+_COLUMNS = ('request_time', 'pickup_time', 'dropoff_time')
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    # asyncpg refuses to bind aware datetimes to TIMESTAMP WITHOUT TIME ZONE.
+    # Existing values were written as UTC, so interpret them as such.
+    for column in _COLUMNS:
+        op.alter_column(
+            'trips',
+            column,
+            type_=sa.DateTime(timezone=True),
+            existing_type=sa.DateTime(),
+            postgresql_using=f"{column} AT TIME ZONE 'UTC'",
+        )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    for column in _COLUMNS:
+        op.alter_column(
+            'trips',
+            column,
+            type_=sa.DateTime(),
+            existing_type=sa.DateTime(timezone=True),
+            postgresql_using=f"{column} AT TIME ZONE 'UTC'",
+        )
@@ -0,0 +1,30 @@
+"""Trip deadline for pending orders
+
+Revision ID: 5e2b8f4c1d93
+Revises: d7a41e6b3c58
+Create Date: 2025-11-03 10:12:37.402915
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '5e2b8f4c1d93'
+down_revision: Union[str, Sequence[str], None] = 'd7a41e6b3c58'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.add_column('trips', sa.Column('deadline_at', sa.DateTime(timezone=True), nullable=True))
+    op.create_index('ix_trips_status_deadline_at', 'trips', ['status', 'deadline_at'], unique=False)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index('ix_trips_status_deadline_at', table_name='trips')
+    op.drop_column('trips', 'deadline_at')
@@ -0,0 +1,42 @@
+"""Assignment outbox
+
+Revision ID: 9c3e5f1a2b47
+Revises: 4b1d2c9e7a10
+Create Date: 2025-10-22 09:41:07.662310
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '9c3e5f1a2b47'
+down_revision: Union[str, Sequence[str], None] = '4b1d2c9e7a10'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_table('assignment_outbox',
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('trip_id', sa.Integer(), nullable=False),
+    sa.Column('status', sa.Enum('PENDING', 'DELIVERED', 'FAILED', name='outboxstatus'), nullable=False),
+    sa.Column('attempts', sa.Integer(), nullable=False),
+    sa.Column('next_attempt_at', sa.DateTime(timezone=True), nullable=False),
+    sa.Column('created_at', sa.DateTime(timezone=True), nullable=False),
+    sa.Column('processed_at', sa.DateTime(timezone=True), nullable=True),
+    sa.ForeignKeyConstraint(['trip_id'], ['trips.id'], ),
+    sa.PrimaryKeyConstraint('id'),
+    sa.UniqueConstraint('trip_id')
+    )
+    op.create_index('ix_assignment_outbox_status_next_attempt_at', 'assignment_outbox', ['status', 'next_attempt_at'], unique=False)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index('ix_assignment_outbox_status_next_attempt_at', table_name='assignment_outbox')
+    op.drop_table('assignment_outbox')
+    sa.Enum(name='outboxstatus').drop(op.get_bind(), checkfirst=True)
@@ -0,0 +1,27 @@
+"""Trips taxi_id status index
+
+Revision ID: b8e3f06a9d21
+Revises: 5e2b8f4c1d93
+Create Date: 2026-10-18 13:20:41.507318
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'b8e3f06a9d21'
+down_revision: Union[str, Sequence[str], None] = '5e2b8f4c1d93'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_index('ix_trips_taxi_id_status', 'trips', ['taxi_id', 'status'], unique=False)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index('ix_trips_taxi_id_status', table_name='trips')
@@ -0,0 +1,27 @@
+"""Taxis status last_seen_at index
+
+Revision ID: d7a41e6b3c58
+Revises: 9c3e5f1a2b47
+Create Date: 2025-10-24 14:05:52.118734
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'd7a41e6b3c58'
+down_revision: Union[str, Sequence[str], None] = '9c3e5f1a2b47'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_index('ix_taxis_status_last_seen_at', 'taxis', ['status', 'last_seen_at'], unique=False)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index('ix_taxis_status_last_seen_at', table_name='taxis')
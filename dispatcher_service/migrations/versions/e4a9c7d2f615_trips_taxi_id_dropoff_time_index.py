@@ -0,0 +1,29 @@
+"""Trips taxi_id dropoff_time index
+
+Revision ID: e4a9c7d2f615
+Revises: b8e3f06a9d21
+Create Date: 2026-10-18 15:02:17.884120
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'e4a9c7d2f615'
+down_revision: Union[str, Sequence[str], None] = 'b8e3f06a9d21'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_index(
+        'ix_trips_taxi_id_dropoff_time', 'trips', ['taxi_id', 'dropoff_time'], unique=False
+    )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index('ix_trips_taxi_id_dropoff_time', table_name='trips')
@@ -1,17 +1,29 @@
 # dispatcher_service/tests/conftest.py
 import json
 
+import httpx
 import pytest
-from fastapi.testclient import TestClient
-from sqlalchemy import create_engine
-from sqlalchemy.orm import sessionmaker
+from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
 from sqlalchemy.pool import StaticPool
 
-from dispatcher_service.app.api.dependencies import get_db_session
+from dispatcher_service.app.adapters.fleet_snapshot import fleet_snapshot
+from dispatcher_service.app.adapters.heatmap_cache import heatmap_cache
+from dispatcher_service.app.api.dependencies import get_db_session, get_session_factory
+from dispatcher_service.app.background.assignment_outbox import AssignmentOutboxWorkers
+from dispatcher_service.app.background.fleet_stream import fleet_stream
+from dispatcher_service.app.background.heartbeat_buffer import heartbeat_buffer
+from dispatcher_service.app.background.pending_orders import (
+    PendingOrderMatcher,
+    pending_order_matcher,
+)
+from dispatcher_service.app.domain.fleet_counters import fleet_counters
 from dispatcher_service.app.domain.models import Base, Taxi, TaxiStatus
+from dispatcher_service.app.domain.spatial_index import available_taxi_index
+from dispatcher_service.app.domain.timing_wheel import taxi_expiry_wheel
+from dispatcher_service.app.domain.trip_rollups import trip_rollups
 from dispatcher_service.app.main import app
 
-TEST_DATABASE_URL = "sqlite:///:memory:"
+TEST_DATABASE_URL = "sqlite+aiosqlite:///:memory:"
 
 
 @pytest.fixture(autouse=True)
@@ -22,6 +34,49 @@ def fast_assign_retries(monkeypatch):
     return True
 
 
+@pytest.fixture(autouse=True)
+def reset_spatial_index():
+    available_taxi_index.clear()
+    yield
+    available_taxi_index.clear()
+
+
+@pytest.fixture(autouse=True)
+def reset_expiry_wheel():
+    taxi_expiry_wheel.clear()
+    yield
+    taxi_expiry_wheel.clear()
+
+
+@pytest.fixture(autouse=True)
+def reset_heartbeat_buffer():
+    heartbeat_buffer.clear()
+    yield
+    heartbeat_buffer.clear()
+
+
+@pytest.fixture(autouse=True)
+def reset_pending_order_matcher():
+    pending_order_matcher.clear()
+    yield
+    pending_order_matcher.clear()
+
+
+@pytest.fixture(autouse=True)
+def reset_fleet_snapshot():
+    fleet_snapshot.clear()
+    fleet_stream.clear()
+    fleet_counters.clear()
+    trip_rollups.clear()
+    heatmap_cache.clear()
+    yield
+    fleet_snapshot.clear()
+    fleet_stream.clear()
+    fleet_counters.clear()
+    trip_rollups.clear()
+    heatmap_cache.clear()
+
+
 @pytest.fixture
 def mock_assign_ok(monkeypatch):
     import dispatcher_service.app.domain.services as services
@@ -62,35 +117,52 @@ def mock_assign_fail(monkeypatch):
 
 
 @pytest.fixture
-def db_engine():
-    engine = create_engine(
+async def db_engine():
+    engine = create_async_engine(
         TEST_DATABASE_URL, connect_args={"check_same_thread": False}, poolclass=StaticPool
     )
-    Base.metadata.create_all(bind=engine)
+    async with engine.begin() as conn:
+        await conn.run_sync(Base.metadata.create_all)
     try:
         yield engine
     finally:
-        Base.metadata.drop_all(bind=engine)
-        engine.dispose()
+        async with engine.begin() as conn:
+            await conn.run_sync(Base.metadata.drop_all)
+        await engine.dispose()
 
 
 @pytest.fixture
-def db_session(db_engine):
-    TestingSessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=db_engine)
-    session = TestingSessionLocal()
-    try:
+def session_factory(db_engine):
+    return async_sessionmaker(bind=db_engine, autoflush=False, expire_on_commit=False)
+
+
+@pytest.fixture
+async def db_session(session_factory):
+    async with session_factory() as session:
         yield session
-    finally:
-        session.close()
 
 
 @pytest.fixture
-def client(db_session, monkeypatch):
-    def override_get_db():
+def outbox_workers(session_factory):
+    return AssignmentOutboxWorkers(session_factory, workers=1, batch_size=50, poll_interval=0.05)
+
+
+@pytest.fixture
+def order_matcher(session_factory):
+    return PendingOrderMatcher(session_factory, batch_size=50, poll_interval=0.05)
+
+
+@pytest.fixture
+async def client(db_session, session_factory, monkeypatch):
+    async def override_get_db():
         yield db_session
 
     app.dependency_overrides[get_db_session] = override_get_db
-    return TestClient(app)
+    app.dependency_overrides[get_session_factory] = lambda: session_factory
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://test") as c:
+        yield c
+    app.dependency_overrides.clear()
 
 
 @pytest.fixture
@@ -117,9 +189,9 @@ def mock_taxi_calls(monkeypatch):
     return calls
 
 
-def make_taxi(session, x=10, y=10, status=TaxiStatus.AVAILABLE, cb="http://cb"):
+async def make_taxi(session, x=10, y=10, status=TaxiStatus.AVAILABLE, cb="http://cb"):
     t = Taxi(x=x, y=y, status=status, callback_url=cb)
     session.add(t)
-    session.commit()
-    session.refresh(t)
+    await session.commit()
+    await session.refresh(t)
     return t
@@ -6,9 +6,9 @@ from dispatcher_service.app.domain.models import TaxiStatus, TripStatus
 from dispatcher_service.tests.conftest import make_taxi
 
 
-def test_events_pickup_and_delivered_202(client, db_session):
+async def test_events_pickup_and_delivered_202(client, db_session):
     # ARRANGE
-    taxi = make_taxi(db_session, 10, 10, TaxiStatus.BUSY)
+    taxi = await make_taxi(db_session, 10, 10, TaxiStatus.BUSY)
     trip = models.Trip(
         user_id=1,
         taxi_id=taxi.id,
@@ -20,8 +20,8 @@ def test_events_pickup_and_delivered_202(client, db_session):
         end_y=20,
     )
     db_session.add(trip)
-    db_session.commit()
-    db_session.refresh(trip)
+    await db_session.commit()
+    await db_session.refresh(trip)
 
     # ACT
     pickup_evt = TaxiPickupEvent(
@@ -30,9 +30,9 @@ def test_events_pickup_and_delivered_202(client, db_session):
         timestamp=dt.datetime.now(dt.UTC),
     ).model_dump(mode="json")
 
-    r1 = client.post("/events/pickup", json=pickup_evt)
+    r1 = await client.post("/events/pickup", json=pickup_evt)
     assert r1.status_code == 202, r1.text
-    db_session.refresh(trip)
+    await db_session.refresh(trip)
     assert trip.status == TripStatus.IN_PROGRESS
     assert trip.pickup_time is not None
 
@@ -43,21 +43,21 @@ def test_events_pickup_and_delivered_202(client, db_session):
         end_x=20,
         end_y=20,
     ).model_dump(mode="json")
-    r2 = client.post("/events/delivered", json=delivered_evt)
+    r2 = await client.post("/events/delivered", json=delivered_evt)
     
     # ASSERT    
     assert r2.status_code == 202, r2.text
-    db_session.refresh(trip)
-    db_session.refresh(taxi)
+    await db_session.refresh(trip)
+    await db_session.refresh(taxi)
     assert trip.status == TripStatus.COMPLETED
     assert taxi.status == TaxiStatus.AVAILABLE
     assert (taxi.x, taxi.y) == (20, 20)
 
 
-def test_events_pickup_404_when_wrong_taxi(client, db_session):
+async def test_events_pickup_404_when_wrong_taxi(client, db_session):
     # ARRANGE
     wrong_uuid = "123e4567-e89b-12d3-a456-426614174000"
-    taxi = make_taxi(db_session, 10, 10, TaxiStatus.BUSY)
+    taxi = await make_taxi(db_session, 10, 10, TaxiStatus.BUSY)
     trip = models.Trip(
         user_id=1,
         taxi_id=taxi.id,
@@ -69,8 +69,8 @@ def test_events_pickup_404_when_wrong_taxi(client, db_session):
         end_y=20,
     )
     db_session.add(trip)
-    db_session.commit()
-    db_session.refresh(trip)
+    await db_session.commit()
+    await db_session.refresh(trip)
 
     pickup_evt = TaxiPickupEvent(
         trip_id=trip.id,
@@ -79,7 +79,7 @@ def test_events_pickup_404_when_wrong_taxi(client, db_session):
     ).model_dump(mode="json")
 
     # ACT
-    _ = client.post("/events/pickup", json=pickup_evt)
+    _ = await client.post("/events/pickup", json=pickup_evt)
 
     bad_evt = TaxiPickupEvent(
         trip_id=trip.id,
@@ -87,15 +87,15 @@ def test_events_pickup_404_when_wrong_taxi(client, db_session):
         timestamp=dt.datetime.now(dt.UTC),
     ).model_dump(mode="json")
 
-    r = client.post("/events/pickup", json=bad_evt)
+    r = await client.post("/events/pickup", json=bad_evt)
 
     # ASSERT
     assert r.status_code == 404
 
 
-def test_events_delivered_404_when_trip_not_found(client, db_session):
+async def test_events_delivered_404_when_trip_not_found(client, db_session):
     # ARRANGE
-    taxi = make_taxi(db_session, 10, 10, TaxiStatus.BUSY)
+    taxi = await make_taxi(db_session, 10, 10, TaxiStatus.BUSY)
     bad_evt = TaxiDeliveredEvent(
         trip_id=9999,
         taxi_public_id=str(taxi.public_id),
@@ -105,7 +105,138 @@ def test_events_delivered_404_when_trip_not_found(client, db_session):
     ).model_dump(mode="json")
 
     # ACT
-    r = client.post("/events/delivered", json=bad_evt)
+    r = await client.post("/events/delivered", json=bad_evt)
 
     # ASSERT
     assert r.status_code == 404
+
+
+async def test_events_batch_mixed_with_duplicates(client, db_session, db_engine):
+    # ARRANGE
+    from sqlalchemy import event
+
+    taxi_a = await make_taxi(db_session, 10, 10, TaxiStatus.BUSY)
+    taxi_b = await make_taxi(db_session, 30, 30, TaxiStatus.BUSY)
+    trip_a = models.Trip(user_id=1, taxi_id=taxi_a.id, start_x=10, start_y=10, end_x=20, end_y=20)
+    trip_b = models.Trip(
+        user_id=2,
+        taxi_id=taxi_b.id,
+        status=TripStatus.IN_PROGRESS,
+        pickup_time=dt.datetime.now(dt.UTC),
+        start_x=30,
+        start_y=30,
+        end_x=40,
+        end_y=40,
+    )
+    db_session.add_all([trip_a, trip_b])
+    await db_session.commit()
+    now = dt.datetime.now(dt.UTC).isoformat()
+    body = [
+        {
+            "type": "pickup",
+            "trip_id": trip_a.id,
+            "taxi_public_id": str(taxi_a.public_id),
+            "timestamp": now,
+        },
+        {
+            "type": "pickup",
+            "trip_id": trip_a.id,
+            "taxi_public_id": str(taxi_a.public_id),
+            "timestamp": now,
+        },
+        {
+            "type": "delivered",
+            "trip_id": trip_b.id,
+            "taxi_public_id": str(taxi_b.public_id),
+            "dropoff_time": now,
+            "end_x": 40,
+            "end_y": 40,
+        },
+        {
+            "type": "pickup",
+            "trip_id": trip_b.id,
+            "taxi_public_id": str(taxi_a.public_id),
+            "timestamp": now,
+        },
+        {"type": "teleport", "trip_id": trip_b.id},
+    ]
+    selects: list[str] = []
+
+    def count_selects(conn, cursor, statement, *args):
+        if statement.lstrip().upper().startswith("SELECT"):
+            selects.append(statement)
+
+    event.listen(db_engine.sync_engine, "before_cursor_execute", count_selects)
+
+    # ACT
+    try:
+        r = await client.post("/events/batch", json=body)
+    finally:
+        event.remove(db_engine.sync_engine, "before_cursor_execute", count_selects)
+
+    # ASSERT
+    assert r.status_code == 200, r.text
+    outcomes = [(res["index"], res["outcome"]) for res in r.json()["results"]]
+    assert outcomes == [
+        (0, "applied"),
+        (1, "duplicate"),
+        (2, "applied"),
+        (3, "not_found"),
+        (4, "invalid"),
+    ]
+    assert len(selects) == 2, selects
+    await db_session.refresh(trip_a)
+    await db_session.refresh(trip_b)
+    await db_session.refresh(taxi_b)
+    assert trip_a.status == TripStatus.IN_PROGRESS
+    assert trip_b.status == TripStatus.COMPLETED
+    assert (taxi_b.status, taxi_b.x, taxi_b.y) == (TaxiStatus.AVAILABLE, 40, 40)
+
+
+async def test_events_batch_redelivery_is_duplicate(client, db_session):
+    # ARRANGE
+    taxi = await make_taxi(db_session, 10, 10, TaxiStatus.BUSY)
+    trip = models.Trip(user_id=1, taxi_id=taxi.id, start_x=10, start_y=10, end_x=20, end_y=20)
+    db_session.add(trip)
+    await db_session.commit()
+    line = TaxiDeliveredEvent(
+        trip_id=trip.id,
+        taxi_public_id=taxi.public_id,
+        dropoff_time=dt.datetime.now(dt.UTC),
+        end_x=20,
+        end_y=20,
+    ).model_dump_json()
+    headers = {"content-type": "application/x-ndjson"}
+    body = '{"type": "delivered", ' + line[1:] + "\n"
+
+    # ACT
+    first = await client.post("/events/batch", content=body, headers=headers)
+    again = await client.post("/events/batch", content=body, headers=headers)
+
+    # ASSERT
+    assert first.json()["results"][0]["outcome"] == "applied"
+    assert again.json()["results"][0]["outcome"] == "duplicate"
+
+
+async def test_events_batch_stops_reading_ndjson_past_the_cap(client, monkeypatch):
+    # ARRANGE
+    from dispatcher_service.app.settings import settings
+
+    monkeypatch.setattr(settings, "BULK_MAX_ITEMS", 5)
+    line = b'{"type": "pickup", "trip_id": 1}\n'
+    sent = 0
+
+    async def body():
+        nonlocal sent
+        for _ in range(10000):
+            sent += 1
+            yield line
+
+    # ACT
+    r = await client.post(
+        "/events/batch", content=body(), headers={"content-type": "application/x-ndjson"}
+    )
+
+    # ASSERT
+    assert r.status_code == 413
+    assert sent <= 7
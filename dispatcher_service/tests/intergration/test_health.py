@@ -1,5 +1,5 @@
-def test_health(client):
+async def test_health(client):
     # ACT & ASSERT
-    r = client.get("/healthz")
+    r = await client.get("/healthz")
     assert r.status_code == 200
     assert r.json() == {"status": "ok"}
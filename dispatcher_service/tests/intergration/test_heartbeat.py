@@ -1,13 +1,16 @@
+import asyncio
 import datetime as dt
 
 from common.schemas import TaxiHeartbeat
+from dispatcher_service.app.adapters import crud
+from dispatcher_service.app.background.heartbeat_buffer import HeartbeatBuffer, heartbeat_buffer
 from dispatcher_service.app.domain import models
 from dispatcher_service.tests.conftest import make_taxi
 
 
-def test_heartbeat_updates_last_seen(client, db_session):
+async def test_heartbeat_updates_last_seen(client, db_session):
     # ARRANGE
-    taxi = make_taxi(db_session, 5, 5, models.TaxiStatus.AVAILABLE)
+    taxi = await make_taxi(db_session, 5, 5, models.TaxiStatus.AVAILABLE)
     old_seen = taxi.last_seen_at
 
     evt = TaxiHeartbeat(
@@ -16,15 +19,18 @@ def test_heartbeat_updates_last_seen(client, db_session):
     ).model_dump(mode="json")
 
     # ACT
-    r = client.post("/taxis/heartbeat", json=evt)
+    r = await client.post("/taxis/heartbeat", json=evt)
+    flushed = await heartbeat_buffer.flush(db_session)
 
     # ASSERT
     assert r.status_code == 204, r.text
+    assert flushed == 1
+    await db_session.refresh(taxi)
     assert taxi.last_seen_at is not None
     assert taxi.last_seen_at != old_seen
 
 
-def test_heartbeat_returns_404_for_missing_taxi(client):
+async def test_heartbeat_returns_404_for_missing_taxi(client):
     # ARRANGE
     evt = TaxiHeartbeat(
         taxi_public_id="00000000-0000-0000-0000-000000000000",
@@ -32,8 +38,211 @@ def test_heartbeat_returns_404_for_missing_taxi(client):
     ).model_dump(mode="json")
 
     # ACT
-    r = client.post("/taxis/heartbeat", json=evt)
+    r = await client.post("/taxis/heartbeat", json=evt)
 
     # ASSERT
     assert r.status_code == 404
     assert "Taxi not found" in r.text
+
+
+async def test_heartbeats_are_coalesced_and_revive_offline_taxi(client, db_session):
+    # ARRANGE
+    taxi = await make_taxi(db_session, 5, 5, models.TaxiStatus.OFFLINE)
+    newest = dt.datetime.now(dt.UTC)
+    beats = [newest - dt.timedelta(seconds=s) for s in (3, 0, 5)]
+
+    # ACT
+    for ts in beats:
+        evt = TaxiHeartbeat(taxi_public_id=str(taxi.public_id), timestamp=ts)
+        await client.post("/taxis/heartbeat", json=evt.model_dump(mode="json"))
+    depth = len(heartbeat_buffer)
+    flushed = await heartbeat_buffer.flush(db_session)
+
+    # ASSERT
+    assert depth == 1
+    assert flushed == 1
+    await db_session.refresh(taxi)
+    assert taxi.status == models.TaxiStatus.AVAILABLE
+    assert taxi.last_seen_at.replace(tzinfo=dt.UTC) == newest
+
+
+async def test_deregister_drops_buffered_heartbeat(client, db_session):
+    # ARRANGE
+    taxi = await make_taxi(db_session, 5, 5, models.TaxiStatus.AVAILABLE)
+    evt = TaxiHeartbeat(taxi_public_id=str(taxi.public_id), timestamp=dt.datetime.now(dt.UTC))
+    await client.post("/taxis/heartbeat", json=evt.model_dump(mode="json"))
+
+    # ACT
+    r = await client.post("/taxis/deregister", json={"taxi_public_id": str(taxi.public_id)})
+    flushed = await heartbeat_buffer.flush(db_session)
+
+    # ASSERT
+    assert r.status_code == 204
+    assert flushed == 0
+    await db_session.refresh(taxi)
+    assert taxi.status == models.TaxiStatus.OFFLINE
+
+
+async def test_heartbeat_batch_reports_unknown_and_invalid_items(client, db_session):
+    # ARRANGE
+    moving = await make_taxi(db_session, 5, 5, models.TaxiStatus.AVAILABLE)
+    idle = await make_taxi(db_session, 9, 9, models.TaxiStatus.OFFLINE)
+    now = dt.datetime.now(dt.UTC).isoformat()
+    items = [
+        {"taxi_public_id": str(moving.public_id), "timestamp": now, "x": 40, "y": 41},
+        {"taxi_public_id": "00000000-0000-0000-0000-000000000000", "timestamp": now},
+        {"taxi_public_id": str(idle.public_id), "timestamp": now},
+        {"taxi_public_id": str(idle.public_id), "timestamp": now, "x": 500, "y": 1},
+    ]
+
+    # ACT
+    r = await client.post("/taxis/heartbeat/batch", json=items)
+    await heartbeat_buffer.flush(db_session)
+
+    # ASSERT
+    assert r.status_code == 200, r.text
+    body = r.json()
+    assert body["accepted"] == 2
+    assert [(i["index"], i["reason"]) for i in body["rejected"]] == [
+        (1, "not_found"),
+        (3, "invalid"),
+    ]
+    await db_session.refresh(moving)
+    await db_session.refresh(idle)
+    assert (moving.x, moving.y) == (40, 41)
+    assert idle.status == models.TaxiStatus.AVAILABLE
+    assert (idle.x, idle.y) == (9, 9)
+
+
+async def test_heartbeat_batch_accepts_ndjson(client, db_session):
+    # ARRANGE
+    taxis = [await make_taxi(db_session, 5, 5, models.TaxiStatus.AVAILABLE) for _ in range(3)]
+    lines = [
+        TaxiHeartbeat(
+            taxi_public_id=taxi.public_id, timestamp=dt.datetime.now(dt.UTC)
+        ).model_dump_json()
+        for taxi in taxis
+    ]
+
+    # ACT
+    r = await client.post(
+        "/taxis/heartbeat/batch",
+        content="\n".join(lines) + "\n",
+        headers={"content-type": "application/x-ndjson"},
+    )
+
+    # ASSERT
+    assert r.status_code == 200, r.text
+    assert r.json() == {"accepted": 3, "rejected": []}
+    assert len(heartbeat_buffer) == 3
+
+
+async def test_heartbeat_batch_rejects_malformed_body(client):
+    # ACT
+    r = await client.post(
+        "/taxis/heartbeat/batch", content="{not json", headers={"content-type": "application/json"}
+    )
+
+    # ASSERT
+    assert r.status_code == 400
+
+
+async def test_heartbeat_batch_stops_reading_ndjson_past_the_cap(client, monkeypatch):
+    # ARRANGE
+    from dispatcher_service.app.settings import settings
+
+    monkeypatch.setattr(settings, "BULK_MAX_ITEMS", 5)
+    now = dt.datetime.now(dt.UTC).isoformat()
+    line = f'{{"taxi_public_id": "00000000-0000-0000-0000-000000000000", "timestamp": "{now}"}}\n'
+    sent = 0
+
+    async def body():
+        nonlocal sent
+        for _ in range(10000):
+            sent += 1
+            yield line.encode()
+
+    # ACT
+    r = await client.post(
+        "/taxis/heartbeat/batch", content=body(), headers={"content-type": "application/x-ndjson"}
+    )
+
+    # ASSERT
+    assert r.status_code == 413
+    assert sent <= 7
+
+
+async def test_stop_during_flush_keeps_the_in_flight_batch(
+    db_session, session_factory, monkeypatch
+):
+    # ARRANGE
+    taxi = await make_taxi(db_session, 5, 5, models.TaxiStatus.AVAILABLE)
+    seen = dt.datetime.now(dt.UTC) + dt.timedelta(minutes=1)
+    buffer = HeartbeatBuffer(session_factory, flush_interval_ms=1)
+    buffer.record(taxi.id, seen)
+    real_update = crud.bulk_update_heartbeats
+    in_flight = asyncio.Event()
+
+    async def slow_first_update(db, beats, **kwargs):
+        if not in_flight.is_set():
+            in_flight.set()
+            await asyncio.sleep(60)
+        return await real_update(db, beats, **kwargs)
+
+    monkeypatch.setattr(crud, "bulk_update_heartbeats", slow_first_update)
+
+    # ACT
+    await buffer.start()
+    await in_flight.wait()
+    await buffer.stop()
+
+    # ASSERT
+    await db_session.refresh(taxi)
+    assert taxi.last_seen_at.replace(tzinfo=dt.UTC) == seen
+
+
+async def test_heartbeat_position_is_ignored_for_busy_taxi(db_session):
+    # ARRANGE
+    taxi = await make_taxi(db_session, 5, 5, models.TaxiStatus.BUSY)
+
+    # ACT
+    await crud.bulk_update_heartbeats(db_session, [(taxi.id, dt.datetime.now(dt.UTC), 40, 40)])
+    await db_session.commit()
+
+    # ASSERT
+    await db_session.refresh(taxi)
+    assert (taxi.x, taxi.y) == (5, 5)
+
+
+async def test_heartbeat_sent_before_dropoff_does_not_move_taxi_back(db_session):
+    # ARRANGE — delivered at (20, 20); the beat still carries the pre-trip cell
+    dropoff = dt.datetime.now(dt.UTC)
+    taxi = await make_taxi(db_session, 20, 20, models.TaxiStatus.AVAILABLE)
+    db_session.add(
+        models.Trip(
+            user_id=1,
+            taxi_id=taxi.id,
+            status=models.TripStatus.COMPLETED,
+            start_x=10,
+            start_y=10,
+            end_x=20,
+            end_y=20,
+            dropoff_time=dropoff,
+        )
+    )
+    await db_session.commit()
+    stale = dropoff - dt.timedelta(seconds=2)
+    fresh = dropoff + dt.timedelta(seconds=2)
+
+    # ACT
+    await crud.bulk_update_heartbeats(db_session, [(taxi.id, stale, 5, 5)])
+    await db_session.commit()
+    await db_session.refresh(taxi)
+    after_stale = (taxi.x, taxi.y)
+    await crud.bulk_update_heartbeats(db_session, [(taxi.id, fresh, 21, 20)])
+    await db_session.commit()
+    await db_session.refresh(taxi)
+
+    # ASSERT
+    assert after_stale == (20, 20)
+    assert (taxi.x, taxi.y) == (21, 20)
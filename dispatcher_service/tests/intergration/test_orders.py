@@ -1,15 +1,24 @@
+import asyncio
+
+import httpx
+
+import dispatcher_service.app.domain.services as services
 from common.schemas import OrderCreate
+from dispatcher_service.app.api.dependencies import get_db_session
+from dispatcher_service.app.api.routers import orders
 from dispatcher_service.app.domain.models import TaxiStatus, TripStatus
+from dispatcher_service.app.main import app
+from dispatcher_service.app.settings import settings
 from dispatcher_service.tests.conftest import make_taxi
 
 
-def test_orders_success_202(client, db_session, mock_assign_ok):
+async def test_orders_success_202(client, db_session, mock_assign_ok):
     # ARRANGE
-    _ = make_taxi(db_session, 10, 10, TaxiStatus.AVAILABLE, cb="http://cb/assign")
+    _ = await make_taxi(db_session, 10, 10, TaxiStatus.AVAILABLE, cb="http://cb/assign")
     payload = OrderCreate(user_id=1, start_x=10, start_y=10, end_x=12, end_y=15)
 
     # ACT
-    resp = client.post("/orders", json=payload.model_dump())
+    resp = await client.post("/orders", json=payload.model_dump())
 
     # ASSERT
     assert resp.status_code == 202, resp.text
@@ -20,15 +29,120 @@ def test_orders_success_202(client, db_session, mock_assign_ok):
     assert body["status"] in (TripStatus.REQUESTED.value, TripStatus.IN_PROGRESS.value)
 
 
-def test_orders_no_available_taxi_409(client, db_session):
+async def test_orders_no_available_taxi_409(client, db_session, monkeypatch):
     # ARRANGE
-    make_taxi(db_session, 1, 1, TaxiStatus.BUSY)
-    make_taxi(db_session, 2, 2, TaxiStatus.OFFLINE)
+    monkeypatch.setattr(settings, "ORDER_QUEUE_ENABLED", False)
+    await make_taxi(db_session, 1, 1, TaxiStatus.BUSY)
+    await make_taxi(db_session, 2, 2, TaxiStatus.OFFLINE)
 
     # ACT
     payload = {"user_id": 2, "start_x": 10, "start_y": 10, "end_x": 12, "end_y": 15}
-    resp = client.post("/orders", json=payload)
+    resp = await client.post("/orders", json=payload)
 
     # ASSERT
     assert resp.status_code == 409
     assert "No available taxi" in resp.text
+
+
+async def test_order_without_free_taxi_is_queued(client, db_session):
+    # ARRANGE
+    await make_taxi(db_session, 1, 1, TaxiStatus.BUSY)
+    payload = {"user_id": 2, "start_x": 10, "start_y": 10, "end_x": 12, "end_y": 15}
+
+    # ACT
+    resp = await client.post("/orders", json={**payload, "max_wait_sec": 30})
+    polled = await client.get(f"/orders/{resp.json()['id']}")
+
+    # ASSERT
+    assert resp.status_code == 202, resp.text
+    body = resp.json()
+    assert body["status"] == TripStatus.REQUESTED.value
+    assert body["taxi_id"] is None
+    assert body["deadline_at"] is not None
+    assert polled.json()["id"] == body["id"]
+    assert polled.json()["taxi_id"] is None
+
+
+async def test_wait_returns_queued_order_once_matched(
+    client, db_session, mock_assign_ok, monkeypatch, order_matcher
+):
+    # ARRANGE
+    monkeypatch.setattr(orders, "pending_order_matcher", order_matcher)
+    payload = {"user_id": 2, "start_x": 10, "start_y": 10, "end_x": 12, "end_y": 15}
+    trip_id = (await client.post("/orders", json=payload)).json()["id"]
+
+    # ACT
+    waiting = asyncio.create_task(client.get(f"/orders/{trip_id}/wait", params={"timeout": 5}))
+    await asyncio.sleep(0.05)
+    registered = await client.post(
+        "/taxis/register", json={"x": 12, "y": 10, "callback_url": "http://cb/assign"}
+    )
+    matched = await order_matcher.drain()
+    resp = await asyncio.wait_for(waiting, timeout=2)
+
+    # ASSERT
+    assert matched == 1
+    assert resp.status_code == 200, resp.text
+    assert resp.json()["taxi_id"] == registered.json()["id"]
+    assert resp.json()["route_meta"] == {"pickup_distance": 2}
+
+
+async def test_wait_times_out_on_pending_order(client, db_session):
+    # ARRANGE
+    payload = {"user_id": 2, "start_x": 10, "start_y": 10, "end_x": 12, "end_y": 15}
+    trip_id = (await client.post("/orders", json=payload)).json()["id"]
+
+    # ACT
+    resp = await client.get(f"/orders/{trip_id}/wait", params={"timeout": 0.1})
+    missing = await client.get("/orders/999/wait", params={"timeout": 0.1})
+
+    # ASSERT
+    assert resp.status_code == 200
+    assert resp.json()["status"] == TripStatus.REQUESTED.value
+    assert resp.json()["taxi_id"] is None
+    assert missing.status_code == 404
+
+
+async def test_order_returns_before_slow_taxi_callback(
+    session_factory, db_session, monkeypatch, outbox_workers
+):
+    # ARRANGE
+    await make_taxi(db_session, 10, 10, TaxiStatus.AVAILABLE, cb="http://cb/assign")
+    entered, release = asyncio.Event(), asyncio.Event()
+
+    class DummyResp:
+        status_code = 200
+
+    async def slow_post(url, payload, **kwargs):
+        entered.set()
+        await release.wait()
+        return DummyResp()
+
+    async def per_request_session():
+        async with session_factory() as session:
+            yield session
+
+    monkeypatch.setattr(services, "post_json", slow_post, raising=True)
+    app.dependency_overrides[get_db_session] = per_request_session
+    payload = {"user_id": 3, "start_x": 10, "start_y": 10, "end_x": 12, "end_y": 15}
+
+    # ACT
+    try:
+        transport = httpx.ASGITransport(app=app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://test") as c:
+            created = await asyncio.wait_for(c.post("/orders", json=payload), timeout=2)
+            callback_started = entered.is_set()
+            delivery = asyncio.create_task(outbox_workers.drain())
+            await asyncio.wait_for(entered.wait(), timeout=2)
+            listing = await asyncio.wait_for(c.get("/taxis"), timeout=2)
+            release.set()
+            delivered = await delivery
+    finally:
+        app.dependency_overrides.clear()
+
+    # ASSERT
+    assert created.status_code == 202, created.text
+    assert not callback_started, "order must not wait for the taxi callback"
+    assert listing.status_code == 200
+    assert listing.json()[0]["status"] == TaxiStatus.BUSY.value
+    assert delivered == 1
@@ -1,29 +1,135 @@
 # dispatcher_service/tests/integration/test_api.py
 
+import datetime as dt
 
-from common.schemas import TaxiCreate
-from dispatcher_service.app.domain.models import TaxiStatus
+from sqlalchemy import event
 
+from common.schemas import TaxiCreate, TaxiHeartbeat
+from dispatcher_service.app.background.heartbeat_buffer import heartbeat_buffer
+from dispatcher_service.app.domain.models import TaxiStatus, Trip, TripStatus
+from dispatcher_service.app.domain.raster import HEADER, TAXI_BITS
+from dispatcher_service.tests.conftest import make_taxi
 
-def test_taxis_register_and_list_and_count(client, db_session):
+
+async def test_taxis_register_and_list_and_count(client, db_session):
     # ARRANGE + ACT
     payload = TaxiCreate(x=7, y=9, callback_url="http://cb/assign").model_dump(mode="json")
-    r = client.post("/taxis/register", json=payload)
+    r = await client.post("/taxis/register", json=payload)
     assert r.status_code in (200, 201)
     taxi = r.json()
     assert taxi["x"] == 7 and taxi["y"] == 9
     assert taxi["status"] == TaxiStatus.AVAILABLE.value
 
     # ARRANGE + ACT
-    r2 = client.get("/taxis")
+    r2 = await client.get("/taxis")
     assert r2.status_code == 200
     lst = r2.json()
     assert any(t["id"] == taxi["id"] for t in lst)
 
     # ARRANGE + ACT
-    r3 = client.get("/taxis/count", params={"status": TaxiStatus.AVAILABLE.value})
+    r3 = await client.get("/taxis/count", params={"status": TaxiStatus.AVAILABLE.value})
     assert r3.status_code == 200
     cnt = r3.json()
     assert cnt["status"] == TaxiStatus.AVAILABLE.value
     assert isinstance(cnt["count"], int)
     assert cnt["count"] >= 1
+
+
+async def test_taxis_snapshot_is_cached_until_fleet_changes(client, db_session, db_engine):
+    # ARRANGE
+    taxi = await make_taxi(db_session, 5, 5, TaxiStatus.BUSY)
+    first = await client.get("/taxis")
+    etag = first.headers["etag"]
+    statements: list[str] = []
+
+    def count_statements(conn, cursor, statement, *args):
+        statements.append(statement)
+
+    event.listen(db_engine.sync_engine, "before_cursor_execute", count_statements)
+
+    # ACT
+    try:
+        again = await client.get("/taxis")
+        conditional = await client.get("/taxis", headers={"If-None-Match": etag})
+    finally:
+        event.remove(db_engine.sync_engine, "before_cursor_execute", count_statements)
+    beat = TaxiHeartbeat(taxi_public_id=taxi.public_id, timestamp=dt.datetime.now(dt.UTC))
+    await client.post("/taxis/heartbeat", json=beat.model_dump(mode="json"))
+    await heartbeat_buffer.flush(db_session)
+    after_heartbeat = await client.get("/taxis", headers={"If-None-Match": etag})
+    await client.post("/taxis/deregister", json={"taxi_public_id": str(taxi.public_id)})
+    after_deregister = await client.get("/taxis", headers={"If-None-Match": etag})
+
+    # ASSERT
+    assert first.status_code == 200
+    assert again.status_code == 200
+    assert again.content == first.content
+    assert conditional.status_code == 304
+    assert statements == []
+    assert after_heartbeat.status_code == 304
+    assert after_deregister.status_code == 200
+    assert after_deregister.headers["etag"] != etag
+    assert after_deregister.json()[0]["status"] == TaxiStatus.OFFLINE.value
+
+
+async def test_fleet_raster_is_binary_and_conditional(client, db_session):
+    # ARRANGE
+    await make_taxi(db_session, 2, 3, TaxiStatus.AVAILABLE)
+    await make_taxi(db_session, 2, 3, TaxiStatus.BUSY)
+
+    # ACT
+    r = await client.get("/fleet/raster")
+    again = await client.get("/fleet/raster", headers={"If-None-Match": r.headers["etag"]})
+
+    # ASSERT
+    assert r.status_code == 200
+    assert r.headers["content-type"] == "application/octet-stream"
+    _, width, height, _, available, busy, offline, *_ = HEADER.unpack_from(r.content)
+    assert (width, height) == (100, 100)
+    assert (available, busy, offline) == (1, 1, 0)
+    cell = (3 - 1) * width + (2 - 1)
+    assert r.content[HEADER.size + cell] == (
+        TAXI_BITS[TaxiStatus.AVAILABLE] | TAXI_BITS[TaxiStatus.BUSY]
+    )
+    assert again.status_code == 304
+
+
+async def test_fleet_raster_trip_totals_cover_all_trips(client, db_session):
+    # ARRANGE
+    for status in (TripStatus.REQUESTED, TripStatus.COMPLETED, TripStatus.COMPLETED):
+        db_session.add(Trip(user_id=1, status=status, start_x=1, start_y=1, end_x=2, end_y=2))
+    await db_session.commit()
+
+    # ACT
+    r = await client.get("/fleet/raster", params={"trips": 1})
+
+    # ASSERT
+    *_, active, completed, cancelled = HEADER.unpack_from(r.content)
+    assert (active, completed, cancelled) == (1, 2, 0)
+
+
+async def test_stats_are_served_from_counters(client, db_session, db_engine):
+    # ARRANGE
+    await client.get("/stats")
+    payload = TaxiCreate(x=7, y=9, callback_url="http://cb/assign").model_dump(mode="json")
+    await client.post("/taxis/register", json=payload)
+    statements: list[str] = []
+
+    def count_statements(conn, cursor, statement, *args):
+        statements.append(statement)
+
+    event.listen(db_engine.sync_engine, "before_cursor_execute", count_statements)
+
+    # ACT
+    try:
+        r = await client.get("/stats")
+        count = await client.get("/taxis/count", params={"status": "available"})
+    finally:
+        event.remove(db_engine.sync_engine, "before_cursor_execute", count_statements)
+
+    # ASSERT
+    assert r.status_code == 200
+    assert r.json()["taxis"] == {"available": 1, "busy": 0, "offline": 0}
+    assert r.json()["trips"]["requested"] == 0
+    assert count.json()["count"] == 1
+    assert statements == []
@@ -1,14 +1,19 @@
+import csv
 import datetime as dt
+import io
+import json
 import re
 
+from sqlalchemy import event
+
 from dispatcher_service.app.domain import models
 from dispatcher_service.app.domain.models import TaxiStatus, TripStatus
 from dispatcher_service.tests.conftest import make_taxi
 
 
-def test_trips_get_sorted_and_limited(client, db_session):
+async def test_trips_get_sorted_and_limited(client, db_session):
     # ARRANGE
-    taxi = make_taxi(db_session, 10, 10, TaxiStatus.BUSY)
+    taxi = await make_taxi(db_session, 10, 10, TaxiStatus.BUSY)
     t1 = models.Trip(
         user_id=1,
         taxi_id=taxi.id,
@@ -43,10 +48,10 @@ def test_trips_get_sorted_and_limited(client, db_session):
         end_y=6,
     )
     db_session.add_all([t1, t2, t3])
-    db_session.commit()
+    await db_session.commit()
 
     # ACT
-    r = client.get("/trips", params={"limit": 2})
+    r = await client.get("/trips", params={"limit": 2})
     assert r.status_code == 200
     data = r.json()
 
@@ -63,3 +68,184 @@ def test_trips_get_sorted_and_limited(client, db_session):
             if v is not None:
                 assert isinstance(v, str)
                 assert iso_like.search(v)
+
+
+async def _seed_trips(db_session, count):
+    taxi = await make_taxi(db_session, 10, 10, TaxiStatus.BUSY)
+    start = dt.datetime(2025, 1, 1, tzinfo=dt.UTC)
+    trips = [
+        models.Trip(
+            user_id=i,
+            taxi_id=taxi.id,
+            status=TripStatus.COMPLETED if i % 2 else TripStatus.CANCELLED,
+            request_time=start + dt.timedelta(minutes=i),
+            start_x=1,
+            start_y=1,
+            end_x=2,
+            end_y=2,
+        )
+        for i in range(count)
+    ]
+    db_session.add_all(trips)
+    await db_session.commit()
+    return trips
+
+
+async def test_trips_keyset_pagination_with_filters(client, db_session):
+    # ARRANGE
+    trips = await _seed_trips(db_session, 10)
+    params = {"limit": 2, "status": "completed", "since": "2025-01-01T00:02:00Z"}
+
+    # ACT
+    pages = []
+    cursor = None
+    while True:
+        r = await client.get("/trips", params={**params, **({"cursor": cursor} if cursor else {})})
+        assert r.status_code == 200, r.text
+        page = r.json()
+        if not page:
+            break
+        pages.append([t["id"] for t in page])
+        cursor = page[-1]["id"]
+
+    # ASSERT
+    expected = [t.id for t in reversed(trips) if t.user_id % 2 and t.user_id >= 2]
+    assert [i for page in pages for i in page] == expected
+    assert all(len(page) <= 2 for page in pages)
+
+
+async def test_trips_export_streams_ndjson_and_csv(client, db_session, monkeypatch):
+    # ARRANGE
+    from dispatcher_service.app.settings import settings
+
+    monkeypatch.setattr(settings, "EXPORT_CHUNK_SIZE", 3)
+    trips = await _seed_trips(db_session, 7)
+
+    # ACT
+    ndjson = await client.get("/trips/export", params={"status": "cancelled"})
+    as_csv = await client.get("/trips/export", params={"format": "csv"})
+
+    # ASSERT
+    assert ndjson.status_code == 200
+    assert ndjson.headers["content-type"].startswith("application/x-ndjson")
+    rows = [json.loads(line) for line in ndjson.text.splitlines()]
+    assert [row["id"] for row in rows] == [t.id for t in trips if t.user_id % 2 == 0]
+    assert all(row["status"] == "cancelled" for row in rows)
+    lines = list(csv.reader(io.StringIO(as_csv.text)))
+    assert lines[0][:3] == ["id", "user_id", "taxi_id"]
+    assert [int(line[0]) for line in lines[1:]] == [t.id for t in trips]
+
+
+async def test_trip_analytics_from_rollups(client, db_session, db_engine):
+    # ARRANGE
+    now = dt.datetime.now(dt.UTC).replace(second=0, microsecond=0)
+    for minute, (x, waiting) in enumerate([(5, 2), (5, 4), (25, 6)]):
+        db_session.add(
+            models.Trip(
+                user_id=minute,
+                start_x=x,
+                start_y=5,
+                end_x=30,
+                end_y=30,
+                status=TripStatus.COMPLETED,
+                request_time=now - dt.timedelta(minutes=30),
+                dropoff_time=now - dt.timedelta(minutes=minute),
+                waiting_time_min=waiting,
+                travel_time_min=10,
+                total_distance=50,
+            )
+        )
+    await db_session.commit()
+    await client.get("/analytics/trips")
+    statements: list[str] = []
+
+    def count_statements(conn, cursor, statement, *args):
+        statements.append(statement)
+
+    event.listen(db_engine.sync_engine, "before_cursor_execute", count_statements)
+
+    # ACT
+    try:
+        total = await client.get("/analytics/trips")
+        by_cell = await client.get("/analytics/trips", params={"group_by": "cell"})
+        one_cell = await client.get("/analytics/trips", params={"cell_x": 2, "cell_y": 0})
+    finally:
+        event.remove(db_engine.sync_engine, "before_cursor_execute", count_statements)
+    bad = await client.get("/analytics/trips", params={"cell_x": 2})
+
+    # ASSERT
+    assert total.status_code == 200, total.text
+    [row] = total.json()["rows"]
+    assert row["waiting_time_min"]["count"] == 3
+    assert row["waiting_time_min"]["sum"] == 12
+    assert row["waiting_time_min"]["mean"] == 4
+    assert abs(row["waiting_time_min"]["p50"] - 4) <= 0.04
+    assert abs(row["travel_time_min"]["p99"] - 10) <= 0.1
+    assert [(r["cell_x"], r["cell_y"]) for r in by_cell.json()["rows"]] == [(0, 0), (2, 0)]
+    assert one_cell.json()["rows"][0]["waiting_time_min"]["count"] == 1
+    assert statements == []
+    assert bad.status_code == 422
+
+
+async def test_trip_analytics_rejects_a_window_ending_before_it_starts(client):
+    # ARRANGE
+    now = dt.datetime.now(dt.UTC)
+    window = {"since": now.isoformat(), "until": (now - dt.timedelta(minutes=1)).isoformat()}
+
+    # ACT
+    resp = await client.get("/analytics/trips", params=window)
+
+    # ASSERT
+    assert resp.status_code == 422
+    assert resp.json()["detail"] == "since must be before until"
+
+
+async def test_heatmaps_cached_per_window_bucket(client, db_session, db_engine):
+    # ARRANGE
+    await make_taxi(db_session, 3, 4, TaxiStatus.AVAILABLE)
+    await make_taxi(db_session, 3, 4, TaxiStatus.BUSY)
+    now = dt.datetime.now(dt.UTC)
+    for waiting in (2, 4, None):
+        db_session.add(
+            models.Trip(
+                user_id=1,
+                start_x=1,
+                start_y=2,
+                end_x=100,
+                end_y=100,
+                status=TripStatus.REQUESTED,
+                request_time=now - dt.timedelta(minutes=5),
+                waiting_time_min=waiting,
+            )
+        )
+    await db_session.commit()
+    statements: list[str] = []
+
+    def count_statements(conn, cursor, statement, *args):
+        statements.append(statement)
+
+    # ACT
+    r = await client.get("/analytics/heatmaps")
+    event.listen(db_engine.sync_engine, "before_cursor_execute", count_statements)
+    try:
+        again = await client.get("/analytics/heatmaps")
+    finally:
+        event.remove(db_engine.sync_engine, "before_cursor_execute", count_statements)
+    old = await client.get(
+        "/analytics/heatmaps",
+        params={"until": (now - dt.timedelta(hours=1)).isoformat()},
+    )
+
+    # ASSERT
+    assert r.status_code == 200, r.text
+    body = r.json()
+    layers, size = body["layers"], body["size"]
+    assert len(layers["origins"]) == size * size
+    assert layers["origins"][(2 - 1) * size + (1 - 1)] == 3
+    assert layers["destinations"][-1] == 3
+    assert layers["available_taxis"][(4 - 1) * size + (3 - 1)] == 1
+    assert layers["avg_waiting_time_min"][(2 - 1) * size] == 3
+    assert layers["avg_waiting_time_min"][0] is None
+    assert again.content == r.content
+    assert statements == []
+    assert sum(old.json()["layers"]["origins"]) == 0
@@ -0,0 +1,81 @@
+import datetime as dt
+
+import pytest
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from common.schemas import OrderCreate
+from dispatcher_service.app.adapters import crud
+from dispatcher_service.app.domain.models import (
+    AssignmentOutbox,
+    OutboxStatus,
+    TaxiStatus,
+    TripStatus,
+)
+from dispatcher_service.app.domain.services import assign_order
+from dispatcher_service.tests.conftest import make_taxi
+
+
+@pytest.mark.asyncio
+async def test_reservation_and_outbox_entry_share_transaction(db_session: AsyncSession):
+    # ARRANGE
+    await make_taxi(db_session, 10, 10, TaxiStatus.AVAILABLE)
+    order = OrderCreate(user_id=1, start_x=10, start_y=10, end_x=1, end_y=1)
+
+    # ACT
+    trip = await assign_order(db_session, order)
+
+    # ASSERT
+    entry = await db_session.scalar(select(AssignmentOutbox))
+    assert entry is not None
+    assert entry.trip_id == trip.id
+    assert entry.status == OutboxStatus.PENDING
+    assert entry.attempts == 0
+
+
+@pytest.mark.asyncio
+async def test_claimed_entry_is_reclaimed_after_lease(db_session: AsyncSession):
+    # ARRANGE
+    await make_taxi(db_session, 10, 10, TaxiStatus.AVAILABLE)
+    await assign_order(db_session, OrderCreate(user_id=1, start_x=10, start_y=10, end_x=1, end_y=1))
+
+    # ACT
+    first = await crud.claim_due_assignments(db_session, limit=10, lease_sec=60)
+    await db_session.commit()
+    while_leased = await crud.claim_due_assignments(db_session, limit=10, lease_sec=60)
+    first[0].next_attempt_at = dt.datetime.now(dt.UTC) - dt.timedelta(seconds=1)
+    await db_session.commit()
+    after_lease = await crud.claim_due_assignments(db_session, limit=10, lease_sec=60)
+
+    # ASSERT
+    assert len(first) == 1
+    assert first[0].trip.taxi is not None
+    assert while_leased == []
+    assert [entry.id for entry in after_lease] == [first[0].id]
+    await db_session.refresh(after_lease[0])
+    assert after_lease[0].attempts == 2
+
+
+@pytest.mark.asyncio
+async def test_failed_delivery_keeps_trip_already_picked_up(
+    db_session: AsyncSession, mock_assign_fail, outbox_workers
+):
+    # ARRANGE — the callback reached the taxi but its answer got lost
+    taxi = await make_taxi(db_session, 10, 10, TaxiStatus.AVAILABLE)
+    trip = await assign_order(
+        db_session, OrderCreate(user_id=1, start_x=10, start_y=10, end_x=1, end_y=1)
+    )
+    trip.status = TripStatus.IN_PROGRESS
+    await db_session.commit()
+
+    # ACT
+    await outbox_workers.drain()
+
+    # ASSERT
+    await db_session.refresh(trip)
+    await db_session.refresh(taxi)
+    entry = await db_session.scalar(select(AssignmentOutbox))
+    await db_session.refresh(entry)
+    assert trip.status == TripStatus.IN_PROGRESS
+    assert taxi.status == TaxiStatus.BUSY
+    assert entry.status == OutboxStatus.FAILED
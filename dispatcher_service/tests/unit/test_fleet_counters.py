@@ -0,0 +1,69 @@
+import datetime as dt
+
+from common.schemas import OrderCreate, TaxiCreate, TaxiDeliveredEvent, TaxiPickupEvent
+from dispatcher_service.app.adapters import crud
+from dispatcher_service.app.background.counter_reconciler import reconcile_fleet_counters
+from dispatcher_service.app.domain.fleet_counters import fleet_counters
+from dispatcher_service.app.domain.models import TaxiStatus, TripStatus
+from dispatcher_service.app.domain.services import assign_order
+from dispatcher_service.tests.conftest import make_taxi
+
+
+async def _db_counts(db_session):
+    taxis, trips = await crud.count_fleet_by_status(db_session)
+    return (
+        {status: count for status, count in taxis if count},
+        {status: count for status, count in trips if count},
+    )
+
+
+def _nonzero(counts):
+    return {status: count for status, count in counts.items() if count}
+
+
+async def test_counters_follow_every_transition(db_session, mock_taxi_calls, outbox_workers):
+    # ARRANGE
+    await make_taxi(db_session, 90, 90, TaxiStatus.OFFLINE)
+    await crud.ensure_fleet_counters(db_session)
+    now = dt.datetime.now(dt.UTC)
+
+    # ACT
+    taxi = await crud.create_taxi(db_session, TaxiCreate(x=5, y=5, callback_url="http://cb"))
+    trip = await assign_order(
+        db_session, OrderCreate(user_id=1, start_x=5, start_y=6, end_x=9, end_y=9)
+    )
+    await outbox_workers.drain()
+    await crud.event_pickup(
+        db_session, TaxiPickupEvent(taxi_public_id=taxi.public_id, trip_id=trip.id, timestamp=now)
+    )
+    await crud.event_delivered(
+        db_session,
+        TaxiDeliveredEvent(
+            taxi_public_id=taxi.public_id, trip_id=trip.id, dropoff_time=now, end_x=9, end_y=9
+        ),
+    )
+    await crud.bulk_update_heartbeats(db_session, [(1, now, None, None)])
+    await db_session.commit()
+    swept = await crud.sweep_offline_taxis(db_session, ttl_sec=-60)
+
+    # ASSERT
+    assert swept == 2
+    taxis, trips = await _db_counts(db_session)
+    assert _nonzero(fleet_counters.taxis) == taxis == {TaxiStatus.OFFLINE: 2}
+    assert _nonzero(fleet_counters.trips) == trips == {TripStatus.COMPLETED: 1}
+
+
+async def test_reconciliation_fixes_drift(db_session):
+    # ARRANGE
+    await make_taxi(db_session, 1, 1, TaxiStatus.AVAILABLE)
+    await crud.ensure_fleet_counters(db_session)
+    # Written behind crud's back, so the counters miss it.
+    await make_taxi(db_session, 2, 2, TaxiStatus.BUSY)
+
+    # ACT
+    drift = await reconcile_fleet_counters(lambda: db_session)
+
+    # ASSERT
+    assert drift == {"taxi:busy": 1}
+    assert fleet_counters.taxis[TaxiStatus.BUSY] == 1
+    assert fleet_counters.reconciled_at is not None
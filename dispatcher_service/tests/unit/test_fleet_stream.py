@@ -0,0 +1,132 @@
+import asyncio
+import json
+
+import httpx
+from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
+
+from dispatcher_service.app.api.dependencies import get_db_session, get_session_factory
+from dispatcher_service.app.background.fleet_stream import FleetStream, fleet_stream
+from dispatcher_service.app.domain import models
+from dispatcher_service.app.main import app
+from dispatcher_service.tests.conftest import make_taxi
+
+
+def _frames(queue) -> list[bytes]:
+    frames = []
+    while not queue.empty():
+        frames.append(queue.get_nowait())
+    return frames
+
+
+def test_deltas_are_coalesced_per_row():
+    # ARRANGE
+    stream = FleetStream(interval_ms=100, queue_size=4)
+    queue = stream.subscribe()
+
+    # ACT
+    stream.publish(1, {("taxi", 1): {"id": 1, "status": "busy", "x": 1, "y": 1}})
+    stream.publish(2, {("taxi", 1): {"id": 1, "status": "available", "x": 2, "y": 2}})
+    sent = stream.flush()
+
+    # ASSERT
+    assert sent == 1
+    [frame] = _frames(queue)
+    assert frame.startswith(b"event: delta\ndata: ")
+    body = json.loads(frame.split(b"data: ", 1)[1])
+    assert body == {
+        "version": 2,
+        "taxis": [{"id": 1, "status": "available", "x": 2, "y": 2}],
+        "trips": [],
+    }
+
+
+def test_slow_subscriber_is_dropped():
+    # ARRANGE
+    stream = FleetStream(interval_ms=100, queue_size=1)
+    slow = stream.subscribe()
+
+    # ACT
+    for version in (1, 2):
+        stream.publish(version, {("trip", 7): {"id": 7, "status": "requested"}})
+        stream.flush()
+
+    # ASSERT
+    assert len(stream) == 0
+    assert _frames(slow) == [None]
+
+
+async def test_committed_changes_reach_subscribers(db_session):
+    # ARRANGE
+    queue = fleet_stream.subscribe()
+    try:
+        # ACT
+        taxi = await make_taxi(db_session, 3, 4, models.TaxiStatus.AVAILABLE)
+        taxi.status = models.TaxiStatus.BUSY
+        await db_session.commit()
+        fleet_stream.flush()
+    finally:
+        fleet_stream.unsubscribe(queue)
+
+    # ASSERT
+    [frame] = _frames(queue)
+    body = json.loads(frame.split(b"data: ", 1)[1])
+    assert body["taxis"] == [{"id": taxi.id, "status": "busy", "x": 3, "y": 4}]
+
+
+async def test_stream_starts_with_snapshot_then_deltas(client, db_session):
+    # ARRANGE
+    taxi = await make_taxi(db_session, 5, 5, models.TaxiStatus.AVAILABLE)
+
+    # ACT
+    request = asyncio.create_task(client.get("/stream/fleet"))
+    while not len(fleet_stream):
+        await asyncio.sleep(0.01)
+    await client.post("/taxis/deregister", json={"taxi_public_id": str(taxi.public_id)})
+    fleet_stream.flush()
+    fleet_stream.clear()
+    r = await request
+
+    # ASSERT
+    assert r.status_code == 200
+    assert r.headers["content-type"].startswith("text/event-stream")
+    events = [chunk for chunk in r.text.split("\n\n") if chunk]
+    assert events[0].startswith("event: snapshot")
+    snapshot = json.loads(events[0].split("data: ", 1)[1])
+    assert [t["status"] for t in snapshot["taxis"]] == ["available"]
+    assert events[1].startswith("event: delta")
+    delta = json.loads(events[1].split("data: ", 1)[1])
+    assert delta["taxis"] == [{"id": taxi.id, "status": "offline", "x": 5, "y": 5}]
+
+
+async def test_open_streams_do_not_hold_pool_connections(tmp_path):
+    # ARRANGE — a file database gets a real queue pool, unlike the shared in-memory one
+    engine = create_async_engine(f"sqlite+aiosqlite:///{tmp_path / 'stream.db'}")
+    async with engine.begin() as conn:
+        await conn.run_sync(models.Base.metadata.create_all)
+    factory = async_sessionmaker(bind=engine, autoflush=False, expire_on_commit=False)
+
+    async def override_get_db():
+        async with factory() as db:
+            yield db
+
+    app.dependency_overrides[get_db_session] = override_get_db
+    app.dependency_overrides[get_session_factory] = lambda: factory
+    transport = httpx.ASGITransport(app=app)
+
+    try:
+        async with httpx.AsyncClient(transport=transport, base_url="http://test") as c:
+            # ACT
+            requests = [asyncio.create_task(c.get("/stream/fleet")) for _ in range(3)]
+            while len(fleet_stream) < 3:
+                await asyncio.sleep(0.01)
+            await asyncio.sleep(0.05)
+            checked_out = engine.pool.checkedout()
+            fleet_stream.clear()
+            responses = await asyncio.gather(*requests)
+    finally:
+        app.dependency_overrides.clear()
+        await engine.dispose()
+
+    # ASSERT
+    assert checked_out == 0
+    assert all(r.text.startswith("event: snapshot") for r in responses)
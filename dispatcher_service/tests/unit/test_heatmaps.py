@@ -0,0 +1,54 @@
+import random
+
+import numpy as np
+
+from dispatcher_service.app.domain.heatmaps import build_heatmaps
+
+
+def test_heatmaps_match_a_plain_loop():
+    # ARRANGE
+    rng = random.Random(3)
+    size = 20
+    trips = [
+        (
+            rng.randint(1, size),
+            rng.randint(1, size),
+            rng.randint(1, size),
+            rng.randint(1, size),
+            rng.choice([None, rng.randint(0, 15)]),
+        )
+        for _ in range(500)
+    ]
+    taxis = [(rng.randint(1, size), rng.randint(1, size)) for _ in range(200)] + [(size + 1, 1)]
+
+    # ACT
+    layers = build_heatmaps(size, trips, taxis)
+
+    # ASSERT
+    origins = np.zeros((size, size), dtype=int)
+    destinations = np.zeros((size, size), dtype=int)
+    available = np.zeros((size, size), dtype=int)
+    waited: dict[tuple[int, int], list[int]] = {}
+    for sx, sy, ex, ey, waiting in trips:
+        origins[sy - 1, sx - 1] += 1
+        destinations[ey - 1, ex - 1] += 1
+        if waiting is not None:
+            waited.setdefault((sx, sy), []).append(waiting)
+    for x, y in taxis[:-1]:
+        available[y - 1, x - 1] += 1
+
+    assert np.array_equal(layers["origins"], origins)
+    assert np.array_equal(layers["destinations"], destinations)
+    assert np.array_equal(layers["available_taxis"], available)
+    avg = layers["avg_waiting_time_min"]
+    for (x, y), values in waited.items():
+        assert avg[y - 1, x - 1] == sum(values) / len(values)
+    assert np.isnan(avg).sum() == size * size - len(waited)
+
+
+def test_heatmaps_of_nothing_are_empty():
+    layers = build_heatmaps(10, [], [])
+
+    assert all(layer.shape == (10, 10) for layer in layers.values())
+    assert layers["origins"].sum() == 0
+    assert np.isnan(layers["avg_waiting_time_min"]).all()
@@ -0,0 +1,66 @@
+import pytest
+
+from common.histogram import LatencyHistogram
+
+
+def test_small_values_are_recorded_exactly():
+    # ARRANGE
+    histogram = LatencyHistogram()
+
+    # ACT
+    for value in range(1, 101):
+        histogram.record(value)
+
+    # ASSERT
+    assert histogram.summary() == {
+        "count": 100,
+        "min": 1,
+        "mean": 50.5,
+        "p50": 50,
+        "p90": 90,
+        "p99": 99,
+        "p99.9": 100,
+        "max": 100,
+    }
+
+
+@pytest.mark.parametrize("value", [300, 12_345, 987_654, 10**9])
+def test_large_values_are_reported_within_bucket_precision(value):
+    # ARRANGE
+    histogram = LatencyHistogram()
+
+    # ACT
+    histogram.record(value)
+    histogram.record(3 * value)
+
+    # ASSERT
+    assert value <= histogram.percentile(50) <= value * 1.01
+    assert histogram.percentile(100) == 3 * value
+
+
+def test_merge_matches_recording_into_one_histogram():
+    # ARRANGE
+    left, right, combined = LatencyHistogram(), LatencyHistogram(), LatencyHistogram()
+    for value in range(0, 5000, 7):
+        (left if value % 2 else right).record(value)
+        combined.record(value)
+
+    # ACT
+    left.merge(right)
+
+    # ASSERT
+    assert left.summary() == combined.summary()
+
+
+def test_merge_rejects_histograms_of_different_precision():
+    # ACT & ASSERT
+    with pytest.raises(ValueError):
+        LatencyHistogram(sub_bucket_bits=8).merge(LatencyHistogram(sub_bucket_bits=4))
+
+
+def test_empty_histogram_summary_is_zero():
+    # ACT
+    summary = LatencyHistogram().summary(percentiles=(50,))
+
+    # ASSERT
+    assert summary == {"count": 0, "min": 0, "mean": 0.0, "p50": 0, "max": 0}
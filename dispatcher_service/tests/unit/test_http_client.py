@@ -0,0 +1,98 @@
+import asyncio
+
+import httpx
+import pytest
+
+from dispatcher_service.app.adapters import http_client
+from dispatcher_service.app.domain import services
+from dispatcher_service.app.domain.models import Taxi, Trip
+from dispatcher_service.app.settings import settings
+
+
+@pytest.fixture
+async def mock_transport_client():
+    seen: list[httpx.Request] = []
+
+    def handler(request: httpx.Request) -> httpx.Response:
+        seen.append(request)
+        return httpx.Response(202, json={"accepted": True})
+
+    await http_client.close_http_client()
+    client = await http_client.open_http_client(httpx.MockTransport(handler))
+    yield client, seen
+    await http_client.close_http_client()
+
+
+@pytest.mark.asyncio
+async def test_post_json_reuses_shared_client(mock_transport_client):
+    # ARRANGE
+    client, seen = mock_transport_client
+    latency = http_client.CALLBACK_LATENCY.labels(outcome="202")
+    before = latency.count
+
+    # ACT
+    responses = await asyncio.gather(
+        *(http_client.post_json("http://taxi/assign", {"trip_id": i}) for i in range(5))
+    )
+
+    # ASSERT
+    assert [r.status_code for r in responses] == [202] * 5
+    assert len(seen) == 5
+    assert http_client.get_http_client() is client
+    assert latency.count == before + 5
+
+
+@pytest.mark.asyncio
+async def test_close_http_client_allows_reopen(mock_transport_client):
+    # ARRANGE
+    client, _ = mock_transport_client
+
+    # ACT
+    await http_client.close_http_client()
+    reopened = http_client.get_http_client()
+
+    # ASSERT
+    assert client.is_closed
+    assert reopened is not client
+    assert not reopened.is_closed
+
+
+@pytest.mark.asyncio
+async def test_notify_respects_assignment_budget(monkeypatch):
+    # ARRANGE — every attempt hangs; the budget must cut the retries short
+    timeouts: list[float] = []
+
+    async def hanging_post(url, payload, timeout=None):
+        timeouts.append(timeout)
+        await asyncio.sleep(timeout)
+        raise httpx.ReadTimeout("timed out")
+
+    monkeypatch.setattr(services, "post_json", hanging_post)
+    monkeypatch.setattr(settings, "ASSIGN_RETRIES", 5)
+    monkeypatch.setattr(settings, "ASSIGN_TIMEOUT_SEC", 0.1)
+    monkeypatch.setattr(settings, "ASSIGN_BUDGET_SEC", 0.25)
+    monkeypatch.setattr(settings, "ASSIGN_BACKOFF_SEC", 0.01)
+    taxi = Taxi(id=1, x=1, y=1, callback_url="http://taxi/assign")
+    trip = Trip(id=1, user_id=1, start_x=1, start_y=1, end_x=2, end_y=2)
+
+    # ACT
+    started = asyncio.get_running_loop().time()
+    ok = await services._notify_taxi_assignment(taxi, trip)
+    elapsed = asyncio.get_running_loop().time() - started
+
+    # ASSERT
+    assert ok is False
+    assert len(timeouts) < 5
+    assert all(t <= 0.1 for t in timeouts)
+    assert elapsed < 0.4
+
+
+@pytest.mark.asyncio
+async def test_metrics_endpoint_exposes_callback_metrics(client):
+    # ACT
+    resp = await client.get("/metrics")
+
+    # ASSERT
+    assert resp.status_code == 200
+    assert resp.headers["content-type"].startswith("text/plain")
+    assert "dispatcher_taxi_callback_latency_seconds" in resp.text
@@ -0,0 +1,89 @@
+import datetime as dt
+
+from common.schemas import OrderCreate, TaxiDeliveredEvent, TaxiPickupEvent
+from dispatcher_service.app.adapters import crud
+from dispatcher_service.app.domain.matching import eta_after_current_trip
+from dispatcher_service.app.domain.models import TaxiStatus
+from dispatcher_service.app.domain.services import assign_order
+from dispatcher_service.app.settings import settings
+from dispatcher_service.tests.conftest import make_taxi
+
+
+def test_eta_counts_what_is_left_of_the_current_trip():
+    assert eta_after_current_trip(10, elapsed_min=0, min_per_cell=2, end_to_pickup=3) == 13
+    assert eta_after_current_trip(10, elapsed_min=10, min_per_cell=2, end_to_pickup=3) == 8
+    assert eta_after_current_trip(10, elapsed_min=60, min_per_cell=2, end_to_pickup=3) == 3
+
+
+async def test_lookahead_queues_trip_behind_busy_taxi_dropping_off_nearby(
+    monkeypatch, db_session, mock_taxi_calls, outbox_workers
+):
+    # ARRANGE: the busy taxi drops off at (50, 52), next to the customer; the free one is far.
+    monkeypatch.setattr(settings, "MATCHING_POLICY", "lookahead")
+    far = await make_taxi(db_session, 95, 95, TaxiStatus.AVAILABLE, cb="http://far/assign")
+    near = await make_taxi(db_session, 48, 50, TaxiStatus.AVAILABLE, cb="http://near/assign")
+    await crud.load_available_taxi_index(db_session)
+    first = await assign_order(
+        db_session, OrderCreate(user_id=1, start_x=49, start_y=50, end_x=50, end_y=52)
+    )
+    now = dt.datetime.now(dt.UTC)
+    await crud.event_pickup(
+        db_session, TaxiPickupEvent(taxi_public_id=near.public_id, trip_id=first.id, timestamp=now)
+    )
+
+    # ACT
+    queued = await assign_order(
+        db_session, OrderCreate(user_id=2, start_x=50, start_y=50, end_x=60, end_y=60)
+    )
+    await outbox_workers.drain()
+    await crud.event_delivered(
+        db_session,
+        TaxiDeliveredEvent(
+            taxi_public_id=near.public_id, trip_id=first.id, dropoff_time=now, end_x=50, end_y=52
+        ),
+    )
+    await db_session.refresh(near)
+    status_between_trips = near.status
+
+    await crud.event_pickup(
+        db_session, TaxiPickupEvent(taxi_public_id=near.public_id, trip_id=queued.id, timestamp=now)
+    )
+    await crud.event_delivered(
+        db_session,
+        TaxiDeliveredEvent(
+            taxi_public_id=near.public_id, trip_id=queued.id, dropoff_time=now, end_x=60, end_y=60
+        ),
+    )
+    await db_session.refresh(near)
+    await db_session.refresh(far)
+
+    # ASSERT
+    assert queued.taxi_id == near.id
+    assert queued.route_meta["pickup_distance"] == 2
+    assert [call["url"] for call in mock_taxi_calls].count("http://near/assign") == 2
+    assert status_between_trips == TaxiStatus.BUSY
+    assert (near.status, near.x, near.y) == (TaxiStatus.AVAILABLE, 60, 60)
+    assert far.status == TaxiStatus.AVAILABLE
+
+
+async def test_lookahead_assigns_busy_taxi_when_none_is_available(
+    monkeypatch, db_session, mock_taxi_calls
+):
+    # ARRANGE
+    monkeypatch.setattr(settings, "MATCHING_POLICY", "lookahead")
+    taxi = await make_taxi(db_session, 10, 10, TaxiStatus.AVAILABLE)
+    await crud.load_available_taxi_index(db_session)
+    await assign_order(
+        db_session, OrderCreate(user_id=1, start_x=10, start_y=11, end_x=20, end_y=20)
+    )
+    order = OrderCreate(user_id=2, start_x=30, start_y=30, end_x=40, end_y=40)
+
+    # ACT
+    queued = await assign_order(db_session, order)
+    third = await assign_order(db_session, order)
+
+    # ASSERT: one queued trip per busy taxi at most
+    assert queued is not None and queued.taxi_id == taxi.id
+    assert third is None
+    monkeypatch.setattr(settings, "MATCHING_POLICY", "nearest")
+    assert await assign_order(db_session, order) is None
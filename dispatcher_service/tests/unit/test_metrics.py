@@ -0,0 +1,140 @@
+import asyncio
+import datetime as dt
+
+import httpx
+import pytest
+from fastapi import FastAPI
+
+from common import metrics
+from dispatcher_service.app.api.routers import orders
+from dispatcher_service.app.background.heartbeat_monitor import (
+    SWEEPS,
+    TAXIS_MARKED_OFFLINE,
+    expire_taxis,
+)
+from dispatcher_service.app.domain.models import TaxiStatus
+from dispatcher_service.app.domain.timing_wheel import taxi_expiry_wheel
+from dispatcher_service.tests.conftest import make_taxi
+
+
+@pytest.mark.asyncio
+async def test_request_latency_is_labelled_with_the_route_template():
+    # ARRANGE
+    registry = metrics.Registry()
+    app = FastAPI()
+
+    @app.get("/items/{item_id}")
+    def read_item(item_id: int) -> dict:
+        return {"id": item_id}
+
+    app.add_middleware(metrics.RequestMetricsMiddleware, registry=registry)
+    transport = httpx.ASGITransport(app=app)
+
+    # ACT
+    async with httpx.AsyncClient(transport=transport, base_url="http://test") as c:
+        await c.get("/items/1")
+        await c.get("/items/2")
+        await c.get("/nowhere")
+
+    # ASSERT
+    text = metrics.render_latest(registry)
+    assert (
+        'http_request_duration_seconds_count{method="GET",route="/items/{item_id}",status="200"} 2'
+        in text
+    )
+    assert 'route="unmatched",status="404"} 1' in text
+
+
+@pytest.mark.asyncio
+async def test_metrics_endpoint_exposes_the_shared_registry(client):
+    # ACT
+    await client.get("/healthz")
+    resp = await client.get("/metrics")
+
+    # ASSERT
+    assert resp.status_code == 200
+    assert resp.headers["content-type"].startswith("text/plain")
+    assert 'route="/healthz",status="200"' in resp.text
+    assert "dispatcher_assignment_stage_seconds" in resp.text
+
+
+@pytest.mark.asyncio
+async def test_order_rejected_with_409_is_counted(client, monkeypatch):
+    # ARRANGE
+    from dispatcher_service.app.settings import settings
+
+    monkeypatch.setattr(settings, "ORDER_QUEUE_ENABLED", False)
+    before = orders.ORDER_CONFLICTS.value
+    order = {"user_id": 1, "start_x": 1, "start_y": 1, "end_x": 2, "end_y": 2}
+
+    # ACT
+    resp = await client.post("/orders", json=order)
+
+    # ASSERT
+    assert resp.status_code == 409
+    assert orders.ORDER_CONFLICTS.value == before + 1
+
+
+@pytest.mark.asyncio
+async def test_wheel_sweep_counts_taxis_marked_offline(db_session, session_factory):
+    # ARRANGE
+    taxi = await make_taxi(db_session, 5, 5, TaxiStatus.AVAILABLE)
+    taxi.last_seen_at = dt.datetime.now(dt.UTC) - dt.timedelta(minutes=5)
+    await db_session.commit()
+    taxi_expiry_wheel.schedule(taxi.id, 0.0)
+    sweeps = SWEEPS.labels(kind="wheel").value
+    offline = TAXIS_MARKED_OFFLINE.labels(kind="wheel").value
+
+    # ACT
+    marked = await expire_taxis(session_factory=session_factory)
+
+    # ASSERT
+    assert marked == 1
+    assert SWEEPS.labels(kind="wheel").value == sweeps + 1
+    assert TAXIS_MARKED_OFFLINE.labels(kind="wheel").value == offline + 1
+
+
+@pytest.mark.asyncio
+async def test_event_loop_lag_monitor_samples_the_loop():
+    # ARRANGE
+    registry = metrics.Registry()
+    monitor = metrics.EventLoopLagMonitor(interval=0.01, registry=registry)
+
+    # ACT
+    await monitor.start()
+    await asyncio.sleep(0.05)
+    await monitor.stop()
+
+    # ASSERT
+    assert not monitor.running
+    assert registry.get("event_loop_lag_seconds") is not None
+    assert registry.get("event_loop_lag_max_seconds").get() >= 0.0
+
+
+def test_pool_gauges_read_the_pool_at_scrape_time():
+    # ARRANGE
+    class FakePool:
+        checked_out = 3
+
+        def checkedout(self):
+            return self.checked_out
+
+        def checkedin(self):
+            return 2
+
+        def size(self):
+            return 5
+
+    registry = metrics.Registry()
+    pool = FakePool()
+    metrics.track_db_pool(pool, registry=registry)
+
+    # ACT
+    pool.checked_out = 4
+    text = metrics.render_latest(registry)
+
+    # ASSERT
+    assert 'db_pool_connections{state="checked_out"} 4' in text
+    assert 'db_pool_connections{state="idle"} 2' in text
+    assert 'db_pool_connections{state="overflow"} 0' in text
+    assert "db_pool_size 5" in text
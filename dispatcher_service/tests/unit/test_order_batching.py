@@ -0,0 +1,149 @@
+import asyncio
+import itertools
+import random
+
+import pytest
+from pydantic import ValidationError
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from common.schemas import OrderCreate
+from dispatcher_service.app.adapters import crud
+from dispatcher_service.app.domain.matching import min_cost_assignment
+from dispatcher_service.app.domain.models import TaxiStatus, TripStatus
+from dispatcher_service.app.domain.order_batcher import OrderBatcher
+from dispatcher_service.app.domain.services import assign_orders_batch
+from dispatcher_service.app.settings import Settings
+from dispatcher_service.tests.conftest import make_taxi
+
+
+def _brute_force(cost):
+    rows, cols = len(cost), len(cost[0])
+    if rows <= cols:
+        return min(
+            sum(cost[r][c] for r, c in enumerate(perm))
+            for perm in itertools.permutations(range(cols), rows)
+        )
+    return min(
+        sum(cost[r][c] for c, r in enumerate(perm))
+        for perm in itertools.permutations(range(rows), cols)
+    )
+
+
+@pytest.mark.parametrize("rows,cols", [(1, 1), (3, 3), (3, 5), (5, 3), (4, 6)])
+def test_min_cost_assignment_is_optimal(rows, cols):
+    # ARRANGE
+    rng = random.Random(rows * 10 + cols)
+    for _ in range(20):
+        cost = [[rng.randint(0, 50) for _ in range(cols)] for _ in range(rows)]
+
+        # ACT
+        pairs = min_cost_assignment(cost)
+
+        # ASSERT
+        assert len(pairs) == min(rows, cols)
+        assert len({r for r, _ in pairs}) == len({c for _, c in pairs}) == len(pairs)
+        assert sum(cost[r][c] for r, c in pairs) == _brute_force(cost)
+
+
+@pytest.mark.asyncio
+async def test_batch_beats_greedy_order(db_session: AsyncSession, mock_taxi_calls, outbox_workers):
+    # ARRANGE — greedy would give taxi A to the first order and send B far away
+    taxi_a = await make_taxi(db_session, 10, 10, TaxiStatus.AVAILABLE, cb="http://a/assign")
+    taxi_b = await make_taxi(db_session, 1, 10, TaxiStatus.AVAILABLE, cb="http://b/assign")
+    orders = [
+        OrderCreate(user_id=1, start_x=5, start_y=10, end_x=6, end_y=6),
+        OrderCreate(user_id=2, start_x=12, start_y=10, end_x=6, end_y=6),
+    ]
+
+    # ACT
+    trips = await assign_orders_batch(db_session, orders)
+    await outbox_workers.drain()
+
+    # ASSERT
+    assert [trip.taxi_id for trip in trips] == [taxi_b.id, taxi_a.id]
+    assert len(mock_taxi_calls) == 2
+    await db_session.refresh(taxi_a)
+    await db_session.refresh(taxi_b)
+    assert taxi_a.status == taxi_b.status == TaxiStatus.BUSY
+
+
+@pytest.mark.asyncio
+async def test_batch_returns_none_when_supply_runs_out(db_session: AsyncSession, mock_taxi_calls):
+    # ARRANGE
+    await make_taxi(db_session, 10, 10, TaxiStatus.AVAILABLE)
+    orders = [OrderCreate(user_id=i, start_x=10, start_y=10, end_x=1, end_y=1) for i in range(3)]
+
+    # ACT
+    trips = await assign_orders_batch(db_session, orders)
+
+    # ASSERT
+    assert sum(trip is not None for trip in trips) == 1
+    assert len(await crud.get_all_trips(db_session)) == 1
+
+
+@pytest.mark.asyncio
+async def test_batch_compensates_failed_notifications(
+    db_session: AsyncSession, mock_assign_fail, outbox_workers
+):
+    # ARRANGE
+    taxi = await make_taxi(db_session, 10, 10, TaxiStatus.AVAILABLE)
+    orders = [OrderCreate(user_id=1, start_x=10, start_y=10, end_x=1, end_y=1)]
+
+    # ACT
+    [trip] = await assign_orders_batch(db_session, orders)
+    await outbox_workers.drain()
+
+    # ASSERT
+    assert trip is not None
+    await db_session.refresh(taxi)
+    await db_session.refresh(trip)
+    assert taxi.status == TaxiStatus.AVAILABLE
+    assert trip.status == TripStatus.CANCELLED
+
+
+@pytest.mark.asyncio
+async def test_order_batcher_answers_every_caller(
+    session_factory, db_session, mock_taxi_calls, outbox_workers
+):
+    # ARRANGE
+    for x in (10, 20, 30):
+        await make_taxi(db_session, x, x, TaxiStatus.AVAILABLE)
+    batcher = OrderBatcher(session_factory, window_ms=50, max_size=10)
+    orders = [
+        OrderCreate(user_id=i, start_x=x, start_y=x, end_x=1, end_y=1)
+        for i, x in enumerate((11, 21, 31))
+    ]
+
+    # ACT
+    try:
+        trips = await asyncio.gather(*(batcher.submit(order) for order in orders))
+    finally:
+        await batcher.stop()
+    await outbox_workers.drain()
+
+    # ASSERT
+    assert [trip.user_id for trip in trips] == [0, 1, 2]
+    assert len({trip.taxi_id for trip in trips}) == 3
+    assert len(mock_taxi_calls) == 3
+
+
+@pytest.mark.asyncio
+async def test_order_batcher_stop_fails_a_partially_collected_batch(session_factory):
+    # ARRANGE
+    batcher = OrderBatcher(session_factory, window_ms=60_000, max_size=10)
+    orders = [OrderCreate(user_id=i, start_x=5, start_y=5, end_x=1, end_y=1) for i in range(2)]
+    submits = [asyncio.create_task(batcher.submit(order)) for order in orders]
+    await asyncio.sleep(0.05)
+
+    # ACT
+    await batcher.stop()
+    results = await asyncio.wait_for(asyncio.gather(*submits, return_exceptions=True), 1)
+
+    # ASSERT
+    assert all(isinstance(result, RuntimeError) for result in results)
+
+
+def test_settings_reject_batching_with_lookahead_matching():
+    # ACT & ASSERT
+    with pytest.raises(ValidationError, match="MATCHING_POLICY"):
+        Settings(ORDER_BATCHING_ENABLED=True, MATCHING_POLICY="lookahead")
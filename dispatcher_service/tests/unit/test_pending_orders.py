@@ -0,0 +1,143 @@
+import asyncio
+import datetime as dt
+import json
+
+import pytest
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from common.schemas import OrderCreate
+from dispatcher_service.app.adapters import crud
+from dispatcher_service.app.background.fleet_stream import fleet_stream
+from dispatcher_service.app.domain.fleet_counters import fleet_counters
+from dispatcher_service.app.domain.models import (
+    AssignmentOutbox,
+    Taxi,
+    TaxiStatus,
+    Trip,
+    TripStatus,
+)
+from dispatcher_service.app.domain.services import queue_order
+from dispatcher_service.tests.conftest import make_taxi
+
+
+def _order(x: int, y: int, max_wait_sec: int | None = None) -> OrderCreate:
+    return OrderCreate(user_id=1, start_x=x, start_y=y, end_x=1, end_y=1, max_wait_sec=max_wait_sec)
+
+
+@pytest.mark.asyncio
+async def test_oldest_pending_orders_are_matched_first(db_session: AsyncSession, order_matcher):
+    # ARRANGE
+    first = await queue_order(db_session, _order(50, 50))
+    second = await queue_order(db_session, _order(10, 10))
+    taxi = await make_taxi(db_session, 10, 10, TaxiStatus.AVAILABLE)
+
+    # ACT
+    matched = await order_matcher.drain()
+
+    # ASSERT
+    assert matched == 1
+    trips = {t.id: t for t in (await db_session.execute(select(Trip))).scalars()}
+    for trip in trips.values():
+        await db_session.refresh(trip)
+    assert trips[first.id].taxi_id == taxi.id
+    assert trips[first.id].route_meta == {"pickup_distance": 80}
+    assert trips[second.id].taxi_id is None
+    await db_session.refresh(taxi)
+    assert taxi.status == TaxiStatus.BUSY
+    entry = await db_session.scalar(select(AssignmentOutbox))
+    assert entry is not None and entry.trip_id == first.id
+
+
+@pytest.mark.asyncio
+async def test_one_taxi_is_not_given_to_two_pending_orders(db_session: AsyncSession, order_matcher):
+    # ARRANGE
+    for _ in range(3):
+        await queue_order(db_session, _order(10, 10))
+    await make_taxi(db_session, 10, 10, TaxiStatus.AVAILABLE)
+    await make_taxi(db_session, 20, 20, TaxiStatus.AVAILABLE)
+
+    # ACT
+    matched = await order_matcher.drain()
+
+    # ASSERT
+    assert matched == 2
+    taxi_ids = (await db_session.execute(select(Trip.taxi_id).order_by(Trip.id))).scalars().all()
+    assert len({t for t in taxi_ids if t is not None}) == 2
+    assert taxi_ids[2] is None
+    statuses = (await db_session.execute(select(Taxi.status))).scalars().all()
+    assert statuses == [TaxiStatus.BUSY, TaxiStatus.BUSY]
+
+
+@pytest.mark.asyncio
+async def test_expired_pending_orders_are_cancelled(db_session: AsyncSession, order_matcher):
+    # ARRANGE
+    await crud.ensure_fleet_counters(db_session)
+    expired = await queue_order(db_session, _order(10, 10, max_wait_sec=0))
+    waiting = await queue_order(db_session, _order(10, 10, max_wait_sec=60))
+    waiter = asyncio.create_task(order_matcher.wait(expired.id, timeout=2))
+    await asyncio.sleep(0)
+
+    # ACT
+    matched = await order_matcher.drain()
+
+    # ASSERT
+    assert matched == 0
+    assert await waiter is True
+    statuses = dict((await db_session.execute(select(Trip.id, Trip.status))).all())
+    assert statuses == {expired.id: TripStatus.CANCELLED, waiting.id: TripStatus.REQUESTED}
+    assert fleet_counters.trips[TripStatus.CANCELLED] == 1
+    assert fleet_counters.trips[TripStatus.REQUESTED] == 1
+
+
+@pytest.mark.asyncio
+async def test_expired_pending_orders_reach_stream_subscribers(
+    db_session: AsyncSession, order_matcher
+):
+    # ARRANGE
+    expired = await queue_order(db_session, _order(10, 10, max_wait_sec=0))
+    queue = fleet_stream.subscribe()
+
+    # ACT
+    try:
+        await order_matcher.drain()
+        fleet_stream.flush()
+    finally:
+        fleet_stream.unsubscribe(queue)
+
+    # ASSERT
+    frame = queue.get_nowait()
+    delta = json.loads(frame.split(b"data: ", 1)[1])
+    assert delta["trips"] == [
+        {
+            "id": expired.id,
+            "status": "cancelled",
+            "start_x": 10,
+            "start_y": 10,
+            "end_x": 1,
+            "end_y": 1,
+        }
+    ]
+
+
+@pytest.mark.asyncio
+async def test_revived_taxi_wakes_the_matcher(db_session: AsyncSession):
+    # ARRANGE
+    taxi = await make_taxi(db_session, 10, 10, TaxiStatus.OFFLINE)
+    woken: list[bool] = []
+    now = dt.datetime.now(dt.UTC)
+
+    # ACT
+    await crud.bulk_update_heartbeats(
+        db_session, [(taxi.id, now, None, None)], on_revived=lambda: woken.append(True)
+    )
+    before_commit = list(woken)
+    await db_session.commit()
+    await crud.bulk_update_heartbeats(
+        db_session, [(taxi.id, now, None, None)], on_revived=lambda: woken.append(True)
+    )
+    await db_session.commit()
+
+    # ASSERT
+    assert before_commit == []
+    assert woken == [True]
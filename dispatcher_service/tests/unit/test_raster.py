@@ -0,0 +1,45 @@
+import struct
+
+from dispatcher_service.app.domain.models import TaxiStatus, TripStatus
+from dispatcher_service.app.domain.raster import (
+    HEADER,
+    TAXI_BITS,
+    TRIP_END_BIT,
+    TRIP_START_BIT,
+    pack_fleet_raster,
+)
+
+
+def _cell(size, x, y):
+    return (y - 1) * size + (x - 1)
+
+
+def test_pack_fleet_raster_layout():
+    # ARRANGE
+    size = 4
+    taxi_cells = [
+        (1, 1, TaxiStatus.AVAILABLE, 2),
+        (1, 1, TaxiStatus.BUSY, 1),
+        (4, 4, TaxiStatus.OFFLINE, 70000),
+    ]
+    trip_totals = {TripStatus.REQUESTED: 3, TripStatus.IN_PROGRESS: 2, TripStatus.COMPLETED: 40}
+    trips = [(2, 1, 1, 1), (3, 3, 2, 1)]
+
+    # ACT
+    raw = pack_fleet_raster(size, 7, taxi_cells, trip_totals, trips)
+
+    # ASSERT
+    assert len(raw) == HEADER.size + size * size * 3
+    magic, width, height, version, *totals = HEADER.unpack_from(raw)
+    assert (magic, width, height, version) == (b"TXR1", 4, 4, 7)
+    assert totals == [2, 1, 70000, 5, 40, 0]
+    mask = raw[HEADER.size : HEADER.size + size * size]
+    counts = struct.unpack_from(f"<{size * size}H", raw, HEADER.size + size * size)
+    assert mask[_cell(size, 1, 1)] == (
+        TAXI_BITS[TaxiStatus.AVAILABLE] | TAXI_BITS[TaxiStatus.BUSY] | TRIP_END_BIT
+    )
+    assert mask[_cell(size, 2, 1)] == TRIP_START_BIT | TRIP_END_BIT
+    assert mask[_cell(size, 3, 3)] == TRIP_START_BIT
+    assert counts[_cell(size, 1, 1)] == 3
+    assert counts[_cell(size, 4, 4)] == 0xFFFF
+    assert counts[_cell(size, 2, 2)] == 0
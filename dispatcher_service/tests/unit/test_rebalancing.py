@@ -0,0 +1,65 @@
+import datetime as dt
+
+import numpy as np
+
+from dispatcher_service.app.background import rebalancer
+from dispatcher_service.app.domain import models
+from dispatcher_service.app.domain.models import TaxiStatus, TripStatus
+from dispatcher_service.app.domain.rebalancing import Reposition, plan_rebalance, region_demand
+from dispatcher_service.tests.conftest import make_taxi
+
+
+def test_plan_moves_surplus_taxis_to_the_closest_deficit():
+    # ARRANGE: all demand in the region around (15, 15), all taxis near (95, 95)
+    demand = region_demand([(15, 15)] * 8 + [(95, 95)] * 2, 100, 10)
+    idle = [(1, 95, 95), (2, 96, 96), (3, 91, 99), (4, 92, 92), (5, 12, 50)]
+
+    # ACT
+    moves = plan_rebalance(idle, demand, 100, 10, max_moves=10)
+
+    # ASSERT: 5 taxis for 10 orders -> 4 belong to (15, 15)'s region, 1 stays at (95, 95)
+    assert sorted(move.taxi_id for move in moves) == [1, 2, 3, 5]
+    assert {(move.x, move.y) for move in moves} == {(15, 15)}
+    assert plan_rebalance(idle, demand, 100, 10, max_moves=1) == [Reposition(5, 15, 15)]
+    assert plan_rebalance(idle, np.zeros_like(demand), 100, 10, max_moves=10) == []
+
+
+async def test_rebalance_sends_reposition_commands(monkeypatch, session_factory, db_session):
+    # ARRANGE
+    rebalancer.clear_cooldowns()
+    taxi = await make_taxi(db_session, 90, 90, TaxiStatus.AVAILABLE, cb="http://taxi/assign")
+    await make_taxi(db_session, 15, 15, TaxiStatus.BUSY)
+    now = dt.datetime.now(dt.UTC)
+    db_session.add_all(
+        models.Trip(
+            user_id=i,
+            start_x=5,
+            start_y=5,
+            end_x=50,
+            end_y=50,
+            status=TripStatus.COMPLETED,
+            request_time=now - dt.timedelta(minutes=1),
+        )
+        for i in range(3)
+    )
+    await db_session.commit()
+    calls: list[tuple[str, dict]] = []
+
+    class Accepted:
+        status_code = 202
+
+    async def fake_post(url, payload, **kwargs):
+        calls.append((url, payload))
+        return Accepted()
+
+    monkeypatch.setattr(rebalancer, "post_json", fake_post)
+
+    # ACT
+    moves = await rebalancer.rebalance_idle_taxis(session_factory)
+    again = await rebalancer.rebalance_idle_taxis(session_factory)
+
+    # ASSERT
+    assert moves == [Reposition(taxi.id, 5, 5)]
+    assert calls == [("http://taxi/reposition", {"x": 5, "y": 5})]
+    assert again == []
+    rebalancer.clear_cooldowns()
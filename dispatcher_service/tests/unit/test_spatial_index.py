@@ -0,0 +1,130 @@
+import random
+
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from common.schemas import TaxiCreate, TaxiDeliveredEvent
+from dispatcher_service.app.adapters import crud
+from dispatcher_service.app.domain.models import TaxiStatus, Trip, TripStatus
+from dispatcher_service.app.domain.spatial_index import TaxiSpatialIndex, available_taxi_index
+from dispatcher_service.tests.conftest import make_taxi
+
+
+def test_nearest_matches_brute_force():
+    # ARRANGE
+    rng = random.Random(7)
+    index = TaxiSpatialIndex(grid_size=100, cell_size=5)
+    taxis = {i: (rng.randint(1, 100), rng.randint(1, 100)) for i in range(1, 300)}
+    for taxi_id, (x, y) in taxis.items():
+        index.add(taxi_id, x, y)
+
+    for _ in range(200):
+        qx, qy = rng.randint(1, 100), rng.randint(1, 100)
+
+        # ACT
+        found = list(index.iter_nearest(qx, qy))
+
+        # ASSERT
+        expected = sorted((abs(x - qx) + abs(y - qy), i) for i, (x, y) in taxis.items())
+        assert found == expected
+
+
+def test_add_moves_and_discard_removes():
+    # ARRANGE
+    index = TaxiSpatialIndex(grid_size=100, cell_size=10)
+    index.add(1, 1, 1)
+    index.add(2, 90, 90)
+
+    # ACT
+    index.add(1, 95, 95)
+    index.discard(2)
+
+    # ASSERT
+    assert len(index) == 1
+    assert index.position(1) == (95, 95)
+    assert index.nearest(1, 1) == (188, 1)
+
+
+def test_nearest_on_empty_index():
+    # ACT & ASSERT
+    assert TaxiSpatialIndex().nearest(10, 10) is None
+
+
+async def test_index_follows_crud_transitions(db_session: AsyncSession):
+    # ARRANGE
+    taxi = await crud.create_taxi(db_session, TaxiCreate(x=3, y=4, callback_url="http://cb"))
+    available_taxi_index.loaded = True
+    assert taxi.id in available_taxi_index
+
+    # ACT & ASSERT
+    crud.mark_taxi_busy(db_session, taxi)
+    assert taxi.id in available_taxi_index, "index must not change before commit"
+    await db_session.commit()
+    assert taxi.id not in available_taxi_index
+
+    taxi_id = taxi.id
+    crud.mark_taxi_available(db_session, taxi)
+    await db_session.rollback()
+    assert taxi_id not in available_taxi_index, "rolled back transition must be dropped"
+    await db_session.refresh(taxi)
+
+    crud.mark_taxi_available(db_session, taxi)
+    await db_session.commit()
+    assert available_taxi_index.position(taxi.id) == (3, 4)
+
+    crud.mark_taxi_offline(db_session, taxi)
+    await db_session.commit()
+    assert taxi.id not in available_taxi_index
+
+
+async def test_index_follows_delivery_and_sweep(db_session: AsyncSession):
+    # ARRANGE
+    taxi = await make_taxi(db_session, 10, 10, TaxiStatus.BUSY)
+    trip = Trip(
+        user_id=1,
+        taxi=taxi,
+        status=TripStatus.IN_PROGRESS,
+        start_x=10,
+        start_y=10,
+        end_x=40,
+        end_y=50,
+    )
+    db_session.add(trip)
+    await db_session.commit()
+    available_taxi_index.loaded = True
+
+    # ACT
+    await crud.event_delivered(
+        db_session,
+        TaxiDeliveredEvent(
+            trip_id=trip.id,
+            taxi_public_id=taxi.public_id,
+            dropoff_time=trip.request_time,
+            end_x=40,
+            end_y=50,
+        ),
+    )
+
+    # ASSERT
+    assert available_taxi_index.position(taxi.id) == (40, 50)
+
+    # ACT
+    swept = await crud.sweep_offline_taxis(db_session, ttl_sec=30)
+
+    # ASSERT
+    assert swept == 1
+    assert taxi.id not in available_taxi_index
+
+
+async def test_pick_skips_stale_index_entries(db_session: AsyncSession):
+    # ARRANGE
+    stale = await make_taxi(db_session, 10, 10, TaxiStatus.BUSY)
+    ok = await make_taxi(db_session, 30, 30, TaxiStatus.AVAILABLE)
+    await crud.load_available_taxi_index(db_session)
+    available_taxi_index.add(stale.id, stale.x, stale.y)
+
+    # ACT
+    picked = await crud.pick_closest_available_taxi_for_update(db_session, 10, 10)
+
+    # ASSERT
+    assert picked is not None
+    assert picked.id == ok.id
@@ -0,0 +1,114 @@
+import datetime as dt
+import random
+
+import pytest
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from dispatcher_service.app.adapters import crud
+from dispatcher_service.app.background.heartbeat_monitor import (
+    expire_taxis,
+    reconcile_offline_taxis,
+)
+from dispatcher_service.app.domain.models import TaxiStatus
+from dispatcher_service.app.domain.spatial_index import available_taxi_index
+from dispatcher_service.app.domain.timing_wheel import HierarchicalTimingWheel, taxi_expiry_wheel
+from dispatcher_service.tests.conftest import make_taxi
+
+
+def test_wheel_expires_keys_no_earlier_than_deadline():
+    # ARRANGE — small wheel so keys cascade through every level and the overflow
+    rng = random.Random(3)
+    wheel = HierarchicalTimingWheel(tick_sec=1.0, slots=4, levels=2, clock=lambda: 0.0)
+    deadlines = {key: rng.uniform(0, 60) for key in range(300)}
+    for key, deadline in deadlines.items():
+        wheel.schedule(key, deadline)
+    for key in range(0, 300, 7):
+        deadlines[key] = rng.uniform(0, 60)
+        wheel.schedule(key, deadlines[key])
+    for key in range(0, 300, 11):
+        wheel.cancel(key)
+        del deadlines[key]
+
+    # ACT
+    fired: dict[int, float] = {}
+    now = 0.0
+    while now < 70:
+        now += rng.uniform(0.1, 3.0)
+        for key in wheel.advance(now):
+            fired[key] = now
+
+    # ASSERT
+    assert fired.keys() == deadlines.keys()
+    for key, at in fired.items():
+        assert deadlines[key] <= at < deadlines[key] + 4
+    assert len(wheel) == 0
+
+
+def test_past_deadline_fires_on_next_advance():
+    # ARRANGE
+    wheel = HierarchicalTimingWheel(tick_sec=0.5, clock=lambda: 100.0)
+    wheel.schedule("late", 90.0)
+    wheel.schedule("soon", 100.4)
+
+    # ACT & ASSERT
+    assert wheel.advance(100.0) == ["late"]
+    assert wheel.advance(100.5) == ["soon"]
+
+
+@pytest.mark.asyncio
+async def test_expired_taxis_go_offline_and_leave_index(session_factory, db_session: AsyncSession):
+    # ARRANGE
+    stale_seen = dt.datetime.now(dt.UTC) - dt.timedelta(minutes=5)
+    stale = await make_taxi(db_session, 10, 10, TaxiStatus.AVAILABLE)
+    fresh = await make_taxi(db_session, 20, 20, TaxiStatus.AVAILABLE)
+    stale.last_seen_at = stale_seen
+    fresh.last_seen_at = dt.datetime.now(dt.UTC)
+    await db_session.commit()
+    await crud.load_available_taxi_index(db_session)
+    await crud.load_taxi_expiry_wheel(db_session, ttl_sec=30)
+
+    # ACT
+    marked = await expire_taxis(session_factory=session_factory)
+
+    # ASSERT
+    assert marked == 1
+    assert stale.id not in available_taxi_index
+    assert fresh.id in available_taxi_index
+    assert stale.id not in taxi_expiry_wheel and fresh.id in taxi_expiry_wheel
+    await db_session.refresh(stale)
+    assert stale.status == TaxiStatus.OFFLINE
+
+
+@pytest.mark.asyncio
+async def test_taxi_with_newer_heartbeat_in_db_is_kept(session_factory, db_session: AsyncSession):
+    # ARRANGE — the wheel holds an old deadline but the DB already saw a fresh heartbeat
+    taxi = await make_taxi(db_session, 10, 10, TaxiStatus.AVAILABLE)
+    taxi.last_seen_at = dt.datetime.now(dt.UTC)
+    await db_session.commit()
+    available_taxi_index.add(taxi.id, 10, 10)
+    taxi_expiry_wheel.schedule(taxi.id, 0.0)
+
+    # ACT
+    marked = await expire_taxis(session_factory=session_factory)
+
+    # ASSERT
+    assert marked == 0
+    assert taxi.id in available_taxi_index
+    assert taxi_expiry_wheel.deadline(taxi.id) > taxi.last_seen_at.timestamp()
+
+
+@pytest.mark.asyncio
+async def test_reconcile_sweeps_then_tracks_online_taxis(session_factory, db_session):
+    # ARRANGE
+    gone = await make_taxi(db_session, 10, 10, TaxiStatus.BUSY)
+    alive = await make_taxi(db_session, 20, 20, TaxiStatus.AVAILABLE)
+    alive.last_seen_at = dt.datetime.now(dt.UTC)
+    await db_session.commit()
+
+    # ACT
+    swept = await reconcile_offline_taxis(session_factory=session_factory)
+
+    # ASSERT
+    assert swept == 1
+    assert gone.id not in taxi_expiry_wheel
+    assert alive.id in taxi_expiry_wheel
@@ -0,0 +1,99 @@
+import datetime as dt
+import random
+
+from common.schemas import OrderCreate, TaxiDeliveredEvent, TaxiPickupEvent
+from dispatcher_service.app.adapters import crud
+from dispatcher_service.app.domain.models import TaxiStatus
+from dispatcher_service.app.domain.services import assign_order
+from dispatcher_service.app.domain.sketch import QuantileSketch
+from dispatcher_service.app.domain.trip_rollups import TripRollups, trip_rollups
+from dispatcher_service.tests.conftest import make_taxi
+
+T0 = dt.datetime(2025, 1, 1, 12, 0, tzinfo=dt.UTC)
+
+
+def test_sketch_quantiles_within_relative_error_and_mergeable():
+    # ARRANGE
+    rng = random.Random(7)
+    values = [rng.expovariate(1 / 30) for _ in range(10_000)]
+    left, right, whole = QuantileSketch(), QuantileSketch(), QuantileSketch()
+    for i, value in enumerate(values):
+        (left if i % 2 else right).add(value)
+        whole.add(value)
+
+    # ACT
+    left.merge(right)
+
+    # ASSERT
+    ordered = sorted(values)
+    for q in (0.5, 0.95, 0.99):
+        exact = ordered[int(q * (len(ordered) - 1))]
+        assert abs(left.quantile(q) - exact) <= 0.01 * exact
+        assert left.quantile(q) == whole.quantile(q)
+    assert left.count == len(values)
+    assert QuantileSketch().quantile(0.5) is None
+
+
+def test_rollups_group_by_minute_and_cell_and_prune():
+    # ARRANGE
+    rollups = TripRollups(cell_size=10, retention_min=60)
+    rollups.load([])
+    rollups.record(T0, 5, 5, {"waiting_time_min": 2, "travel_time_min": 10, "total_distance": 8})
+    rollups.record(T0 + dt.timedelta(seconds=30), 15, 5, {"waiting_time_min": 4})
+    rollups.record(
+        T0 + dt.timedelta(minutes=1), 5, 5, {"waiting_time_min": 6, "travel_time_min": None}
+    )
+
+    # ACT
+    total = rollups.query(T0, T0 + dt.timedelta(minutes=5))
+    per_minute = rollups.query(T0, T0 + dt.timedelta(minutes=5), group_by="minute")
+    per_cell = rollups.query(T0, T0 + dt.timedelta(minutes=5), cell=(0, 0), group_by="cell")
+    rollups.record(T0 + dt.timedelta(minutes=90), 5, 5, {"waiting_time_min": 1})
+
+    # ASSERT
+    assert total[()]["waiting_time_min"].count == 3
+    assert total[()]["waiting_time_min"].total == 12
+    assert total[()]["travel_time_min"].count == 1
+    assert [group for group in per_minute] == [(T0,), (T0 + dt.timedelta(minutes=1),)]
+    assert list(per_cell) == [(0, 0)]
+    assert per_cell[(0, 0)]["waiting_time_min"].count == 2
+    assert rollups.query(T0, T0 + dt.timedelta(minutes=5)) == {}
+
+
+async def test_delivered_fills_trip_metrics_and_rollups(
+    db_session, mock_taxi_calls, outbox_workers
+):
+    # ARRANGE
+    await crud.ensure_trip_rollups(db_session)
+    taxi = await make_taxi(db_session, 1, 1, TaxiStatus.AVAILABLE)
+    await crud.load_available_taxi_index(db_session)
+    trip = await assign_order(
+        db_session, OrderCreate(user_id=1, start_x=4, start_y=5, end_x=10, end_y=10)
+    )
+    await outbox_workers.drain()
+    picked_up = dt.datetime.now(dt.UTC)
+
+    # ACT
+    await crud.event_pickup(
+        db_session,
+        TaxiPickupEvent(taxi_public_id=taxi.public_id, trip_id=trip.id, timestamp=picked_up),
+    )
+    await crud.event_delivered(
+        db_session,
+        TaxiDeliveredEvent(
+            taxi_public_id=taxi.public_id,
+            trip_id=trip.id,
+            dropoff_time=picked_up + dt.timedelta(minutes=12),
+            end_x=10,
+            end_y=10,
+        ),
+    )
+    await db_session.refresh(trip)
+
+    # ASSERT
+    assert trip.travel_time_min == 12
+    assert trip.route_meta == {"pickup_distance": 7, "trip_distance": 11}
+    assert trip.total_distance == 18
+    [metrics] = trip_rollups.query(picked_up, picked_up + dt.timedelta(hours=1)).values()
+    assert metrics["travel_time_min"].total == 12
+    assert metrics["total_distance"].total == 18
@@ -1,6 +1,7 @@
-from fastapi import FastAPI
+from fastapi import FastAPI, Response
 from fastapi.staticfiles import StaticFiles
 
+from common import metrics
 from common.logger import configure_root_logging, get_logger
 
 configure_root_logging(service_name="grid")
@@ -8,5 +9,20 @@ log = get_logger(__name__)
 log.info("Grid app booting")
 
 
-app = FastAPI(title="Taxi Grid")
+async def lifespan(app: FastAPI):
+    await metrics.event_loop_lag_monitor.start()
+    yield
+    await metrics.event_loop_lag_monitor.stop()
+
+
+app = FastAPI(title="Taxi Grid", lifespan=lifespan)
+app.add_middleware(metrics.RequestMetricsMiddleware)
+
+
+# Registered before the static mount, which would otherwise serve every path.
+@app.get("/metrics", include_in_schema=False)
+def metrics_endpoint() -> Response:
+    return Response(metrics.render_latest(), media_type=metrics.CONTENT_TYPE_LATEST)
+
+
 app.mount("/", StaticFiles(directory="./grid_service/app/static", html=True), name="static")
@@ -0,0 +1,130 @@
+// Decoder for the dispatcher's packed fleet raster (GET /fleet/raster) and a
+// canvas renderer that only repaints cells whose colour changed.
+
+export const TRIP_START = 1 << 0;
+export const TRIP_END = 1 << 1;
+export const TAXI_BITS = { available: 1 << 2, busy: 1 << 3, offline: 1 << 4 };
+
+// Paint order: a later layer wins over an earlier one in the same cell.
+export const LAYERS = [
+  { id: 'show-trip-start', bit: TRIP_START, color: '#2ca02c' },
+  { id: 'show-trip-end', bit: TRIP_END, color: '#d62728' },
+  { id: 'show-taxi-available', bit: TAXI_BITS.available, color: '#1f77b4' },
+  { id: 'show-taxi-busy', bit: TAXI_BITS.busy, color: '#ff7f0e' },
+  { id: 'show-taxi-offline', bit: TAXI_BITS.offline, color: '#7f7f7f' },
+];
+
+const HEADER_BYTES = 36;
+const EMPTY = LAYERS.length;
+
+export function decodeRaster(buffer) {
+  const view = new DataView(buffer);
+  const magic = String.fromCharCode(...new Uint8Array(buffer, 0, 4));
+  if (magic !== 'TXR1') throw new Error(`Unknown raster format ${magic}`);
+  const width = view.getUint16(4, true);
+  const height = view.getUint16(6, true);
+  const u32 = (i) => view.getUint32(12 + 4 * i, true);
+  const cells = width * height;
+  const countsOffset = HEADER_BYTES + cells;
+  return {
+    width,
+    height,
+    version: view.getUint32(8, true),
+    taxis: { available: u32(0), busy: u32(1), offline: u32(2) },
+    trips: { active: u32(3), completed: u32(4), cancelled: u32(5) },
+    mask: new Uint8Array(buffer, HEADER_BYTES, cells),
+    // Uint16Array views need an even offset.
+    counts: countsOffset % 2 === 0
+      ? new Uint16Array(buffer, countsOffset, cells)
+      : new Uint16Array(buffer.slice(countsOffset, countsOffset + 2 * cells)),
+  };
+}
+
+export class GridRenderer {
+  constructor(ctx, size, cellPx) {
+    this.ctx = ctx;
+    this.size = size;
+    this.cellPx = cellPx;
+    this.visibleBits = LAYERS.reduce((bits, layer) => bits | layer.bit, 0);
+    // Layer index painted in each cell (EMPTY for none), -1 until first painted.
+    this.painted = new Int8Array(size * size).fill(-1);
+  }
+
+  setVisibleBits(bits) {
+    this.visibleBits = bits;
+  }
+
+  // Forget what is on screen, e.g. after something else painted the canvas.
+  invalidate() {
+    this.painted.fill(-1);
+  }
+
+  colorIndex(mask) {
+    const visible = mask & this.visibleBits;
+    for (let layer = LAYERS.length - 1; layer >= 0; layer--) {
+      if (visible & LAYERS[layer].bit) return layer;
+    }
+    return EMPTY;
+  }
+
+  // Repaint the cell if its colour differs from the painted one; returns whether it did.
+  paint(cell, mask) {
+    const index = this.colorIndex(mask);
+    if (this.painted[cell] === index) return false;
+    this.painted[cell] = index;
+    const { ctx, cellPx } = this;
+    const px = (cell % this.size) * cellPx;
+    const py = Math.floor(cell / this.size) * cellPx;
+    if (index !== EMPTY) {
+      ctx.fillStyle = LAYERS[index].color;
+      ctx.fillRect(px, py, cellPx, cellPx);
+      return true;
+    }
+    ctx.clearRect(px, py, cellPx, cellPx);
+    ctx.fillStyle = '#f0f0f0';
+    ctx.fillRect(px, py, cellPx, 1);
+    ctx.fillRect(px, py, 1, cellPx);
+    return true;
+  }
+
+  // Diff a whole frame of cell masks against what is on screen.
+  render(masks) {
+    let repainted = 0;
+    for (let cell = 0; cell < masks.length; cell++) {
+      if (this.paint(cell, masks[cell])) repainted++;
+    }
+    return repainted;
+  }
+
+  renderCells(cells, masks) {
+    let repainted = 0;
+    for (const cell of cells) {
+      if (this.paint(cell, masks[cell])) repainted++;
+    }
+    return repainted;
+  }
+}
+
+// Heatmap layers served precomputed by GET /analytics/heatmaps (row-major, null = no data).
+export const HEATMAP_LAYERS = {
+  origins: [44, 160, 44],
+  destinations: [214, 39, 40],
+  available_taxis: [31, 119, 180],
+  avg_waiting_time_min: [255, 127, 14],
+};
+
+// Paint a heatmap layer with opacity proportional to each cell's share of the maximum.
+export function paintHeatmap(ctx, values, size, cellPx, layer) {
+  const [r, g, b] = HEATMAP_LAYERS[layer];
+  let max = 0;
+  for (const v of values) if (v !== null && v > max) max = v;
+  ctx.clearRect(0, 0, size * cellPx, size * cellPx);
+  if (max === 0) return max;
+  for (let cell = 0; cell < values.length; cell++) {
+    const v = values[cell];
+    if (!v) continue;
+    ctx.fillStyle = `rgba(${r}, ${g}, ${b}, ${(0.15 + 0.85 * v / max).toFixed(3)})`;
+    ctx.fillRect((cell % size) * cellPx, Math.floor(cell / size) * cellPx, cellPx, cellPx);
+  }
+  return max;
+}
@@ -0,0 +1,62 @@
+// Decode + dirty-cell render time of packed fleet rasters, against a stub canvas.
+//
+//   node grid_service/benchmarks/bench_raster_render.mjs before.bin after.bin [...]
+//
+// Files come in pairs (previous frame, next frame); prints one JSON object per pair.
+// Usually driven by dispatcher_service/benchmarks/bench_fleet_raster.py.
+
+import { readFileSync } from 'node:fs';
+import { performance } from 'node:perf_hooks';
+
+import { GridRenderer, decodeRaster } from '../app/static/raster.mjs';
+
+class StubContext {
+  constructor() {
+    this.ops = 0;
+    this.fillStyle = '';
+  }
+  fillRect() { this.ops++; }
+  clearRect() { this.ops++; }
+}
+
+function load(path) {
+  const bytes = readFileSync(path);
+  return bytes.buffer.slice(bytes.byteOffset, bytes.byteOffset + bytes.byteLength);
+}
+
+function timed(fn, repeat) {
+  const started = performance.now();
+  let result;
+  for (let i = 0; i < repeat; i++) result = fn(i);
+  return [(performance.now() - started) / repeat, result];
+}
+
+const REPEAT = 200;
+const paths = process.argv.slice(2);
+for (let i = 0; i + 1 < paths.length; i += 2) {
+  const [before, after] = [load(paths[i]), load(paths[i + 1])];
+  const [decodeMs, first] = timed(() => decodeRaster(before), REPEAT);
+  const next = decodeRaster(after);
+  const size = first.width;
+
+  const [fullMs] = timed(() => {
+    const renderer = new GridRenderer(new StubContext(), size, 10);
+    return renderer.render(first.mask);
+  }, REPEAT);
+
+  // Alternate between the two frames so every pass repaints the changed cells.
+  const renderer = new GridRenderer(new StubContext(), size, 10);
+  renderer.render(first.mask);
+  const [diffMs, repainted] = timed(
+    (n) => renderer.render(n % 2 === 0 ? next.mask : first.mask),
+    REPEAT,
+  );
+
+  console.log(JSON.stringify({
+    file: paths[i],
+    decode_ms: +decodeMs.toFixed(4),
+    full_render_ms: +fullMs.toFixed(4),
+    diff_render_ms: +diffMs.toFixed(4),
+    cells_repainted: repainted,
+  }));
+}
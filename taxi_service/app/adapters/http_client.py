@@ -1,22 +1,63 @@
 import asyncio
 
 import httpx
+from common import metrics
 from common.logger import get_logger
+from taxi_service.app.settings import settings
 logger = get_logger(__name__)
 
-async def post_json(url: str, payload: dict) -> dict:
-    timeout = httpx.Timeout(5.0)
+HTTP_RETRIES = metrics.counter(
+    "taxi_http_retries", "POSTs to the dispatcher retried after a transport error."
+)
+
+_client: httpx.AsyncClient | None = None
+
+
+def _build_client() -> httpx.AsyncClient:
+    limits = httpx.Limits(
+        max_connections=settings.HTTP_MAX_CONNECTIONS,
+        max_keepalive_connections=settings.HTTP_MAX_CONNECTIONS,
+    )
+    return httpx.AsyncClient(limits=limits, timeout=httpx.Timeout(5.0))
+
+
+async def open_http_client() -> httpx.AsyncClient:
+    global _client
+    if _client is None or _client.is_closed:
+        _client = _build_client()
+    return _client
+
+
+async def close_http_client() -> None:
+    global _client
+    if _client is not None:
+        await _client.aclose()
+        _client = None
+
+
+def get_http_client() -> httpx.AsyncClient:
+    """
+    Keep-alive client shared by every taxi of the process; opened in the app
+    lifespan, created lazily outside of it.
+    """
+    global _client
+    if _client is None or _client.is_closed:
+        _client = _build_client()
+    return _client
+
+
+async def post_json(url: str, payload: dict | list) -> dict:
     retry = 3
     for attempt in range(retry):
         try:
-            async with httpx.AsyncClient(timeout=timeout) as client:
-                logger.info(f"POST {url} with payload: {payload}")
-                resp = await client.post(url, json=payload)
-                if resp.status_code in (200, 201, 202):
-                    return resp.json()
+            logger.info(f"POST {url} with payload: {payload}")
+            resp = await get_http_client().post(url, json=payload)
+            if resp.status_code in (200, 201, 202):
+                return resp.json()
         except Exception as exc:  # noqa: BLE001
             logger.error(f"POST {url} failed (attempt {attempt + 1}/{retry}): {exc}")
             if attempt + 1 == retry:
                 logger.error(f"Giving up on POST {url}")
                 raise
+            HTTP_RETRIES.inc()
             await asyncio.sleep(1 + attempt * 2)  # backoff
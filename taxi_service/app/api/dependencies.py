@@ -1,4 +1,4 @@
-from fastapi import Request
+from fastapi import HTTPException, Path, Request
 
 from taxi_service.app.domain.schemas import TaxiState
 
@@ -8,3 +8,10 @@ def get_taxi(request: Request) -> TaxiState:
     if taxi is None:
         raise RuntimeError("Taxi not registered yet")
     return taxi
+
+
+def get_fleet_taxi(request: Request, slot: int = Path(..., ge=0)) -> TaxiState:
+    taxi = getattr(request.app.state, "fleet", {}).get(slot)
+    if taxi is None:
+        raise HTTPException(status_code=404, detail="No taxi in this fleet slot")
+    return taxi
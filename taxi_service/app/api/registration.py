@@ -1,5 +1,6 @@
 from __future__ import annotations
 
+import asyncio
 import random
 
 from fastapi import FastAPI
@@ -13,13 +14,20 @@ from taxi_service.app.settings import settings
 from common.logger import get_logger
 logger = get_logger(__name__)
 
-async def _register() -> TaxiState:
+def _callback_base() -> str:
+    """Scheme, host and port the dispatcher reaches this process at."""
+    if settings.PUBLIC_CALLBACK_URL:
+        return str(settings.PUBLIC_CALLBACK_URL).rstrip("/").removesuffix("/assign")
+    return f"http://{get_callback_ip()}:{settings.TAXI_SERVICE_PORT}"
+
+
+async def _register(cb: str | None = None) -> TaxiState:
     x = random.randint(1, settings.GRID_SIZE)
     y = random.randint(1, settings.GRID_SIZE)
 
-    if settings.PUBLIC_CALLBACK_URL:
+    if cb is None and settings.PUBLIC_CALLBACK_URL:
         cb = str(settings.PUBLIC_CALLBACK_URL)
-    else:
+    elif cb is None:
         ip = get_callback_ip()
         cb = f"http://{ip}:{settings.TAXI_SERVICE_PORT}/assign"
 
@@ -54,6 +62,33 @@ async def startup_register(app: FastAPI) -> None:
             logger.exception(f"Error during startup registration: {exc}")
 
 
+async def startup_register_fleet(app: FastAPI) -> None:
+    """
+    Register ``FLEET_SIZE`` virtual taxis, each with its own callback path;
+    slots whose registration failed stay empty.
+    """
+    base = _callback_base()
+    slots = asyncio.Semaphore(max(1, settings.FLEET_REGISTER_CONCURRENCY))
+
+    async def register(slot: int) -> TaxiState | None:
+        async with slots:
+            return await _register(f"{base}/fleet/{slot}/assign")
+
+    taxis = await asyncio.gather(*(register(slot) for slot in range(settings.FLEET_SIZE)))
+    app.state.fleet = {slot: taxi for slot, taxi in enumerate(taxis) if taxi is not None}
+    logger.info(f"Registered {len(app.state.fleet)} of {settings.FLEET_SIZE} fleet taxis")
+
+
+async def shutdown_deregister_fleet(app: FastAPI) -> None:
+    slots = asyncio.Semaphore(max(1, settings.FLEET_REGISTER_CONCURRENCY))
+
+    async def deregister(taxi: TaxiState) -> None:
+        async with slots:
+            await _deregister(str(taxi.public_id))
+
+    await asyncio.gather(*(deregister(taxi) for taxi in app.state.fleet.values()))
+
+
 async def shutdown_deregister(app: FastAPI) -> None:
     if app.state.taxi:
         try:
@@ -5,7 +5,7 @@ from fastapi import APIRouter, BackgroundTasks, Depends, status
 from common.schemas import AssignPayload
 from taxi_service.app.api.dependencies import get_taxi
 from taxi_service.app.domain.schemas import TaxiState
-from taxi_service.app.services.simulation import simulate_trip
+from taxi_service.app.services.simulation import cancel_reposition, simulate_trip
 
 router = APIRouter()
 
@@ -14,5 +14,6 @@ router = APIRouter()
 async def assign(
     payload: AssignPayload, tasks: BackgroundTasks, taxi: TaxiState = Depends(get_taxi)
 ) -> dict:
+    cancel_reposition(taxi)
     tasks.add_task(simulate_trip, payload, taxi)
     return {"accepted": True, "trip_id": payload.trip_id}
@@ -0,0 +1,29 @@
+from __future__ import annotations
+
+from fastapi import APIRouter, BackgroundTasks, Depends, status
+
+from common.schemas import AssignPayload, RepositionPayload
+from taxi_service.app.api.dependencies import get_fleet_taxi
+from taxi_service.app.domain.schemas import TaxiState
+from taxi_service.app.services.simulation import (
+    cancel_reposition,
+    simulate_trip,
+    start_reposition,
+)
+
+router = APIRouter()
+
+
+@router.post("/{slot}/assign", status_code=status.HTTP_202_ACCEPTED)
+async def assign(
+    payload: AssignPayload, tasks: BackgroundTasks, taxi: TaxiState = Depends(get_fleet_taxi)
+) -> dict:
+    cancel_reposition(taxi)
+    tasks.add_task(simulate_trip, payload, taxi)
+    return {"accepted": True, "trip_id": payload.trip_id}
+
+
+@router.post("/{slot}/reposition", status_code=status.HTTP_202_ACCEPTED)
+async def reposition(payload: RepositionPayload, taxi: TaxiState = Depends(get_fleet_taxi)) -> dict:
+    start_reposition(payload, taxi)
+    return {"accepted": True, "x": payload.x, "y": payload.y}
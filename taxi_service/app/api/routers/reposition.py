@@ -0,0 +1,16 @@
+from __future__ import annotations
+
+from fastapi import APIRouter, Depends, status
+
+from common.schemas import RepositionPayload
+from taxi_service.app.api.dependencies import get_taxi
+from taxi_service.app.domain.schemas import TaxiState
+from taxi_service.app.services.simulation import start_reposition
+
+router = APIRouter()
+
+
+@router.post("", status_code=status.HTTP_202_ACCEPTED)
+async def reposition(payload: RepositionPayload, taxi: TaxiState = Depends(get_taxi)) -> dict:
+    start_reposition(payload, taxi)
+    return {"accepted": True, "x": payload.x, "y": payload.y}
@@ -2,20 +2,44 @@ from __future__ import annotations
 
 import asyncio
 from datetime import UTC, datetime
+from uuid import UUID
 
-import httpx
-
-from common.schemas import TaxiHeartbeat
+from common.logger import get_logger
+from common.schemas import TaxiHeartbeat, TaxiHeartbeatItem
+from taxi_service.app.adapters.http_client import get_http_client
+from taxi_service.app.domain.schemas import TaxiState
 from taxi_service.app.settings import settings
 
+logger = get_logger(__name__)
+
+# Taxis reported by the shared loop in "batch" mode.
+_batched_taxis: dict[UUID, TaxiState] = {}
+_batch_task: asyncio.Task | None = None
+
+
+def _base_url() -> str:
+    return str(settings.DISPATCHER_BASE_URL).rstrip("/")
+
 
 async def _send_heartbeat(public_id: str) -> None:
-    base = str(settings.DISPATCHER_BASE_URL).rstrip("/")
     payload = TaxiHeartbeat(taxi_public_id=public_id, timestamp=datetime.now(UTC)).model_dump(
         mode="json"
     )
-    async with httpx.AsyncClient(timeout=5.0) as client:
-        await client.post(f"{base}/taxis/heartbeat", json=payload)
+    await get_http_client().post(f"{_base_url()}/taxis/heartbeat", json=payload)
+
+
+async def _send_heartbeat_batch(taxis: list[TaxiState]) -> None:
+    now = datetime.now(UTC)
+    payload = [
+        TaxiHeartbeatItem(
+            taxi_public_id=taxi.public_id, timestamp=now, x=taxi.x, y=taxi.y
+        ).model_dump(mode="json")
+        for taxi in taxis
+    ]
+    resp = await get_http_client().post(f"{_base_url()}/taxis/heartbeat/batch", json=payload)
+    rejected = resp.json().get("rejected", []) if resp.status_code == 200 else []
+    for item in rejected:
+        logger.error(f"Heartbeat for taxi {taxis[item['index']].public_id} rejected: {item}")
 
 
 async def _heartbeat_loop(public_id: str) -> None:
@@ -27,5 +51,30 @@ async def _heartbeat_loop(public_id: str) -> None:
         await asyncio.sleep(settings.HEARTBEAT_INTERVAL_SEC)
 
 
-async def start_heartbeat(public_id: str) -> None:
-    asyncio.create_task(_heartbeat_loop(public_id))
+async def _batch_heartbeat_loop() -> None:
+    size = max(1, settings.HEARTBEAT_BATCH_MAX_ITEMS)
+    while _batched_taxis:
+        taxis = list(_batched_taxis.values())
+        chunks = [taxis[i : i + size] for i in range(0, len(taxis), size)]
+        results = await asyncio.gather(
+            *(_send_heartbeat_batch(chunk) for chunk in chunks), return_exceptions=True
+        )
+        for result in results:
+            if isinstance(result, Exception):
+                logger.error(f"Heartbeat batch failed: {result}")
+        await asyncio.sleep(settings.HEARTBEAT_INTERVAL_SEC)
+
+
+async def start_heartbeat(taxi: TaxiState) -> None:
+    global _batch_task
+    # A fleet always reports through the shared loop: one task for all its taxis.
+    if settings.HEARTBEAT_MODE != "batch" and settings.FLEET_SIZE <= 1:
+        asyncio.create_task(_heartbeat_loop(str(taxi.public_id)))
+        return
+    _batched_taxis[taxi.public_id] = taxi
+    if _batch_task is None or _batch_task.done():
+        _batch_task = asyncio.create_task(_batch_heartbeat_loop())
+
+
+def stop_heartbeat(taxi: TaxiState) -> None:
+    _batched_taxis.pop(taxi.public_id, None)
@@ -1,11 +1,19 @@
 from __future__ import annotations
 
-from fastapi import FastAPI
+from fastapi import FastAPI, Response
 
-from taxi_service.app.api.registration import shutdown_deregister, startup_register
-from taxi_service.app.api.routers import assign
-from taxi_service.app.background.heartbeat import start_heartbeat
+from taxi_service.app.adapters.http_client import close_http_client, open_http_client
+from taxi_service.app.api.registration import (
+    shutdown_deregister,
+    shutdown_deregister_fleet,
+    startup_register,
+    startup_register_fleet,
+)
+from taxi_service.app.api.routers import assign, fleet, reposition
+from taxi_service.app.background.heartbeat import start_heartbeat, stop_heartbeat
 from taxi_service.app.domain.schemas import TaxiState
+from taxi_service.app.settings import settings
+from common import metrics
 from common.logger import configure_root_logging, get_logger
 
 configure_root_logging(service_name="taxi")
@@ -15,17 +23,46 @@ log.info("Taxi app booting")
 
 async def lifespan(app: FastAPI):
     app.state.taxi: TaxiState | None = None
-    await startup_register(app)
-    await start_heartbeat(app.state.taxi.public_id)  # type: ignore[arg-type]
+    app.state.fleet: dict[int, TaxiState] = {}
+    await open_http_client()
+    await metrics.event_loop_lag_monitor.start()
+    if settings.FLEET_SIZE > 1:
+        await startup_register_fleet(app)
+    else:
+        await startup_register(app)
+    taxis = list(app.state.fleet.values())
+    if app.state.taxi:
+        taxis.append(app.state.taxi)
+    for taxi in taxis:
+        await start_heartbeat(taxi)
     yield
-    await shutdown_deregister(app)
+    for taxi in taxis:
+        stop_heartbeat(taxi)
+    if settings.FLEET_SIZE > 1:
+        await shutdown_deregister_fleet(app)
+    else:
+        await shutdown_deregister(app)
+    await metrics.event_loop_lag_monitor.stop()
+    await close_http_client()
 
 
 app = FastAPI(title="Taxi Service", lifespan=lifespan)
+app.add_middleware(metrics.RequestMetricsMiddleware)
 
 app.include_router(assign.router, prefix="/assign", tags=["Assign"])
+app.include_router(reposition.router, prefix="/reposition", tags=["Reposition"])
+app.include_router(fleet.router, prefix="/fleet", tags=["Fleet"])
 
 
 @app.get("/healthz")
 def healthz() -> dict:
-    return {"status": "ok", "taxi_public_id": app.state.taxi.public_id if app.state.taxi else None}  # type: ignore[attr-defined]
+    return {
+        "status": "ok",
+        "taxi_public_id": app.state.taxi.public_id if app.state.taxi else None,  # type: ignore[attr-defined]
+        "fleet_size": len(app.state.fleet),  # type: ignore[attr-defined]
+    }
+
+
+@app.get("/metrics", include_in_schema=False)
+def metrics_endpoint() -> Response:
+    return Response(metrics.render_latest(), media_type=metrics.CONTENT_TYPE_LATEST)
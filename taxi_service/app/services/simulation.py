@@ -3,8 +3,15 @@ from __future__ import annotations
 import asyncio
 import random
 from datetime import UTC, datetime
+from uuid import UUID
 
-from common.schemas import AssignPayload, TaxiDeliveredEvent, TaxiPickupEvent
+from common.schemas import (
+    AssignPayload,
+    RepositionPayload,
+    TaxiDeliveredEvent,
+    TaxiHeartbeatItem,
+    TaxiPickupEvent,
+)
 from taxi_service.app.adapters.http_client import post_json
 from taxi_service.app.domain.schemas import TaxiState
 from taxi_service.app.settings import settings
@@ -12,20 +19,72 @@ from taxi_service.app.settings import settings
 from common.logger import get_logger
 logger = get_logger(__name__)
 
+# Reposition drives in progress; an assignment cancels the taxi's drive.
+_repositioning: dict[UUID, asyncio.Task] = {}
+# One trip at a time per taxi: a trip queued by look-ahead matching waits here
+# and starts from the drop-off of the trip ahead of it.
+_driving: dict[UUID, asyncio.Lock] = {}
+
+
 def _manhattan(x1: int, y1: int, x2: int, y2: int) -> int:
     return abs(x1 - x2) + abs(y1 - y2)
 
 
+def drive_minutes(distance: int, rng: random.Random) -> int:
+    """Minutes to drive ``distance`` cells: SPEED_MIN..SPEED_MAX minutes per cell, uniformly."""
+    smin = max(1, settings.SPEED_MIN)
+    smax = max(smin, settings.SPEED_MAX)
+    return sum(rng.choices(range(smin, smax + 1), k=distance))
+
+
+async def simulate_reposition(target: RepositionPayload, taxi: TaxiState) -> None:
+    """Drive an idle taxi to ``target``, then report the new position to the dispatcher."""
+    minutes = drive_minutes(_manhattan(taxi.x, taxi.y, target.x, target.y), random.Random())
+    logger.info(f"Repositioning to ({target.x}, {target.y}), estimated time: {minutes} min")
+    await asyncio.sleep(minutes / max(0.0001, settings.TIME_SCALE))
+    taxi.x, taxi.y = target.x, target.y
+    report = TaxiHeartbeatItem(
+        taxi_public_id=taxi.public_id, timestamp=datetime.now(UTC), x=taxi.x, y=taxi.y
+    ).model_dump(mode="json")
+    await post_json(f"{settings.DISPATCHER_BASE_URL}taxis/heartbeat/batch", [report])
+    logger.info(f"Repositioned to ({taxi.x}, {taxi.y})")
+
+
+def start_reposition(target: RepositionPayload, taxi: TaxiState) -> None:
+    cancel_reposition(taxi)
+    task = asyncio.create_task(simulate_reposition(target, taxi))
+    _repositioning[taxi.public_id] = task
+    task.add_done_callback(
+        lambda done: (
+            _repositioning.pop(taxi.public_id, None)
+            if _repositioning.get(taxi.public_id) is done
+            else None
+        )
+    )
+
+
+def cancel_reposition(taxi: TaxiState) -> None:
+    """Stop a drive in progress; the taxi stays where the dispatcher last saw it."""
+    task = _repositioning.pop(taxi.public_id, None)
+    if task is not None:
+        task.cancel()
+
+
 async def simulate_trip(assign: AssignPayload, taxi: TaxiState) -> None:
+    lock = _driving.setdefault(taxi.public_id, asyncio.Lock())
+    if lock.locked():
+        logger.info(f"Trip {assign.trip_id} queued until the current trip is delivered")
+    async with lock:
+        await _drive_trip(assign, taxi)
+
+
+async def _drive_trip(assign: AssignPayload, taxi: TaxiState) -> None:
     d1 = _manhattan(taxi.x, taxi.y, assign.start_x, assign.start_y)
     d2 = _manhattan(assign.start_x, assign.start_y, assign.end_x, assign.end_y)
 
     rng = random.Random()
-    smin = max(1, settings.SPEED_MIN)
-    smax = max(smin, settings.SPEED_MAX)
-
-    pickup_minutes = sum(rng.randint(smin, smax) for _ in range(d1))
-    travel_minutes = sum(rng.randint(smin, smax) for _ in range(d2))
+    pickup_minutes = drive_minutes(d1, rng)
+    travel_minutes = drive_minutes(d2, rng)
 
     pickup_sleep = pickup_minutes / max(0.0001, settings.TIME_SCALE)
     travel_sleep = travel_minutes / max(0.0001, settings.TIME_SCALE)
@@ -51,6 +110,9 @@ async def simulate_trip(assign: AssignPayload, taxi: TaxiState) -> None:
     logger.info("Pickup event sent")
 
     await asyncio.sleep(travel_sleep)
+    # Move before reporting the drop-off, so no heartbeat sent after it carries the old cell.
+    taxi.x = assign.end_x
+    taxi.y = assign.end_y
     delivered_evt = TaxiDeliveredEvent(
         trip_id=assign.trip_id,
         taxi_public_id=taxi.public_id,
@@ -61,6 +123,3 @@ async def simulate_trip(assign: AssignPayload, taxi: TaxiState) -> None:
     logger.info("Sending delivered event:", delivered_evt)
     await post_json(f"{settings.DISPATCHER_BASE_URL}events/delivered", delivered_evt)
     logger.info("Delivered event sent")
-
-    taxi.x = assign.end_x
-    taxi.y = assign.end_y
@@ -1,3 +1,5 @@
+from typing import Literal
+
 from pydantic import HttpUrl
 from pydantic_settings import BaseSettings, SettingsConfigDict
 
@@ -17,6 +19,16 @@ class Settings(BaseSettings):
     GRID_SIZE: int = 100
 
     HEARTBEAT_INTERVAL_SEC: int = 5
+    # "single": one request per heartbeat; "batch": all taxis of this process
+    # (with positions) in one request to /taxis/heartbeat/batch.
+    HEARTBEAT_MODE: Literal["single", "batch"] = "single"
+    HEARTBEAT_BATCH_MAX_ITEMS: int = 1000
+
+    # Virtual taxis hosted by this process. Above 1, taxi N gets the callbacks
+    # /fleet/N/assign and /fleet/N/reposition and heartbeats are always batched.
+    FLEET_SIZE: int = 1
+    FLEET_REGISTER_CONCURRENCY: int = 50
+    HTTP_MAX_CONNECTIONS: int = 100
 
     model_config = SettingsConfigDict(env_file=".env", extra="ignore")
 
@@ -9,9 +9,9 @@ def _has_call(calls, suffix: str) -> bool:
 
 def test_registers_taxi_on_startup(client, mock_dispatcher_calls):
     # ACT & ASSERT
-    assert _has_call(
-        mock_dispatcher_calls, "/taxis/register"
-    ), f"No taxi registration call. Collected calls: {mock_dispatcher_calls}"
+    assert _has_call(mock_dispatcher_calls, "/taxis/register"), (
+        f"No taxi registration call. Collected calls: {mock_dispatcher_calls}"
+    )
 
 
 def test_deregister_on_shutdown(mock_dispatcher_calls):
@@ -25,9 +25,9 @@ def test_deregister_on_shutdown(mock_dispatcher_calls):
         pass
 
     # ASSERT
-    assert _has_call(
-        mock_dispatcher_calls, "/taxis/deregister"
-    ), f"No deregister call, calls={mock_dispatcher_calls}"
+    assert _has_call(mock_dispatcher_calls, "/taxis/deregister"), (
+        f"No deregister call, calls={mock_dispatcher_calls}"
+    )
 
 
 def test_assign_triggers_events(client, mock_dispatcher_calls, fast_simulation):
@@ -48,6 +48,140 @@ def test_assign_triggers_events(client, mock_dispatcher_calls, fast_simulation):
         time.sleep(1)
 
     assert _has_call(mock_dispatcher_calls, "/events/pickup"), f"No pickup: {mock_dispatcher_calls}"
-    assert _has_call(
-        mock_dispatcher_calls, "/events/delivered"
-    ), f"No delivered: {mock_dispatcher_calls}"
+    assert _has_call(mock_dispatcher_calls, "/events/delivered"), (
+        f"No delivered: {mock_dispatcher_calls}"
+    )
+
+
+def test_batch_heartbeat_mode_posts_positions(monkeypatch, mock_dispatcher_calls):
+    # ARRANGE
+    from fastapi.testclient import TestClient
+
+    from taxi_service.app.main import app
+    from taxi_service.app.settings import settings
+
+    monkeypatch.setattr(settings, "HEARTBEAT_MODE", "batch")
+
+    # ACT
+    with TestClient(app) as _:
+        for _ in range(20):
+            if _has_call(mock_dispatcher_calls, "/taxis/heartbeat/batch"):
+                break
+            time.sleep(0.1)
+
+    # ASSERT
+    batch = [c for c in mock_dispatcher_calls if c["url"].endswith("/taxis/heartbeat/batch")]
+    assert batch, f"No batch heartbeat: {mock_dispatcher_calls}"
+    assert batch[0]["json"][0]["x"] == 1 and batch[0]["json"][0]["y"] == 1
+
+
+def test_reposition_moves_taxi_and_reports_position(monkeypatch, client, mock_dispatcher_calls):
+    # ARRANGE
+    from taxi_service.app.main import app
+    from taxi_service.app.settings import settings
+
+    monkeypatch.setattr(settings, "TIME_SCALE", 1e6)
+
+    # ACT
+    resp = client.post("/reposition", json={"x": 7, "y": 9})
+    for _ in range(40):
+        if _has_call(mock_dispatcher_calls, "/taxis/heartbeat/batch"):
+            break
+        time.sleep(0.05)
+
+    # ASSERT
+    assert resp.status_code == 202
+    report = [c for c in mock_dispatcher_calls if c["url"].endswith("/taxis/heartbeat/batch")]
+    assert report, f"No position report: {mock_dispatcher_calls}"
+    assert (report[-1]["json"][0]["x"], report[-1]["json"][0]["y"]) == (7, 9)
+    assert (app.state.taxi.x, app.state.taxi.y) == (7, 9)
+
+
+def test_queued_trip_starts_after_delivery(monkeypatch, mock_dispatcher_calls):
+    # ARRANGE
+    import asyncio
+    from uuid import uuid4
+
+    from taxi_service.app.domain.schemas import TaxiState
+    from taxi_service.app.services.simulation import simulate_trip
+    from taxi_service.app.settings import settings
+
+    monkeypatch.setattr(settings, "TIME_SCALE", 1e6)
+    taxi = TaxiState(public_id=uuid4(), x=1, y=1)
+    first = AssignPayload(trip_id=1, start_x=2, start_y=2, end_x=5, end_y=5)
+    queued = AssignPayload(trip_id=2, start_x=6, start_y=6, end_x=9, end_y=9)
+
+    async def both() -> None:
+        await asyncio.gather(simulate_trip(first, taxi), simulate_trip(queued, taxi))
+
+    # ACT
+    asyncio.run(both())
+
+    # ASSERT
+    events = [
+        (c["url"].rsplit("/", 1)[-1], c["json"]["trip_id"])
+        for c in mock_dispatcher_calls
+        if "/events/" in c["url"]
+    ]
+    assert events == [("pickup", 1), ("delivered", 1), ("pickup", 2), ("delivered", 2)]
+    assert (taxi.x, taxi.y) == (9, 9)
+
+
+def test_fleet_mode_hosts_many_taxis_on_one_port(monkeypatch, mock_dispatcher_calls):
+    # ARRANGE
+    from uuid import uuid4
+
+    import httpx
+    from fastapi.testclient import TestClient
+
+    from common.schemas import TaxiRead
+    from taxi_service.app.main import app
+    from taxi_service.app.settings import settings
+
+    monkeypatch.setattr(settings, "FLEET_SIZE", 3)
+    monkeypatch.setattr(settings, "TIME_SCALE", 1e6)
+    default_post = httpx.AsyncClient.post
+
+    async def register_distinct_taxis(self, url, *args, **kwargs):
+        if not url.endswith("/taxis/register"):
+            return await default_post(self, url, *args, **kwargs)
+        mock_dispatcher_calls.append({"url": url, "json": kwargs.get("json")})
+        taxi = TaxiRead(id=1, public_id=str(uuid4()), status="available", x=1, y=1)
+        return httpx.Response(201, json=taxi.model_dump(mode="json"))
+
+    monkeypatch.setattr(httpx.AsyncClient, "post", register_distinct_taxis)
+    payload = AssignPayload(trip_id=5, start_x=2, start_y=2, end_x=3, end_y=3)
+
+    # ACT
+    with TestClient(app) as c:
+        resp = c.post("/fleet/2/assign", json=payload.model_dump(mode="json"))
+        missing = c.post("/fleet/3/assign", json=payload.model_dump(mode="json"))
+        health = c.get("/healthz").json()
+        for _ in range(40):
+            if _has_call(mock_dispatcher_calls, "/events/delivered"):
+                break
+            time.sleep(0.05)
+        fleet = dict(app.state.fleet)
+
+    # ASSERT
+    callbacks = sorted(
+        c["json"]["callback_url"] for c in mock_dispatcher_calls if c["url"].endswith("/register")
+    )
+    assert [cb.split(":", 2)[-1].split("/", 1)[-1] for cb in callbacks] == [
+        "fleet/0/assign",
+        "fleet/1/assign",
+        "fleet/2/assign",
+    ]
+    assert resp.status_code == 202
+    assert missing.status_code == 404
+    assert health["fleet_size"] == 3
+    delivered = [c for c in mock_dispatcher_calls if c["url"].endswith("/events/delivered")]
+    assert delivered[0]["json"]["taxi_public_id"] == str(fleet[2].public_id)
+    heartbeats = [c for c in mock_dispatcher_calls if c["url"].endswith("/taxis/heartbeat/batch")]
+    assert heartbeats and len(heartbeats[0]["json"]) == 3
+    deregistered = {
+        c["json"]["taxi_public_id"]
+        for c in mock_dispatcher_calls
+        if c["url"].endswith("/taxis/deregister")
+    }
+    assert deregistered == {str(taxi.public_id) for taxi in fleet.values()}